@@ -0,0 +1,70 @@
+from typing import Iterable
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+# Room for multipart boundaries, part headers and the form fields sent
+# alongside the image.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadLimitMiddleware:
+    # Starlette receives and spools a whole multipart body before the
+    # endpoint runs, so a size check there comes after the bytes were
+    # transferred and buffered. This refuses a declared Content-Length over
+    # the limit without reading the body, and stops a chunked or understated
+    # body as soon as it passes the limit.
+    def __init__(self, app: ASGIApp, paths: Iterable[str], max_body: int):
+        self.app = app
+        self.paths = set(paths)
+        self.max_body = max_body
+
+    def too_large(self) -> HTTPException:
+        return HTTPException(
+            status_code=413,
+            detail=f"Request body too large. Maximum size: {self.max_body} bytes"
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_body:
+            await self.reject(scope, receive, send)
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    # An HTTPException passes through FastAPI's body parsing
+                    # as is instead of becoming a 400.
+                    raise self.too_large()
+            return message
+
+        async def tracked_send(message: Message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except HTTPException as e:
+            if started or e.status_code != 413:
+                raise
+            await self.reject(scope, receive, send)
+
+    async def reject(self, scope: Scope, receive: Receive, send: Send):
+        error = self.too_large()
+        response = JSONResponse({"detail": error.detail}, status_code=error.status_code, headers={"Connection": "close"})
+        await response(scope, receive, send)
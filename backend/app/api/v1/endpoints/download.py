@@ -1,23 +1,124 @@
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import FileResponse
+import re
+import aiofiles
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
 from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
+from app.config import settings
+from app.core import metrics
+from app.core.artifact_gc import ArtifactUsage
+from app.core.artifacts import Artifact, artifact_index
 from app.core.queue import JobQueue
 from app.core.redis import get_redis
 from app.core.storage import storage_service
 
 router = APIRouter(prefix="/download", tags=["download"])
 
+GLB_MEDIA_TYPE = "model/gltf-binary"
+VARIANT_PATTERN = r"^[a-z0-9_]+$"
+# Artifact URLs carry the job id and are never rewritten.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+RANGE_CHUNK_SIZE = 64 * 1024
+UNSATISFIABLE = (-1, -1)
+
+
+def parse_accept_variants(accept: str) -> List[str]:
+    # GLB variants named on model/gltf-binary media ranges, best first:
+    # "model/gltf-binary; variant=quantized, model/gltf-binary; q=0.5".
+    # A range without a variant parameter stands for the original.
+    ranked = []
+    for position, media_range in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        if media_type.lower() != GLB_MEDIA_TYPE:
+            continue
+        values = dict(param.split("=", 1) for param in params if "=" in param)
+        try:
+            q = float(values.get("q", 1))
+        except ValueError:
+            q = 1.0
+        variant = values.get("variant", "original").strip('"')
+        if q > 0 and re.match(VARIANT_PATTERN, variant):
+            ranked.append((-q, position, variant))
+    return [variant for _, _, variant in sorted(ranked)]
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for coding in (accept_encoding or "").split(","):
+        name, *params = [part.strip() for part in coding.split(";")]
+        q = next((param[2:] for param in params if param.startswith("q=")), "1")
+        try:
+            if name.lower() in ["gzip", "*"] and float(q) > 0:
+                return True
+        except ValueError:
+            continue
+    return False
+
 
 def get_queue() -> JobQueue:
     return JobQueue(get_redis())
 
 
-@router.get("/{job_id}.glb")
-async def download_glb(
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison, as If-None-Match requires.
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    # Inclusive (start, end) of a single bytes range, UNSATISFIABLE when it
+    # lies outside the file, or None to ignore it and send the whole file
+    # (other units and multiple ranges).
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                return UNSATISFIABLE
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return UNSATISFIABLE
+    return start, end
+
+
+async def read_range(path: Path, start: int, end: int) -> AsyncIterator[bytes]:
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def get_artifact_lookup(
     job_id: str,
-    queue: JobQueue = Depends(get_queue)
-):
+    queue: JobQueue
+) -> Callable[[str], Awaitable[Optional[Artifact]]]:
+    # A manifest is only written once the job's artifacts are complete, so
+    # its presence stands in for the job record. Loading one reads a file
+    # or makes a request, so only cached manifests are checked on the loop.
+    if artifact_index.is_cached(job_id) or await run_in_threadpool(artifact_index.has_manifest, job_id):
+        async def manifest_lookup(name: str) -> Optional[Artifact]:
+            return artifact_index.lookup(job_id, name)
+
+        return manifest_lookup
+
+    # Outputs from before manifests existed still need the job record.
     job = await queue.get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -25,58 +126,158 @@ async def download_glb(
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail=f"Job not completed (status: {job['status']})")
 
-    file_path = storage_service.get_output_path(job_id, "glb")
-    if not file_path:
-        raise HTTPException(status_code=404, detail="GLB file not found")
+    def describe(name: str) -> Optional[Artifact]:
+        path = storage_service.artifact_path(job_id, name)
+        return artifact_index.describe(path) if path.exists() else None
+
+    async def legacy_lookup(name: str) -> Optional[Artifact]:
+        # The first download of each file hashes all of it.
+        return await run_in_threadpool(describe, name)
+
+    return legacy_lookup
+
+
+async def record_access(queue: JobQueue, job_id: str):
+    # Download recency orders quota eviction; a failure must not fail the
+    # download.
+    try:
+        await ArtifactUsage(queue.redis).touch(job_id)
+    except Exception as e:
+        print(f"Failed to record download of {job_id}: {e}")
+
+
+def artifact_response(
+    request: Request,
+    artifact: Artifact,
+    filename: str,
+    media_type: str,
+    metric_format: str,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    headers = {
+        **(headers or {}),
+        "ETag": artifact.etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes"
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, artifact.etag):
+        return Response(status_code=304, headers=headers)
+
+    if artifact.path is None:
+        # Remote backends serve the bytes (ranges included) themselves; the
+        # object carries its own Content-Encoding and Cache-Control, and the
+        # redirect must not outlive its signature.
+        url = storage_service.backend.signed_url(artifact.key, settings.DOWNLOAD_URL_TTL, filename)
+        headers.pop("Content-Encoding", None)
+        headers.pop("Accept-Ranges")
+        metrics.download_redirects.inc(format=metric_format)
+        return RedirectResponse(url, status_code=307, headers={**headers, "Cache-Control": "private, no-store"})
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == artifact.etag):
+        byte_range = parse_range(range_header, artifact.size)
 
-    return FileResponse(
-        path=file_path,
+    if byte_range == UNSATISFIABLE:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{artifact.size}"})
+
+    if byte_range is None:
+        metrics.download_bytes.inc(artifact.size, format=metric_format)
+        return FileResponse(path=artifact.path, filename=filename, media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    metrics.download_bytes.inc(end - start + 1, format=metric_format)
+    return StreamingResponse(
+        read_range(artifact.path, start, end),
+        status_code=206,
+        media_type=media_type,
+        headers={
+            **headers,
+            "Content-Range": f"bytes {start}-{end}/{artifact.size}",
+            "Content-Length": str(end - start + 1),
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        }
+    )
+
+
+@router.get("/{job_id}.glb")
+async def download_glb(
+    job_id: str,
+    request: Request,
+    variant: Optional[str] = Query(default=None, pattern=VARIANT_PATTERN),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+    queue: JobQueue = Depends(get_queue)
+):
+    lookup = await get_artifact_lookup(job_id, queue)
+
+    # An explicit ?variant= must exist; Accept preferences fall back to
+    # the original GLB.
+    candidates = [variant] if variant else parse_accept_variants(accept or "") + ["original"]
+    for name in candidates:
+        file_type = "glb" if name == "original" else f"{name}.glb"
+        artifact = await lookup(file_type)
+        if artifact:
+            break
+    else:
+        raise HTTPException(status_code=404, detail=f"GLB {variant or 'file'} not found")
+
+    await record_access(queue, job_id)
+    headers = {"Vary": "Accept, Accept-Encoding", "X-GLB-Variant": name}
+    if accepts_gzip(accept_encoding):
+        compressed = await lookup(f"{file_type}.gz")
+        if compressed:
+            artifact = compressed
+            headers["Content-Encoding"] = "gzip"
+
+    return artifact_response(
+        request,
+        artifact,
         filename=f"{job_id}.glb",
-        media_type="model/gltf-binary"
+        media_type=GLB_MEDIA_TYPE,
+        metric_format="glb" if name == "original" else f"glb_{name}",
+        headers=headers
     )
 
 
 @router.get("/{job_id}.ply")
 async def download_ply(
     job_id: str,
+    request: Request,
     queue: JobQueue = Depends(get_queue)
 ):
-    job = await queue.get_job(job_id)
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
-
-    if job["status"] != "completed":
-        raise HTTPException(status_code=400, detail=f"Job not completed (status: {job['status']})")
-
-    file_path = storage_service.get_output_path(job_id, "ply")
-    if not file_path:
+    artifact = await (await get_artifact_lookup(job_id, queue))("ply")
+    if not artifact:
         raise HTTPException(status_code=404, detail="PLY file not found")
+    await record_access(queue, job_id)
 
-    return FileResponse(
-        path=file_path,
+    return artifact_response(
+        request,
+        artifact,
         filename=f"{job_id}.ply",
-        media_type="application/x-ply"
+        media_type="application/x-ply",
+        metric_format="ply"
     )
 
 
 @router.get("/preview/{job_id}.png")
 async def download_preview(
     job_id: str,
+    request: Request,
     queue: JobQueue = Depends(get_queue)
 ):
-    job = await queue.get_job(job_id)
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
-
-    if job["status"] != "completed":
-        raise HTTPException(status_code=400, detail=f"Job not completed (status: {job['status']})")
-
-    file_path = storage_service.get_preview_path(job_id)
-    if not file_path:
+    artifact = await (await get_artifact_lookup(job_id, queue))("preview")
+    if not artifact:
         raise HTTPException(status_code=404, detail="Preview not found")
+    await record_access(queue, job_id)
 
-    return FileResponse(
-        path=file_path,
+    return artifact_response(
+        request,
+        artifact,
         filename=f"{job_id}_preview.png",
-        media_type="image/png"
+        media_type="image/png",
+        metric_format="preview"
     )
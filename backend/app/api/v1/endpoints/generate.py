@@ -1,16 +1,19 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
 from datetime import datetime
+from uuid import uuid4
 import json
 
 from app.api.v1.schemas import (
     TextTo3DRequest,
     GenerationResponse,
-    Resolution,
     LLMProvider
 )
+from app.core.eta import ETAEstimator
 from app.core.queue import JobQueue
 from app.core.redis import get_redis
+from app.core.result_cache import ResultCache, compute_fingerprint
 from app.core.storage import storage_service
 from app.core.exceptions import InvalidFileTypeException, FileTooLargeException
 from app.config import settings
@@ -22,19 +25,46 @@ def get_queue() -> JobQueue:
     return JobQueue(get_redis())
 
 
-def get_estimated_time(resolution: Resolution) -> int:
-    estimates = {
-        Resolution.LOW: 60,
-        Resolution.MEDIUM: 120,
-        Resolution.HIGH: 180
+def get_result_cache() -> ResultCache:
+    return ResultCache(get_redis())
+
+
+async def resolve_cached_job(cache: ResultCache, fingerprint: str):
+    job_id = str(uuid4())
+    if not settings.RESULT_CACHE_ENABLED:
+        return job_id, None
+    return await cache.resolve(fingerprint, job_id)
+
+
+async def release_reservation(cache: ResultCache, fingerprint: str, job_id: str):
+    # A request that reserved a fingerprint but failed to enqueue must not
+    # leave identical requests attached to a job that will never exist.
+    if settings.RESULT_CACHE_ENABLED:
+        await cache.forget(fingerprint, job_id)
+
+
+def reserved_job(job_id: str, job_type: str, parameters: dict) -> dict:
+    # An in-flight hit can name a job whose first request has reserved it
+    # but not written it yet; it is reported as queued until it appears.
+    return {
+        "job_id": job_id,
+        "job_type": job_type,
+        "status": "queued",
+        "parameters": parameters,
+        "created_at": datetime.utcnow().isoformat()
     }
-    return estimates.get(resolution, 120)
+
+
+async def get_estimated_time(queue: JobQueue, job: dict) -> int:
+    estimate = await ETAEstimator(queue).estimate(job)
+    return estimate or 0
 
 
 @router.post("/text-to-3d", response_model=GenerationResponse)
 async def generate_text_to_3d(
     request: TextTo3DRequest,
-    queue: JobQueue = Depends(get_queue)
+    queue: JobQueue = Depends(get_queue),
+    cache: ResultCache = Depends(get_result_cache)
 ):
     input_data = {
         "type": "text",
@@ -50,20 +80,31 @@ async def generate_text_to_3d(
         "slat_sampler_params": request.slat_sampler_params.model_dump() if request.slat_sampler_params else None
     }
 
-    job_id = await queue.enqueue(
-        job_type="text_to_3d",
-        input_data=input_data,
-        parameters=parameters
-    )
+    fingerprint = compute_fingerprint("text_to_3d", input_data, parameters)
+    job_id, cache_hit = await resolve_cached_job(cache, fingerprint)
 
-    job = await queue.get_job(job_id)
+    if cache_hit is None:
+        try:
+            await queue.enqueue(
+                job_type="text_to_3d",
+                input_data=input_data,
+                parameters=parameters,
+                job_id=job_id,
+                fingerprint=fingerprint
+            )
+        except Exception:
+            await release_reservation(cache, fingerprint, job_id)
+            raise
+
+    job = await queue.get_job(job_id) or reserved_job(job_id, "text_to_3d", parameters)
 
     return GenerationResponse(
         job_id=job_id,
         status=job["status"],
         created_at=job["created_at"],
-        estimated_time=get_estimated_time(request.resolution),
-        websocket_url=f"ws://localhost:{settings.API_PORT}/ws/jobs/{job_id}"
+        estimated_time=await get_estimated_time(queue, job),
+        websocket_url=f"ws://localhost:{settings.API_PORT}/ws/jobs/{job_id}",
+        cache_hit=cache_hit
     )
 
 
@@ -76,7 +117,8 @@ async def generate_image_to_3d(
     resolution: str = Form(default="medium"),
     sparse_structure_sampler_params: Optional[str] = Form(default=None),
     slat_sampler_params: Optional[str] = Form(default=None),
-    queue: JobQueue = Depends(get_queue)
+    queue: JobQueue = Depends(get_queue),
+    cache: ResultCache = Depends(get_result_cache)
 ):
     if file.content_type not in settings.ALLOWED_IMAGE_TYPES:
         raise HTTPException(
@@ -84,18 +126,22 @@ async def generate_image_to_3d(
             detail=f"Invalid file type: {file.content_type}. Allowed: {settings.ALLOWED_IMAGE_TYPES}"
         )
 
-    content = await file.read()
-    if len(content) > settings.MAX_UPLOAD_SIZE:
+    if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
         raise HTTPException(
             status_code=400,
             detail=f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE} bytes"
         )
 
-    filename = await storage_service.save_upload(content, file.filename)
+    try:
+        temp_path, content_hash, _ = await storage_service.stage_upload(file, settings.MAX_UPLOAD_SIZE)
+    except FileTooLargeException:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE} bytes"
+        )
 
     input_data = {
         "type": "image",
-        "image_filename": filename,
         "enhance_prompt": enhance_prompt,
         "llm_provider": llm_provider
     }
@@ -121,19 +167,44 @@ async def generate_image_to_3d(
         "slat_sampler_params": slat_params
     }
 
-    job_id = await queue.enqueue(
-        job_type="image_to_3d",
-        input_data=input_data,
-        parameters=parameters
-    )
-
-    job = await queue.get_job(job_id)
-    res = Resolution(resolution)
+    committed = False
+    try:
+        fingerprint = compute_fingerprint(
+            "image_to_3d",
+            input_data,
+            parameters,
+            content_hash=content_hash
+        )
+        job_id, cache_hit = await resolve_cached_job(cache, fingerprint)
+
+        if cache_hit is None:
+            try:
+                # Remote backends upload here, off the event loop.
+                input_data["image_filename"] = await run_in_threadpool(
+                    storage_service.commit_upload, temp_path, file.filename, job_id
+                )
+                committed = True
+                await queue.enqueue(
+                    job_type="image_to_3d",
+                    input_data=input_data,
+                    parameters=parameters,
+                    job_id=job_id,
+                    fingerprint=fingerprint
+                )
+            except Exception:
+                await release_reservation(cache, fingerprint, job_id)
+                raise
+    finally:
+        if not committed:
+            storage_service.discard_upload(temp_path)
+
+    job = await queue.get_job(job_id) or reserved_job(job_id, "image_to_3d", parameters)
 
     return GenerationResponse(
         job_id=job_id,
         status=job["status"],
         created_at=job["created_at"],
-        estimated_time=get_estimated_time(res),
-        websocket_url=f"ws://localhost:{settings.API_PORT}/ws/jobs/{job_id}"
+        estimated_time=await get_estimated_time(queue, job),
+        websocket_url=f"ws://localhost:{settings.API_PORT}/ws/jobs/{job_id}",
+        cache_hit=cache_hit
     )
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends
 from typing import Dict, Any
-import httpx
 
+from app.core import http_client
 from app.core.queue import JobQueue
 from app.core.redis import get_redis
+from app.core.result_cache import ResultCache
 from app.config import settings
 
 router = APIRouter(prefix="/health", tags=["health"])
@@ -24,9 +25,8 @@ async def check_redis_health() -> bool:
 
 async def check_ollama_health() -> bool:
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{settings.OLLAMA_BASE_URL}/api/tags")
-            return response.status_code == 200
+        response = await http_client.request("ollama", "get", f"{settings.OLLAMA_BASE_URL}/api/tags", timeout=5.0)
+        return response.status_code == 200
     except Exception:
         return False
 
@@ -44,8 +44,14 @@ async def health_check(
     groq_available = await check_groq_health()
 
     queue_size = 0
+    cache_stats = None
+    workers = []
     if redis_healthy:
         queue_size = await queue.get_queue_size()
+        cache_stats = await ResultCache(get_redis()).get_stats()
+        workers = await queue.get_workers()
+
+    busy = [w for w in workers if w.get("current_job")]
 
     overall_status = "healthy" if redis_healthy else "degraded"
 
@@ -59,9 +65,11 @@ async def health_check(
         },
         "queue": {
             "pending": queue_size,
-            "processing": 0,
-            "workers_available": settings.WORKER_COUNT
-        }
+            "processing": sum(w.get("batch_size") or 1 for w in busy),
+            "workers_available": len(workers),
+            "workers_idle": len(workers) - len(busy)
+        },
+        "result_cache": cache_stats
     }
 
 
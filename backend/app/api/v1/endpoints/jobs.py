@@ -1,7 +1,18 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import Optional
 
-from app.api.v1.schemas import JobResponse, JobListResponse, JobStatus, JobResult, JobError
+from app.api.v1.schemas import (
+    JobResponse,
+    JobListResponse,
+    JobStatus,
+    JobResult,
+    JobError,
+    JobDegradation,
+    JobStatusRequest,
+    JobStatusSummary,
+    JobStatusBatchResponse
+)
+from app.core.eta import ETAEstimator
 from app.core.queue import JobQueue
 from app.core.redis import get_redis
 from app.core.storage import storage_service
@@ -14,14 +25,16 @@ def get_queue() -> JobQueue:
     return JobQueue(get_redis())
 
 
-def format_job_response(job: dict) -> JobResponse:
+def format_job_response(job: dict, estimated_time: Optional[int] = None) -> JobResponse:
     result = None
     if job.get("result"):
         result = JobResult(
             glb_url=job["result"].get("glb_url"),
             ply_url=job["result"].get("ply_url"),
             preview_url=job["result"].get("preview_url"),
-            file_sizes=job["result"].get("file_sizes")
+            file_sizes=job["result"].get("file_sizes"),
+            export_timings=job["result"].get("export_timings"),
+            glb_variants=job["result"].get("glb_variants")
         )
 
     error = None
@@ -32,6 +45,10 @@ def format_job_response(job: dict) -> JobResponse:
             recoverable=job["error"].get("recoverable", False)
         )
 
+    degradation = None
+    if job.get("degradation"):
+        degradation = JobDegradation(**job["degradation"])
+
     input_data = None
     if job.get("input_data"):
         input_data = {
@@ -53,9 +70,39 @@ def format_job_response(job: dict) -> JobResponse:
         completed_at=job.get("completed_at"),
         input=input_data,
         result=result,
-        error=error
+        error=error,
+        degradation=degradation,
+        estimated_time=estimated_time
+    )
+
+
+@router.post("/status", response_model=JobStatusBatchResponse)
+async def get_job_statuses(
+    request: JobStatusRequest,
+    queue: JobQueue = Depends(get_queue)
+):
+    job_ids = list(dict.fromkeys(request.job_ids))
+    jobs = await queue.get_jobs(
+        job_ids,
+        fields=["job_id", "status", "progress", "stage", "stage_progress"]
     )
 
+    summaries = []
+    missing = []
+    for job_id, job in zip(job_ids, jobs):
+        if not job or "status" not in job:
+            missing.append(job_id)
+            continue
+        summaries.append(JobStatusSummary(
+            job_id=job_id,
+            status=JobStatus(job["status"]),
+            progress=job.get("progress", 0),
+            stage=job.get("stage"),
+            stage_progress=job.get("stage_progress", 0)
+        ))
+
+    return JobStatusBatchResponse(jobs=summaries, missing=missing)
+
 
 @router.get("/{job_id}", response_model=JobResponse)
 async def get_job(
@@ -66,7 +113,7 @@ async def get_job(
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    return format_job_response(job)
+    return format_job_response(job, await ETAEstimator(queue).estimate(job))
 
 
 @router.delete("/{job_id}")
@@ -78,13 +125,22 @@ async def cancel_job(
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    cancelled = await queue.cancel_job(job_id)
-    if not cancelled:
+    outcome = await queue.cancel_job(job_id)
+    if not outcome:
         raise HTTPException(
             status_code=400,
             detail=f"Cannot cancel job in status: {job['status']}"
         )
 
+    if outcome == "detached":
+        # Identical requests share the job through the result cache; it
+        # keeps running until the last of them cancels.
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "message": "Job is shared with other requests and keeps running"
+        }
+
     return {"job_id": job_id, "status": "cancelled", "message": "Job cancelled successfully"}
 
 
@@ -94,12 +150,11 @@ async def list_jobs(
     queue: JobQueue = Depends(get_queue)
 ):
     pending_job_ids = await queue.get_pending_jobs(limit=limit)
-    jobs = []
-
-    for job_id in pending_job_ids:
-        job = await queue.get_job(job_id)
-        if job:
-            jobs.append(format_job_response(job))
+    jobs = [
+        format_job_response(job)
+        for job in await queue.get_jobs(pending_job_ids)
+        if job
+    ]
 
     queue_size = await queue.get_queue_size()
 
@@ -0,0 +1,36 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.api.websocket.manager import manager
+from app.core import metrics
+from app.core.queue import JobQueue
+from app.core.redis import get_redis_if_ready
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    # API-process series plus the snapshot each live worker publishes next
+    # to its heartbeat, labelled with the worker id.
+    metrics.websocket_connections.set(manager.connection_count())
+    metrics.websocket_jobs_watched.set(len(manager.get_watched_jobs()))
+
+    sources = []
+    redis_client = get_redis_if_ready()
+    if redis_client is not None:
+        try:
+            queue = JobQueue(redis_client)
+            backlog = await queue.get_backlog()
+            metrics.queue_depth.set(backlog["queue_depth"])
+            metrics.queue_oldest_age.set(round(backlog["oldest_age"], 3))
+
+            worker_ids = [w["worker_id"] for w in await queue.get_workers()]
+            metrics.workers_live.set(len(worker_ids))
+            snapshots = await queue.get_worker_metrics(worker_ids)
+            sources = [({"worker": worker_id}, snapshot) for worker_id, snapshot in snapshots.items()]
+        except Exception as e:
+            print(f"Failed to collect queue metrics: {e}")
+
+    body = metrics.registry.render([({}, metrics.registry.snapshot())] + sources)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
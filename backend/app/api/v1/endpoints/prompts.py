@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
 
 from app.api.v1.schemas import PromptEnhanceRequest, PromptEnhanceResponse, LLMProvider
+from app.core.redis import get_redis_if_ready
+from app.services.llm.cache import prompt_cache
 from app.services.llm.ollama import OllamaProvider
 from app.services.llm.groq import GroqProvider
 
@@ -12,17 +14,15 @@ groq_provider = GroqProvider()
 
 @router.post("/enhance", response_model=PromptEnhanceResponse)
 async def enhance_prompt(request: PromptEnhanceRequest):
+    provider = ollama_provider if request.provider == LLMProvider.OLLAMA else groq_provider
+
     try:
-        if request.provider == LLMProvider.OLLAMA:
-            enhanced, model_used = await ollama_provider.enhance_prompt(
-                request.prompt,
-                model=request.model
-            )
-        else:
-            enhanced, model_used = await groq_provider.enhance_prompt(
-                request.prompt,
-                model=request.model
-            )
+        enhanced, model_used = await prompt_cache.enhance(
+            provider,
+            request.prompt,
+            model=request.model,
+            redis_client=get_redis_if_ready()
+        )
 
         return PromptEnhanceResponse(
             original_prompt=request.prompt,
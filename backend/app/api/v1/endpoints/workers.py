@@ -0,0 +1,33 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends
+
+from app.api.v1.schemas import WorkerInfo, WorkerListResponse
+from app.core.queue import JobQueue
+from app.core.redis import get_redis
+
+router = APIRouter(prefix="/workers", tags=["workers"])
+
+
+def get_queue() -> JobQueue:
+    return JobQueue(get_redis())
+
+
+def format_worker(record: dict, now: datetime) -> WorkerInfo:
+    heartbeat_age = None
+    if record.get("updated_at"):
+        heartbeat_age = round((now - datetime.fromisoformat(record["updated_at"])).total_seconds(), 1)
+    return WorkerInfo(**{**record, "heartbeat_age": heartbeat_age})
+
+
+@router.get("", response_model=WorkerListResponse)
+async def list_workers(
+    queue: JobQueue = Depends(get_queue)
+):
+    now = datetime.utcnow()
+    workers = [format_worker(record, now) for record in await queue.get_workers()]
+
+    return WorkerListResponse(
+        workers=workers,
+        total=len(workers),
+        busy=sum(1 for w in workers if w.current_job)
+    )
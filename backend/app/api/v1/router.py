@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import generate, jobs, prompts, download, health
+from app.api.v1.endpoints import generate, jobs, prompts, download, health, workers
 
 api_router = APIRouter()
 
@@ -9,3 +9,4 @@ api_router.include_router(jobs.router)
 api_router.include_router(prompts.router)
 api_router.include_router(download.router)
 api_router.include_router(health.router)
+api_router.include_router(workers.router)
@@ -10,8 +10,16 @@ from app.api.v1.schemas.job import (
     JobStatus,
     JobResult,
     JobError,
+    JobDegradation,
     JobResponse,
-    JobListResponse
+    JobListResponse,
+    JobStatusRequest,
+    JobStatusSummary,
+    JobStatusBatchResponse
+)
+from app.api.v1.schemas.worker import (
+    WorkerInfo,
+    WorkerListResponse
 )
 from app.api.v1.schemas.prompt import (
     PromptEnhanceRequest,
@@ -28,8 +36,14 @@ __all__ = [
     "JobStatus",
     "JobResult",
     "JobError",
+    "JobDegradation",
     "JobResponse",
     "JobListResponse",
+    "JobStatusRequest",
+    "JobStatusSummary",
+    "JobStatusBatchResponse",
+    "WorkerInfo",
+    "WorkerListResponse",
     "PromptEnhanceRequest",
     "PromptEnhanceResponse"
 ]
@@ -44,6 +44,7 @@ class GenerationResponse(BaseModel):
     created_at: str
     estimated_time: int
     websocket_url: str
+    cache_hit: Optional[str] = None
 
     class Config:
         json_schema_extra = {
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 from enum import Enum
 
@@ -9,6 +9,8 @@ class JobStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
     CANCELLED = "cancelled"
+    # Completed, but its artifacts were evicted under the disk quota.
+    EXPIRED = "expired"
 
 
 class JobResult(BaseModel):
@@ -16,6 +18,8 @@ class JobResult(BaseModel):
     ply_url: Optional[str] = None
     preview_url: Optional[str] = None
     file_sizes: Optional[Dict[str, int]] = None
+    export_timings: Optional[Dict[str, float]] = None
+    glb_variants: Optional[List[str]] = None
 
 
 class JobError(BaseModel):
@@ -24,6 +28,16 @@ class JobError(BaseModel):
     recoverable: bool = False
 
 
+class JobDegradation(BaseModel):
+    level: int
+    queue_depth: int
+    oldest_age: float
+    sparse_structure_steps: int
+    slat_steps: int
+    texture_size: int
+    simplify: float
+
+
 class JobInput(BaseModel):
     type: str
     prompt: Optional[str] = None
@@ -44,9 +58,28 @@ class JobResponse(BaseModel):
     input: Optional[JobInput] = None
     result: Optional[JobResult] = None
     error: Optional[JobError] = None
+    degradation: Optional[JobDegradation] = None
+    estimated_time: Optional[int] = None
 
 
 class JobListResponse(BaseModel):
     jobs: List[JobResponse]
     total: int
     queue_size: int
+
+
+class JobStatusRequest(BaseModel):
+    job_ids: List[str] = Field(..., min_length=1, max_length=200)
+
+
+class JobStatusSummary(BaseModel):
+    job_id: str
+    status: JobStatus
+    progress: int = 0
+    stage: Optional[str] = None
+    stage_progress: int = 0
+
+
+class JobStatusBatchResponse(BaseModel):
+    jobs: List[JobStatusSummary]
+    missing: List[str]
@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any, List
+
+
+class WorkerInfo(BaseModel):
+    worker_id: str
+    host: Optional[str] = None
+    pid: Optional[int] = None
+    job_types: List[str] = []
+    current_job: Optional[str] = None
+    batch_size: int = 0
+    stage: Optional[str] = None
+    job_elapsed: Optional[float] = None
+    pipelines: Optional[Dict[str, Any]] = None
+    started_at: Optional[str] = None
+    uptime: Optional[float] = None
+    jobs_completed: int = 0
+    jobs_failed: int = 0
+    updated_at: Optional[str] = None
+    heartbeat_age: Optional[float] = None
+
+
+class WorkerListResponse(BaseModel):
+    workers: List[WorkerInfo]
+    total: int
+    busy: int
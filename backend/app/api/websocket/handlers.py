@@ -4,14 +4,15 @@ import json
 import asyncio
 
 from app.api.websocket.manager import manager
+from app.api.websocket.subscriber import job_snapshot_message, TERMINAL_MESSAGE_TYPES
 from app.core.queue import JobQueue
 from app.core.redis import get_redis
 
 
 async def websocket_endpoint(websocket: WebSocket, job_id: str):
+    # Registering before the snapshot read means an event published in
+    # between is still delivered by the shared subscriber.
     await manager.connect(websocket, job_id)
-    last_progress = -1
-    last_status = None
 
     try:
         queue = JobQueue(get_redis())
@@ -25,8 +26,6 @@ async def websocket_endpoint(websocket: WebSocket, job_id: str):
                 "progress": job.get("progress", 0),
                 "timestamp": datetime.utcnow().isoformat()
             })
-            last_progress = job.get("progress", 0)
-            last_status = job["status"]
         else:
             await manager.send_message(websocket, {
                 "type": "error",
@@ -36,52 +35,10 @@ async def websocket_endpoint(websocket: WebSocket, job_id: str):
             })
             return
 
-        async def poll_job_status():
-            nonlocal last_progress, last_status
-            while True:
-                try:
-                    job = await queue.get_job(job_id)
-                    if not job:
-                        break
-
-                    current_progress = job.get("progress", 0)
-                    current_status = job["status"]
-
-                    if current_progress != last_progress or current_status != last_status:
-                        last_progress = current_progress
-                        last_status = current_status
-
-                        if current_status == "completed":
-                            await manager.send_message(websocket, {
-                                "type": "completion",
-                                "job_id": job_id,
-                                "result": job.get("result"),
-                                "timestamp": datetime.utcnow().isoformat()
-                            })
-                            return
-                        elif current_status == "failed":
-                            await manager.send_message(websocket, {
-                                "type": "error",
-                                "job_id": job_id,
-                                "error": job.get("error", {"code": "UNKNOWN", "message": "Job failed"}),
-                                "timestamp": datetime.utcnow().isoformat()
-                            })
-                            return
-                        else:
-                            await manager.send_message(websocket, {
-                                "type": "progress_update",
-                                "job_id": job_id,
-                                "status": current_status,
-                                "progress": current_progress,
-                                "stage": job.get("stage"),
-                                "stage_progress": job.get("stage_progress", 0),
-                                "timestamp": datetime.utcnow().isoformat()
-                            })
-
-                    await asyncio.sleep(0.5)
-                except Exception as e:
-                    print(f"Polling error: {e}")
-                    break
+        snapshot = job_snapshot_message(job)
+        if snapshot["type"] in TERMINAL_MESSAGE_TYPES:
+            await manager.send_message(websocket, snapshot)
+            return
 
         async def handle_messages():
             while True:
@@ -106,11 +63,11 @@ async def websocket_endpoint(websocket: WebSocket, job_id: str):
                 except Exception:
                     break
 
-        poll_task = asyncio.create_task(poll_job_status())
+        finished_task = asyncio.create_task(manager.wait_finished(job_id))
         message_task = asyncio.create_task(handle_messages())
 
         done, pending = await asyncio.wait(
-            [poll_task, message_task],
+            [finished_task, message_task],
             return_when=asyncio.FIRST_COMPLETED
         )
 
@@ -1,12 +1,15 @@
 from fastapi import WebSocket
-from typing import Dict, Set, Any
+from typing import Dict, Set, Any, List
 import json
 import asyncio
 
+from app.config import settings
+
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, Set[WebSocket]] = {}
+        self.finished: Dict[str, asyncio.Event] = {}
         self._lock = asyncio.Lock()
 
     async def connect(self, websocket: WebSocket, job_id: str):
@@ -14,6 +17,7 @@ class ConnectionManager:
         async with self._lock:
             if job_id not in self.active_connections:
                 self.active_connections[job_id] = set()
+                self.finished[job_id] = asyncio.Event()
             self.active_connections[job_id].add(websocket)
 
     async def disconnect(self, websocket: WebSocket, job_id: str):
@@ -22,6 +26,23 @@ class ConnectionManager:
                 self.active_connections[job_id].discard(websocket)
                 if not self.active_connections[job_id]:
                     del self.active_connections[job_id]
+                    self.finished.pop(job_id, None)
+
+    def mark_finished(self, job_id: str):
+        event = self.finished.get(job_id)
+        if event:
+            event.set()
+
+    async def wait_finished(self, job_id: str):
+        event = self.finished.get(job_id)
+        if event:
+            await event.wait()
+
+    def get_watched_jobs(self) -> List[str]:
+        return list(self.active_connections.keys())
+
+    def connection_count(self) -> int:
+        return sum(len(connections) for connections in self.active_connections.values())
 
     async def send_message(self, websocket: WebSocket, message: Dict[str, Any]):
         try:
@@ -30,20 +51,38 @@ class ConnectionManager:
             pass
 
     async def broadcast_to_job(self, job_id: str, message: Dict[str, Any]):
+        # Runs inside the shared subscriber loop, so sockets are sent to
+        # concurrently and a client that stalls past WEBSOCKET_SEND_TIMEOUT
+        # is dropped instead of holding up every other job's progress.
         async with self._lock:
-            connections = self.active_connections.get(job_id, set()).copy()
+            connections = list(self.active_connections.get(job_id, set()))
 
-        disconnected = set()
-        for connection in connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                disconnected.add(connection)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(connection.send_json(message), settings.WEBSOCKET_SEND_TIMEOUT) for connection in connections),
+            return_exceptions=True
+        )
+        disconnected = {
+            connection for connection, result in zip(connections, results)
+            if isinstance(result, BaseException)
+        }
 
         if disconnected:
             async with self._lock:
                 if job_id in self.active_connections:
                     self.active_connections[job_id] -= disconnected
+                    if not self.active_connections[job_id]:
+                        del self.active_connections[job_id]
+                        self.finished.pop(job_id, None)
+            for connection in disconnected:
+                asyncio.create_task(self._close(connection))
+
+    async def _close(self, websocket: WebSocket):
+        # Ends the handler's receive loop so the client reconnects and
+        # resyncs from the snapshot.
+        try:
+            await asyncio.wait_for(websocket.close(code=1011), settings.WEBSOCKET_SEND_TIMEOUT)
+        except BaseException:
+            pass
 
     def get_connection_count(self, job_id: str) -> int:
         return len(self.active_connections.get(job_id, set()))
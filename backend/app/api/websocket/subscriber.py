@@ -0,0 +1,149 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import redis.asyncio as redis
+
+from app.api.websocket.manager import ConnectionManager, manager
+from app.config import settings
+from app.core.artifacts import ARTIFACTS_EXPIRED_EVENT, artifact_index
+from app.core.queue import JobQueue
+
+PROGRESS_PATTERN = "job:*:progress"
+# Cancellations arrive as "error" events with status "cancelled".
+TERMINAL_MESSAGE_TYPES = ["completion", "error"]
+
+
+def job_expired_message(job_id: str) -> Dict[str, Any]:
+    return {
+        "type": "error",
+        "job_id": job_id,
+        "error": {"code": "JOB_NOT_FOUND", "message": "Job expired"},
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+def job_snapshot_message(job: Dict[str, Any]) -> Dict[str, Any]:
+    message = {
+        "job_id": job["job_id"],
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+    if job["status"] == "completed":
+        message.update({
+            "type": "completion",
+            "status": "completed",
+            "result": job.get("result"),
+            "degradation": job.get("degradation")
+        })
+    elif job["status"] in ["failed", "cancelled", "expired"]:
+        message.update({
+            "type": "error",
+            "status": job["status"],
+            "error": job.get("error") or {"code": job["status"].upper(), "message": f"Job {job['status']}"}
+        })
+    else:
+        message.update({
+            "type": "progress_update",
+            "status": job["status"],
+            "progress": job.get("progress", 0),
+            "stage": job.get("stage"),
+            "stage_progress": job.get("stage_progress", 0)
+        })
+        if job.get("eta_at"):
+            message["eta"] = max(0, round(job["eta_at"] - time.time()))
+
+    return message
+
+
+class ProgressSubscriber:
+    # One pattern subscription per API process fans worker progress out to
+    # every socket watching a job, so Redis load does not grow with sockets.
+    def __init__(self, connection_manager: ConnectionManager = manager):
+        self.manager = connection_manager
+        self.redis: Optional[redis.Redis] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, redis_client: redis.Redis):
+        self.redis = redis_client
+        self._tasks = [asyncio.create_task(self._run())]
+        if settings.WEBSOCKET_RESYNC_INTERVAL > 0:
+            self._tasks.append(asyncio.create_task(self._resync_periodically()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def dispatch(self, job_id: str, message: Dict[str, Any]):
+        if message.get("type") == ARTIFACTS_EXPIRED_EVENT:
+            artifact_index.forget(job_id)
+            return
+        await self.manager.broadcast_to_job(job_id, message)
+        if message.get("type") in TERMINAL_MESSAGE_TYPES:
+            self.manager.mark_finished(job_id)
+
+    async def resync(self):
+        # Events published while we were not subscribed are lost, so watched
+        # jobs are polled once after every (re)subscribe. A job whose record
+        # has expired never publishes again and ends its sockets here.
+        queue = JobQueue(self.redis)
+        job_ids = self.manager.get_watched_jobs()
+        for job_id, job in zip(job_ids, await queue.get_jobs(job_ids)):
+            if job:
+                await self.dispatch(job_id, job_snapshot_message(job))
+            else:
+                await self.dispatch(job_id, job_expired_message(job_id))
+
+    async def _resync_periodically(self):
+        # One pipelined read of every watched job per interval, a backstop
+        # for lost events and expired records rather than a progress source.
+        while True:
+            await asyncio.sleep(settings.WEBSOCKET_RESYNC_INTERVAL)
+            try:
+                await self.resync()
+            except Exception as e:
+                print(f"Progress resync failed: {e}")
+
+    async def _run(self):
+        backoff = 0.5
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(PROGRESS_PATTERN)
+                await self.resync()
+                backoff = 0.5
+
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+
+                    channel = message["channel"]
+                    channel = channel.decode() if isinstance(channel, bytes) else channel
+                    job_id = channel[len("job:"):-len(":progress")]
+
+                    try:
+                        payload = json.loads(message["data"])
+                    except (TypeError, ValueError):
+                        continue
+
+                    await self.dispatch(job_id, payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Progress subscription error: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 10)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+
+progress_subscriber = ProgressSubscriber()
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional, List
+from typing import Optional, Dict, List
 from functools import lru_cache
 
 
@@ -20,13 +20,38 @@ class Settings(BaseSettings):
     UPLOADS_PATH: str = "/app/storage/uploads"
     OUTPUTS_PATH: str = "/app/storage/outputs"
     PREVIEWS_PATH: str = "/app/storage/previews"
+    STORAGE_FANOUT_LEVELS: int = 2
+    STORAGE_BACKEND: str = "local"
+    S3_ENDPOINT_URL: str = "http://minio:9000"
+    S3_PUBLIC_URL: Optional[str] = None
+    S3_BUCKET: str = "trellis"
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY: str = ""
+    S3_SECRET_KEY: str = ""
+    DOWNLOAD_URL_TTL: int = 300
 
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
     ALLOWED_IMAGE_TYPES: List[str] = ["image/png", "image/jpeg", "image/webp"]
 
     TRELLIS_MODEL_PATH: str = "microsoft/TRELLIS-image-large"
     TRELLIS_TEXT_MODEL_PATH: str = "microsoft/TRELLIS-text-large"
     TRELLIS_DEVICE: str = "cuda"
+    EXPORT_MAX_WORKERS: int = 3
+    PIPELINE_MEMORY_BUDGET_MB: int = 0
+    PIPELINE_MEMORY_ESTIMATE_MB: int = 0
+    GLB_VARIANTS: List[str] = []
+    GLB_PRECOMPRESS: bool = False
+    GLB_POSITION_BITS: int = 14
+    GLB_TEXCOORD_BITS: int = 12
+    GLB_TEXTURE_QUALITY: int = 85
+    ARTIFACT_INDEX_SIZE: int = 10000
+    ARTIFACT_TOUCH_INTERVAL: int = 60
+    ARTIFACT_DISK_QUOTA_MB: int = 0
+    ARTIFACT_GC_INTERVAL: int = 600
+    ARTIFACT_GC_BATCH: int = 100
+    ARTIFACT_GC_PAUSE: float = 0.05
+    ARTIFACT_GC_MIN_AGE: int = 3600
 
     OLLAMA_BASE_URL: str = "http://ollama:11434"
     OLLAMA_DEFAULT_MODEL: str = "llama3.2"
@@ -34,11 +59,58 @@ class Settings(BaseSettings):
     GROQ_API_KEY: Optional[str] = None
     GROQ_DEFAULT_MODEL: str = "llama-3.3-70b-versatile"
 
+    OLLAMA_MAX_CONCURRENCY: int = 4
+    GROQ_MAX_CONCURRENCY: int = 8
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    HTTP_MAX_RETRIES: int = 2
+    HTTP_RETRY_BACKOFF: float = 0.5
+
+    PROMPT_CACHE_MAX_ENTRIES: int = 1024
+    PROMPT_CACHE_TTL: int = 7 * 24 * 3600
+
     JOB_TIMEOUT: int = 600
+    JOB_STAGE_TIMEOUT: int = 300
+    JOB_STAGE_TIMEOUTS: Dict[str, int] = {"enhancing_prompt": 60}
+    JOB_TIMEOUT_GRACE: int = 30
     JOB_RETENTION_HOURS: int = 24
 
     WORKER_COUNT: int = 1
+    WORKER_DEVICES: List[str] = []
+    WORKER_CPU_SETS: List[str] = []
+    WORKER_RESTART_BACKOFF: float = 1.0
+    WORKER_RESTART_BACKOFF_MAX: float = 60.0
+    WORKER_DRAIN_TIMEOUT: int = 600
     WORKER_QUEUE_NAME: str = "trellis_jobs"
+    WORKER_ID: Optional[str] = None
+    WORKER_JOB_TYPES: List[str] = ["text_to_3d", "image_to_3d"]
+    WORKER_LOOP_LAG_INTERVAL: float = 0.1
+    CLAIM_SCAN_LIMIT: int = 50
+
+    JOB_LEASE_SECONDS: int = 30
+    JOB_HEARTBEAT_INTERVAL: int = 10
+    JOB_REAPER_INTERVAL: int = 15
+    JOB_MAX_RETRIES: int = 3
+
+    RESULT_CACHE_ENABLED: bool = True
+
+    PROGRESS_FLUSH_INTERVAL: float = 0.25
+    WEBSOCKET_RESYNC_INTERVAL: float = 30.0
+    WEBSOCKET_SEND_TIMEOUT: float = 5.0
+
+    SCHEDULER_POLICY: str = "sjf"
+    SCHEDULER_COST_WEIGHT: float = 5.0
+    SCHEDULER_BASE_COST: float = 20.0
+    SCHEDULER_STEP_COST: float = 4.0
+
+    BATCH_MAX_SIZE: int = 1
+    BATCH_WINDOW: float = 0.5
+
+    OVERLOAD_MODE_ENABLED: bool = False
+    OVERLOAD_QUEUE_DEPTH: int = 20
+    OVERLOAD_OLDEST_AGE: float = 300.0
+    OVERLOAD_MAX_LEVEL: int = 3
+
+    ETA_SMOOTHING: float = 0.2
 
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173"]
 
@@ -0,0 +1,416 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+import redis.asyncio as redis
+
+from app.config import settings
+from app.core import metrics
+from app.core.artifacts import ARTIFACTS_EXPIRED_EVENT, ArtifactIndex, artifact_index
+from app.core.storage import StorageService, storage_service
+
+
+USAGE_LRU_KEY = "artifacts:lru"
+USAGE_SIZES_KEY = "artifacts:sizes"
+USAGE_TOTAL_KEY = "artifacts:bytes"
+GC_LOCK_KEY = "artifacts:gc:lock"
+GC_CURSOR_KEY = "artifacts:gc:cursor"
+SWEEP_PREFIXES = ("outputs", "previews", "uploads")
+FINISHED_STATUSES = ("completed", "failed", "cancelled", "expired")
+
+# KEYS: lru, sizes, total. ARGV: job_id, size, timestamp. Registering the
+# same job twice keeps its first size and last access.
+REGISTER_SCRIPT = """
+if redis.call('HSETNX', KEYS[2], ARGV[1], ARGV[2]) == 1 then
+    redis.call('INCRBY', KEYS[3], ARGV[2])
+end
+redis.call('ZADD', KEYS[1], 'NX', ARGV[3], ARGV[1])
+return 1
+"""
+
+# KEYS: lru, sizes, total. ARGV: job ids. Returns the bytes they held.
+UNREGISTER_SCRIPT = """
+local freed = 0
+for i = 1, #ARGV do
+    local size = tonumber(redis.call('HGET', KEYS[2], ARGV[i]))
+    if size then
+        freed = freed + size
+        redis.call('HDEL', KEYS[2], ARGV[i])
+    end
+    redis.call('ZREM', KEYS[1], ARGV[i])
+end
+if freed > 0 then
+    redis.call('DECRBY', KEYS[3], freed)
+end
+return freed
+"""
+
+# KEYS: job hash. ARGV: timestamp. Marks a job whose artifacts were evicted
+# so its record no longer points at them; a record that is already gone is
+# left gone.
+EVICT_JOB_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', 'expired', 'result', '', 'expired_at', ARGV[1])
+return 1
+"""
+
+RENEW_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Job ids this process recently bumped, so repeat downloads of a hot
+# artifact cost no Redis writes.
+_recent_touches: "OrderedDict[str, float]" = OrderedDict()
+
+
+def _decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class ArtifactUsage:
+    # Ledger of stored jobs: total bytes per job and when each was last
+    # downloaded (or completed), which is the order quota eviction uses.
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+        self._register_script = self.redis.register_script(REGISTER_SCRIPT)
+        self._unregister_script = self.redis.register_script(UNREGISTER_SCRIPT)
+
+    async def register(self, job_id: str, size: int, accessed_at: Optional[float] = None):
+        await self._register_script(
+            keys=[USAGE_LRU_KEY, USAGE_SIZES_KEY, USAGE_TOTAL_KEY],
+            args=[job_id, int(size), accessed_at or time.time()]
+        )
+
+    async def unregister(self, job_ids: List[str]) -> int:
+        if not job_ids:
+            return 0
+        return int(await self._unregister_script(
+            keys=[USAGE_LRU_KEY, USAGE_SIZES_KEY, USAGE_TOTAL_KEY],
+            args=job_ids
+        ))
+
+    async def touch(self, job_id: str):
+        now = time.monotonic()
+        last = _recent_touches.get(job_id)
+        if last is not None and now - last < settings.ARTIFACT_TOUCH_INTERVAL:
+            return
+        _recent_touches[job_id] = now
+        _recent_touches.move_to_end(job_id)
+        while len(_recent_touches) > settings.ARTIFACT_INDEX_SIZE:
+            _recent_touches.popitem(last=False)
+        # XX: only jobs the ledger knows, so expired ones are not revived.
+        await self.redis.zadd(USAGE_LRU_KEY, {job_id: time.time()}, xx=True)
+
+    async def total(self) -> int:
+        return int(await self.redis.get(USAGE_TOTAL_KEY) or 0)
+
+    async def least_recent(self, count: int) -> List[str]:
+        return [_decode(job_id) for job_id in await self.redis.zrange(USAGE_LRU_KEY, 0, count - 1)]
+
+
+def path_size(path: Path) -> int:
+    if path.is_dir():
+        return sum(child.stat().st_size for child in path.rglob("*") if child.is_file())
+    return path.stat().st_size
+
+
+def remove_path(path: Path) -> int:
+    # Bytes freed; 0 when something else removed it first.
+    try:
+        size = path_size(path)
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+    except FileNotFoundError:
+        return 0
+    return size
+
+
+class ArtifactCollector:
+    # Background GC run by every API process, one at a time through a Redis
+    # lock. Each pass:
+    #   1. deletes artifacts of ledger jobs whose job record has expired,
+    #   2. sweeps the local storage directories (one shard directory per
+    #      step, resuming from a cursor in Redis) for files of expired or
+    #      failed jobs the ledger never saw, and for uploads of jobs that
+    #      have finished,
+    #   3. evicts least recently downloaded jobs while the ledger is above
+    #      ARTIFACT_DISK_QUOTA_MB, marking their records "expired".
+    # Steps touch at most ARTIFACT_GC_BATCH entries and file I/O runs in a
+    # thread, so neither the event loop nor the disk stalls for long.
+    def __init__(self, storage: StorageService = storage_service, index: ArtifactIndex = artifact_index):
+        self.storage = storage
+        self.index = index
+        self.redis: Optional[redis.Redis] = None
+        self.usage: Optional[ArtifactUsage] = None
+        self.token = uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, redis_client: redis.Redis):
+        self.redis = redis_client
+        self.usage = ArtifactUsage(redis_client)
+        self._evict_job_script = redis_client.register_script(EVICT_JOB_SCRIPT)
+        if settings.ARTIFACT_GC_INTERVAL > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                if await self.acquire():
+                    await self.collect()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Artifact GC pass failed: {e}")
+            await asyncio.sleep(settings.ARTIFACT_GC_INTERVAL)
+
+    def lock_ttl(self) -> int:
+        return int(max(settings.ARTIFACT_GC_INTERVAL * 2, 60))
+
+    async def acquire(self) -> bool:
+        # Held across passes by the process that took it, renewed each step.
+        if await self.redis.set(GC_LOCK_KEY, self.token, nx=True, ex=self.lock_ttl()):
+            return True
+        return await self.renew()
+
+    async def renew(self) -> bool:
+        renewed = await self.redis.eval(RENEW_LOCK_SCRIPT, 1, GC_LOCK_KEY, self.token, self.lock_ttl())
+        return bool(renewed)
+
+    async def pause(self):
+        if not await self.renew():
+            raise RuntimeError("Artifact GC lock was lost")
+        if settings.ARTIFACT_GC_PAUSE:
+            await asyncio.sleep(settings.ARTIFACT_GC_PAUSE)
+
+    async def expired(self, job_ids: List[str]) -> List[str]:
+        pipe = self.redis.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.exists(f"job:{job_id}")
+        return [job_id for job_id, exists in zip(job_ids, await pipe.execute()) if not exists]
+
+    async def invalidate(self, job_ids: List[str]):
+        # Every API process caches manifests; the progress subscriber drops
+        # them on this event, so none keeps serving deleted artifacts.
+        pipe = self.redis.pipeline(transaction=False)
+        for job_id in job_ids:
+            self.index.forget(job_id)
+            pipe.publish(f"job:{job_id}:progress", json.dumps({
+                "type": ARTIFACTS_EXPIRED_EVENT,
+                "job_id": job_id,
+                "timestamp": datetime.utcnow().isoformat()
+            }))
+        await pipe.execute()
+
+    async def discard(self, job_ids: List[str]) -> int:
+        # Removes jobs everywhere the backend keeps them; returns the bytes
+        # the ledger had for them.
+        for job_id in job_ids:
+            await asyncio.to_thread(self.storage.cleanup_job, job_id)
+        await self.invalidate(job_ids)
+        return await self.usage.unregister(job_ids)
+
+    async def evict(self, job_id: str) -> int:
+        # The job record outlives the eviction, so it is marked first; a
+        # download racing with the deletion then fails on the record rather
+        # than a half-deleted job.
+        await self._evict_job_script(keys=[f"job:{job_id}"], args=[datetime.utcnow().isoformat()])
+        return await self.discard([job_id])
+
+    async def collect(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        stats = {
+            "scanned": {"ledger": 0, **{prefix: 0 for prefix in SWEEP_PREFIXES}},
+            "directories": 0,
+            "reclaimed": {"expired": 0, "uploads": 0, "evicted": 0},
+            "seconds": 0.0
+        }
+
+        await self.expire_tracked(stats)
+        await self.sweep(stats)
+        await self.enforce_quota(stats)
+
+        stats["seconds"] = time.monotonic() - started
+        scanned = sum(stats["scanned"].values())
+        rate = scanned / stats["seconds"] if stats["seconds"] else 0.0
+        for reason, size in stats["reclaimed"].items():
+            if size:
+                metrics.gc_reclaimed_bytes.inc(size, reason=reason)
+        for prefix, count in stats["scanned"].items():
+            if count:
+                metrics.gc_scanned.inc(count, prefix=prefix)
+        metrics.gc_scan_rate.set(round(rate, 1))
+        metrics.artifact_stored_bytes.set(await self.usage.total())
+
+        reclaimed = sum(stats["reclaimed"].values())
+        if reclaimed:
+            print(
+                f"Artifact GC reclaimed {reclaimed} bytes "
+                f"({', '.join(f'{r} {b}' for r, b in stats['reclaimed'].items() if b)}); "
+                f"scanned {scanned} entries in {stats['directories']} directories "
+                f"in {stats['seconds']:.1f}s ({rate:.0f}/s)"
+            )
+        return stats
+
+    async def expire_tracked(self, stats: Dict[str, Any]):
+        # Covers artifacts the local sweep cannot see (remote backends).
+        start = 0
+        while True:
+            job_ids = [
+                _decode(job_id)
+                for job_id in await self.redis.zrange(USAGE_LRU_KEY, start, start + settings.ARTIFACT_GC_BATCH - 1)
+            ]
+            if not job_ids:
+                return
+            expired = await self.expired(job_ids)
+            stats["scanned"]["ledger"] += len(job_ids)
+            stats["reclaimed"]["expired"] += await self.discard(expired)
+            start += len(job_ids) - len(expired)
+            await self.pause()
+
+    def sweep_locations(self) -> int:
+        # Leaf directories per prefix, plus the prefix root for flat
+        # entries not yet migrated.
+        return 256 ** self.storage.fanout_levels + 1 if self.storage.fanout_levels else 1
+
+    def location_path(self, prefix: str, location: int) -> Path:
+        root = self.storage.root_path(prefix)
+        if location == 0:
+            return root
+        digits = f"{location - 1:0{2 * self.storage.fanout_levels}x}"
+        return root.joinpath(*(digits[i:i + 2] for i in range(0, len(digits), 2)))
+
+    def list_location(self, prefix: str, location: int) -> Tuple[List[Tuple[str, float]], int]:
+        # (name, mtime) of the entries at a location, and how many locations
+        # to advance: a missing first-level shard skips all of its leaves.
+        path = self.location_path(prefix, location)
+        if not path.is_dir():
+            if location and self.storage.fanout_levels > 1 and not path.parent.is_dir():
+                leaves = 256 ** (self.storage.fanout_levels - 1)
+                return [], leaves - (location - 1) % leaves
+            return [], 1
+
+        entries = []
+        with os.scandir(path) as listing:
+            for entry in listing:
+                if entry.name.startswith("."):
+                    continue
+                if location == 0 and self.storage.fanout_levels and len(entry.name) == 2 and entry.is_dir():
+                    continue
+                try:
+                    entries.append((entry.name, entry.stat().st_mtime))
+                except FileNotFoundError:
+                    continue
+        return entries, 1
+
+    def scan_step(self, prefix: str, location: int, locations: int) -> Tuple[List[Tuple[Path, float]], int, int]:
+        # Lists up to ARTIFACT_GC_BATCH locations in one go: (path, mtime)
+        # of each entry, the next location and how many directories held
+        # entries.
+        entries, directories, visited = [], 0, 0
+        while visited < settings.ARTIFACT_GC_BATCH and location < locations:
+            listed, advance = self.list_location(prefix, location)
+            if listed:
+                directory = self.location_path(prefix, location)
+                entries.extend((directory / name, mtime) for name, mtime in listed)
+                directories += 1
+            location += advance
+            visited += 1
+        return entries, location, directories
+
+    async def sweep(self, stats: Dict[str, Any]):
+        cursor = _decode(await self.redis.get(GC_CURSOR_KEY)) or "0:0"
+        prefix_index, location = (int(part) for part in cursor.split(":"))
+        locations = self.sweep_locations()
+
+        while prefix_index < len(SWEEP_PREFIXES):
+            prefix = SWEEP_PREFIXES[prefix_index]
+            entries, location, directories = await asyncio.to_thread(self.scan_step, prefix, location, locations)
+            stats["directories"] += directories
+            stats["scanned"][prefix] += len(entries)
+            if entries:
+                await self.sweep_entries(prefix, entries, stats)
+
+            if location >= locations:
+                prefix_index, location = prefix_index + 1, 0
+            await self.redis.set(GC_CURSOR_KEY, f"{prefix_index}:{location}")
+            await self.pause()
+
+        await self.redis.set(GC_CURSOR_KEY, "0:0")
+
+    async def sweep_entries(self, prefix: str, entries: List[Tuple[Path, float]], stats: Dict[str, Any]):
+        now = time.time()
+        # Young entries may belong to a job being written right now.
+        entries = [(path, mtime) for path, mtime in entries if now - mtime >= settings.ARTIFACT_GC_MIN_AGE]
+
+        if prefix == "uploads":
+            # Uploads are named after their job. One is kept while that job
+            # is queued or running, however old, and freed once it has
+            # finished. Without a record (expired, or an upload named before
+            # uploads carried job ids) only age can tell.
+            job_ids = [path.name.split(".", 1)[0] for path, _ in entries]
+            pipe = self.redis.pipeline(transaction=False)
+            for job_id in job_ids:
+                pipe.hget(f"job:{job_id}", "status")
+            statuses = [_decode(status) for status in await pipe.execute()]
+            stale = [
+                path
+                for (path, mtime), status in zip(entries, statuses)
+                if status in FINISHED_STATUSES
+                or (status is None and now - mtime >= settings.JOB_RETENTION_HOURS * 3600)
+            ]
+            stats["reclaimed"]["uploads"] += await asyncio.to_thread(lambda: sum(map(remove_path, stale)))
+            return
+
+        paths = {path.name if prefix == "outputs" else path.name.rsplit(".", 1)[0]: path for path, _ in entries}
+        expired = await self.expired(list(paths))
+        if not expired:
+            return
+
+        await self.usage.unregister(expired)
+        stats["reclaimed"]["expired"] += await asyncio.to_thread(
+            lambda: sum(remove_path(paths[job_id]) for job_id in expired)
+        )
+        await self.invalidate(expired)
+
+    async def enforce_quota(self, stats: Dict[str, Any]):
+        quota = settings.ARTIFACT_DISK_QUOTA_MB * 1024 * 1024
+        if quota <= 0:
+            return
+
+        total = await self.usage.total()
+        while total > quota:
+            job_ids = await self.usage.least_recent(settings.ARTIFACT_GC_BATCH)
+            if not job_ids:
+                return
+            for job_id in job_ids:
+                freed = await self.evict(job_id)
+                stats["reclaimed"]["evicted"] += freed
+                total -= freed
+                if total <= quota:
+                    break
+            await self.pause()
+
+
+artifact_collector = ArtifactCollector()
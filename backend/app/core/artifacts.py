@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from app.config import settings
+from app.core.storage import storage_service
+from app.core.storage_backends import StorageError
+
+
+MANIFEST_NAME = "manifest.json"
+# Progress event published when a job's artifacts are deleted.
+ARTIFACTS_EXPIRED_EVENT = "artifacts_expired"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class Artifact(NamedTuple):
+    # path is None when the artifact is only in a remote backend.
+    path: Optional[Path]
+    size: int
+    etag: str
+    key: Optional[str] = None
+
+
+def file_etag(path: Path) -> str:
+    # Strong validator from the content, so identical bytes share an ETag
+    # across workers, restarts and CDN nodes.
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def manifest_key(job_id: str) -> str:
+    return f"outputs/{job_id}/{MANIFEST_NAME}"
+
+
+def write_manifest(job_id: str) -> Dict[str, Dict[str, object]]:
+    # Written by the worker after every artifact of a job is on disk and
+    # before the job is marked completed; artifacts are never rewritten, so
+    # readers may cache it indefinitely.
+    manifest = {}
+    for name, path in storage_service.list_artifacts(job_id).items():
+        manifest[name] = {"size": path.stat().st_size, "etag": file_etag(path)}
+
+    job_dir = storage_service.find_path(f"outputs/{job_id}")
+    job_dir.mkdir(parents=True, exist_ok=True)
+    temp_path = job_dir / f".{MANIFEST_NAME}.part"
+    temp_path.write_text(json.dumps(manifest))
+    os.replace(temp_path, job_dir / MANIFEST_NAME)
+    return manifest
+
+
+def publish_job(job_id: str) -> Dict[str, Dict[str, object]]:
+    # Writes the manifest and copies a finished job to a remote backend,
+    # manifest last so that its presence means every artifact is in place;
+    # the local copies are scratch after that.
+    manifest = write_manifest(job_id)
+    backend = storage_service.backend
+    if backend.is_local:
+        return manifest
+
+    for name in manifest:
+        backend.put_file(storage_service.artifact_key(job_id, name), storage_service.artifact_path(job_id, name))
+    backend.put_file(manifest_key(job_id), storage_service.find_path(manifest_key(job_id)))
+    storage_service.discard_local(job_id)
+    return manifest
+
+
+class ArtifactIndex:
+    # Per-process LRU of job manifests so downloads find, size and validate
+    # artifacts with a stat instead of a Redis round trip. Remote backends
+    # are trusted to hold whatever the manifest lists.
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.ARTIFACT_INDEX_SIZE
+        self._manifests: "OrderedDict[str, Dict[str, Dict[str, object]]]" = OrderedDict()
+        self._described: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _manifest(self, job_id: str) -> Optional[Dict[str, Dict[str, object]]]:
+        with self._lock:
+            manifest = self._manifests.get(job_id)
+            if manifest is not None:
+                self._manifests.move_to_end(job_id)
+                return manifest
+
+        try:
+            content = storage_service.backend.get_bytes(manifest_key(job_id))
+            manifest = json.loads(content) if content is not None else None
+        except (OSError, ValueError, StorageError):
+            return None
+        if manifest is None:
+            return None
+
+        with self._lock:
+            self._manifests[job_id] = manifest
+            while len(self._manifests) > self.max_entries:
+                self._manifests.popitem(last=False)
+        return manifest
+
+    def is_cached(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._manifests
+
+    def has_manifest(self, job_id: str) -> bool:
+        return self._valid_job_id(job_id) and self._manifest(job_id) is not None
+
+    def lookup(self, job_id: str, name: str) -> Optional[Artifact]:
+        # None when the job has no manifest or no such artifact, or when the
+        # file has since been deleted.
+        if not self._valid_job_id(job_id):
+            return None
+        manifest = self._manifest(job_id)
+        if manifest is None or name not in manifest:
+            return None
+
+        key = storage_service.artifact_key(job_id, name)
+        entry = manifest[name]
+        if not storage_service.backend.is_local:
+            return Artifact(None, int(entry["size"]), str(entry["etag"]), key)
+
+        path = storage_service.find_path(key)
+        if not path.exists():
+            self.forget(job_id)
+            return None
+        return Artifact(path, int(entry["size"]), str(entry["etag"]), key)
+
+    def describe(self, path: Path) -> Artifact:
+        # For outputs written before manifests existed: hashes the file once
+        # per (path, size, mtime).
+        stat = path.stat()
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            etag = self._described.get(key)
+        if etag is None:
+            etag = file_etag(path)
+            with self._lock:
+                self._described[key] = etag
+                while len(self._described) > self.max_entries:
+                    self._described.popitem(last=False)
+        return Artifact(path, stat.st_size, etag)
+
+    def forget(self, job_id: str):
+        with self._lock:
+            self._manifests.pop(job_id, None)
+
+    def _valid_job_id(self, job_id: str) -> bool:
+        return bool(job_id) and not job_id.startswith(".") and "/" not in job_id and "\\" not in job_id
+
+
+artifact_index = ArtifactIndex()
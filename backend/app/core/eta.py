@@ -0,0 +1,120 @@
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from app.config import settings
+from app.core.queue import JobQueue
+from app.core.scheduler import get_sampler_steps
+
+
+# Job durations assumed per resolution until a completed job has been seen.
+PRIOR_SECONDS = {"low": 60, "medium": 120, "high": 180}
+
+GLOBAL_STATS_KEY = "eta:all"
+
+# Folds each field/value pair in ARGV[2..] into an exponentially weighted
+# moving average with smoothing factor ARGV[1].
+UPDATE_SCRIPT = """
+local alpha = tonumber(ARGV[1])
+for i = 2, #ARGV, 2 do
+    local value = tonumber(ARGV[i + 1])
+    local old = tonumber(redis.call('HGET', KEYS[1], ARGV[i]))
+    if old then
+        value = old + alpha * (value - old)
+    end
+    redis.call('HSET', KEYS[1], ARGV[i], tostring(value))
+end
+redis.call('HINCRBY', KEYS[1], 'samples', 1)
+return 1
+"""
+
+
+def stats_key(job_type: str, parameters: Dict[str, Any]) -> str:
+    resolution = parameters.get("resolution") or "medium"
+    steps = (
+        get_sampler_steps(resolution, parameters.get("sparse_structure_sampler_params"))
+        + get_sampler_steps(resolution, parameters.get("slat_sampler_params"))
+    )
+    return f"eta:{job_type}:{resolution}:{steps}"
+
+
+def decode_stats(raw: Dict) -> Dict[str, float]:
+    return {
+        (k.decode() if isinstance(k, bytes) else k): float(v)
+        for k, v in (raw or {}).items()
+    }
+
+
+def expected_total(stats: Dict[str, float], parameters: Dict[str, Any]) -> float:
+    resolution = parameters.get("resolution") or "medium"
+    return stats.get("total") or PRIOR_SECONDS.get(resolution, PRIOR_SECONDS["medium"])
+
+
+def remaining_from_stage(stats: Dict[str, float], parameters: Dict[str, Any], stage: str, elapsed: float) -> float:
+    # Stages are learned as "seconds from this stage's start to completion",
+    # so no stage order is needed; unseen stages fall back to the total.
+    if f"rem:{stage}" in stats:
+        return stats[f"rem:{stage}"]
+    return max(expected_total(stats, parameters) - elapsed, 0.0)
+
+
+class ETAEstimator:
+    # Learns job durations from completed jobs and answers each estimate
+    # with at most one pipelined round trip.
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+        self.redis = queue.redis
+        self._update_script = self.redis.register_script(UPDATE_SCRIPT)
+
+    async def load(self, job_type: str, parameters: Dict[str, Any]) -> Dict[str, float]:
+        return decode_stats(await self.redis.hgetall(stats_key(job_type, parameters)))
+
+    async def record(
+        self,
+        job_type: str,
+        parameters: Dict[str, Any],
+        total: float,
+        remaining: Dict[str, float]
+    ):
+        alpha = settings.ETA_SMOOTHING
+        args = [alpha, "total", round(total, 3)]
+        for stage, seconds in remaining.items():
+            args.extend([f"rem:{stage}", round(seconds, 3)])
+
+        await self._update_script(keys=[stats_key(job_type, parameters)], args=args)
+        await self._update_script(keys=[GLOBAL_STATS_KEY], args=[alpha, "total", round(total, 3)])
+
+    async def estimate(self, job: Dict[str, Any]) -> Optional[int]:
+        # Seconds until the job is expected to finish, or None for jobs that
+        # will not finish.
+        status = job.get("status")
+        if status == "completed":
+            return 0
+        if status not in ["queued", "processing"]:
+            return None
+
+        parameters = job.get("parameters") or {}
+        now = time.time()
+
+        if status == "processing":
+            if job.get("eta_at"):
+                return max(0, round(job["eta_at"] - now))
+            stats = await self.load(job["job_type"], parameters)
+            elapsed = 0.0
+            if job.get("started_at"):
+                elapsed = (datetime.utcnow() - datetime.fromisoformat(job["started_at"])).total_seconds()
+            return max(0, round(expected_total(stats, parameters) - elapsed))
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hgetall(stats_key(job["job_type"], parameters))
+        pipe.hget(GLOBAL_STATS_KEY, "total")
+        pipe.zrank(self.queue.queue_name, job["job_id"])
+        pipe.zcount(self.queue.live_workers_key(job["job_type"]), now, "+inf")
+        stats, average, rank, workers = await pipe.execute()
+
+        own = expected_total(decode_stats(stats), parameters)
+        average = float(average) if average else own
+        # Jobs ahead are shared across live workers that accept this job
+        # type; running jobs are assumed to finish as the next ones start.
+        wait = (rank or 0) * average / max(workers, 1)
+        return round(wait + own)
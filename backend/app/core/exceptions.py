@@ -65,6 +65,25 @@ class GPUException(AppException):
         )
 
 
+class JobTimeoutException(AppException):
+    # Recoverable: the same input may well finish on a retry.
+    recoverable = True
+
+    def __init__(self, scope: str, seconds: float, stage: Optional[str] = None):
+        super().__init__(
+            message=f"Job exceeded its {scope} timeout of {seconds:g}s" + (f" (stage: {stage})" if stage else ""),
+            code="JOB_TIMEOUT"
+        )
+
+
+class JobCancelledException(AppException):
+    def __init__(self, job_id: str):
+        super().__init__(
+            message=f"Job {job_id} was cancelled",
+            code="JOB_CANCELLED"
+        )
+
+
 def http_exception_from_app_exception(e: AppException, status_code: int = 400) -> HTTPException:
     return HTTPException(
         status_code=status_code,
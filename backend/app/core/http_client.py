@@ -0,0 +1,99 @@
+import asyncio
+import random
+from typing import Dict, Optional
+import httpx
+
+from app.config import settings
+
+http_clients: Dict[str, httpx.AsyncClient] = {}
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+DEFAULT_TIMEOUT = 30.0
+
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+# 429 and 503 mean the upstream turned the request away; after a 502 or 504
+# it may still be running it, so only idempotent requests are retried then.
+REJECTED_STATUS_CODES = {429, 503}
+# Only errors raised before the upstream could have started work are retried,
+# so a slow 60s generation is never silently run twice.
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+# A connection dropped mid-response may have done the work already; only
+# requests that are safe to repeat are retried after one.
+IDEMPOTENT_METHODS = {"get", "head", "options", "put", "delete"}
+
+
+def _max_concurrency() -> Dict[str, int]:
+    return {
+        "ollama": settings.OLLAMA_MAX_CONCURRENCY,
+        "groq": settings.GROQ_MAX_CONCURRENCY
+    }
+
+
+async def init_http_clients() -> Dict[str, httpx.AsyncClient]:
+    for name, concurrency in _max_concurrency().items():
+        if name in http_clients:
+            continue
+        http_clients[name] = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=concurrency,
+                max_keepalive_connections=concurrency,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=DEFAULT_TIMEOUT
+        )
+        _semaphores[name] = asyncio.Semaphore(concurrency)
+    return http_clients
+
+
+async def close_http_clients():
+    for client in http_clients.values():
+        await client.aclose()
+    http_clients.clear()
+    _semaphores.clear()
+
+
+async def _send_with_retry(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    **kwargs
+) -> httpx.Response:
+    send = getattr(client, method)
+    idempotent = method in IDEMPOTENT_METHODS
+    retryable = RETRYABLE_ERRORS + ((httpx.RemoteProtocolError,) if idempotent else ())
+    retry_statuses = RETRYABLE_STATUS_CODES if idempotent else REJECTED_STATUS_CODES
+    attempt = 0
+    while True:
+        try:
+            # The slot is held per attempt, not across the backoff sleep, so
+            # one retrying call does not starve the others.
+            if semaphore is None:
+                response = await send(url, **kwargs)
+            else:
+                async with semaphore:
+                    response = await send(url, **kwargs)
+            if response.status_code not in retry_statuses or attempt >= settings.HTTP_MAX_RETRIES:
+                return response
+        except retryable:
+            if attempt >= settings.HTTP_MAX_RETRIES:
+                raise
+
+        delay = settings.HTTP_RETRY_BACKOFF * (2 ** attempt)
+        await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+        attempt += 1
+
+
+async def request(name: str, method: str, url: str, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+    client = http_clients.get(name)
+
+    if client is None:
+        # Outside the API lifespan or worker (scripts, tests) fall back to a
+        # one-off client.
+        async with httpx.AsyncClient(timeout=DEFAULT_TIMEOUT if timeout is None else timeout) as transient:
+            return await _send_with_retry(transient, method, url, **kwargs)
+
+    # Passing timeout=None would disable the client's default timeout.
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    return await _send_with_retry(client, method, url, _semaphores[name], **kwargs)
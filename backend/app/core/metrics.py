@@ -0,0 +1,196 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, Any, Iterable, List, Sequence, Tuple
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+STAGE_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+WAIT_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, 30, 120)
+SIZE_BUCKETS = tuple(2 ** n for n in range(14, 29, 2))  # 16 KiB .. 256 MiB
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self) -> List[List[Any]]:
+        with self._lock:
+            return [[list(key), self._copy(value)] for key, value in self._values.items()]
+
+    def _copy(self, value: Any) -> Any:
+        return value
+
+    def samples(self, key: Tuple[str, ...], value: Any) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    # Each series keeps per-bucket counts plus the sum; observe() is a
+    # bisect and a few additions under a lock, so it can stay on in
+    # production. Buckets are made cumulative only when rendered.
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        index = bisect_left(self.buckets, value)
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def _copy(self, value: Any) -> Any:
+        return list(value)
+
+    def samples(self, key: Tuple[str, ...], value: Any) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        labels = dict(zip(self.labelnames, key))
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), value[:-1]):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else format_value(bound)
+            yield f"{self.name}_bucket", {**labels, "le": le}, cumulative
+        yield f"{self.name}_sum", labels, value[-1]
+        yield f"{self.name}_count", labels, cumulative
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, List[List[Any]]]:
+        # JSON-serializable values of every non-empty series, which workers
+        # publish to Redis for the API to render.
+        return {name: values for name, metric in self.metrics.items() if (values := metric.snapshot())}
+
+    def render(self, sources: List[Tuple[Dict[str, str], Dict[str, List[List[Any]]]]]) -> str:
+        # Prometheus text format for (extra_labels, snapshot) pairs, grouping
+        # each metric's series from every source under one HELP/TYPE header.
+        lines = []
+        for name, metric in self.metrics.items():
+            series = [(extra, values) for extra, snapshot in sources for values in [snapshot.get(name)] if values]
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for extra, values in series:
+                for key, value in values:
+                    for sample, labels, number in metric.samples(tuple(key), value):
+                        lines.append(f"{sample}{format_labels({**extra, **labels})} {format_value(number)}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        for v in labels.values()
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = MetricsRegistry()
+
+queue_depth = registry.gauge("trellis_queue_depth", "Jobs waiting in the pending queue")
+queue_oldest_age = registry.gauge("trellis_queue_oldest_job_age_seconds", "Age of the oldest pending job")
+websocket_connections = registry.gauge("trellis_websocket_connections", "Open job progress WebSocket connections")
+websocket_jobs_watched = registry.gauge("trellis_websocket_jobs_watched", "Jobs with at least one WebSocket watcher")
+workers_live = registry.gauge("trellis_workers_live", "Workers holding a live lease")
+
+jobs_enqueued = registry.counter("trellis_jobs_enqueued_total", "Jobs accepted by the API", ["job_type"])
+download_bytes = registry.counter("trellis_download_bytes_total", "Artifact bytes served", ["format"])
+download_redirects = registry.counter(
+    "trellis_download_redirects_total", "Downloads redirected to signed storage URLs", ["format"]
+)
+llm_latency = registry.histogram(
+    "trellis_llm_request_seconds", "Prompt enhancement latency per provider", ["provider", "outcome"]
+)
+
+queue_wait = registry.histogram(
+    "trellis_job_queue_wait_seconds", "Time from enqueue to processing start", ["job_type"], WAIT_BUCKETS
+)
+stage_duration = registry.histogram(
+    "trellis_job_stage_seconds", "Time spent in each pipeline stage", ["job_type", "stage"], STAGE_BUCKETS
+)
+artifact_size = registry.histogram(
+    "trellis_artifact_bytes", "Size of exported artifacts", ["format"], SIZE_BUCKETS
+)
+gc_reclaimed_bytes = registry.counter(
+    "trellis_gc_reclaimed_bytes_total", "Bytes deleted by artifact GC", ["reason"]
+)
+gc_scanned = registry.counter(
+    "trellis_gc_entries_scanned_total", "Ledger and storage entries examined by artifact GC", ["prefix"]
+)
+gc_scan_rate = registry.gauge("trellis_gc_scan_rate", "Entries per second examined by the last artifact GC pass")
+artifact_stored_bytes = registry.gauge(
+    "trellis_artifact_stored_bytes", "Artifact bytes counted against ARTIFACT_DISK_QUOTA_MB"
+)
+loop_lag = registry.histogram(
+    "trellis_worker_loop_lag_seconds", "How late the worker event loop woke from a timed sleep", buckets=LAG_BUCKETS
+)
+jobs_finished = registry.counter("trellis_jobs_finished_total", "Jobs finished by workers", ["job_type", "status"])
@@ -1,24 +1,262 @@
 import json
+import time
 from typing import Dict, Any, Optional, List
 from uuid import uuid4
-from datetime import datetime
+from datetime import datetime, timezone
 import redis.asyncio as redis
 
 from app.config import settings
+from app.core import metrics
+from app.core.scheduler import batch_key, estimate_job_cost, job_score
+
+
+# Every pending job is in the pending set KEYS[1] and, with the same score,
+# in the per-type set KEYS[1]:pending:{job_type}, so a worker restricted to
+# some types finds its next job at the heads of those sets however many
+# jobs of other types are ahead.
+
+# Pops the lowest-scored pending job the worker can serve straight into its
+# in-flight list so a crash between the two steps cannot lose it. KEYS[3..]
+# are the per-type sets of the accepted job types (any type when omitted).
+CLAIM_SCRIPT = """
+local function take(id, type_key)
+    redis.call('ZREM', KEYS[1], id)
+    redis.call('ZREM', type_key, id)
+    redis.call('RPUSH', KEYS[2], id)
+    return id
+end
+if #KEYS == 2 then
+    local id = redis.call('ZRANGE', KEYS[1], 0, 0)[1]
+    if not id then
+        return false
+    end
+    local job_type = redis.call('HGET', 'job:' .. id, 'job_type') or ''
+    return take(id, KEYS[1] .. ':pending:' .. job_type)
+end
+while true do
+    local best, best_key, best_score
+    for i = 3, #KEYS do
+        local head = redis.call('ZRANGE', KEYS[i], 0, 0, 'WITHSCORES')
+        if head[1] and (not best_score or tonumber(head[2]) < best_score) then
+            best, best_key, best_score = head[1], KEYS[i], tonumber(head[2])
+        end
+    end
+    if not best then
+        return false
+    end
+    if redis.call('ZSCORE', KEYS[1], best) then
+        return take(best, best_key)
+    end
+    -- No longer pending; the per-type entry is stale.
+    redis.call('ZREM', best_key, best)
+end
+"""
+
+# Moves up to ARGV[3] pending jobs whose batch_key equals ARGV[2], looking at
+# the first ARGV[1] by score in the per-type set KEYS[3], into the worker's
+# in-flight list.
+CLAIM_COMPATIBLE_SCRIPT = """
+local wanted = tonumber(ARGV[3])
+local taken = {}
+local ids = redis.call('ZRANGE', KEYS[3], 0, tonumber(ARGV[1]) - 1)
+for _, id in ipairs(ids) do
+    if #taken >= wanted then
+        break
+    end
+    if redis.call('HGET', 'job:' .. id, 'batch_key') == ARGV[2] and redis.call('ZREM', KEYS[1], id) == 1 then
+        redis.call('ZREM', KEYS[3], id)
+        redis.call('RPUSH', KEYS[2], id)
+        taken[#taken + 1] = id
+    end
+end
+return taken
+"""
+
+# Moves one in-flight job back into the pending sets with its original
+# score, so a reclaimed job keeps the aging credit it had already earned.
+# Jobs that already finished are only dropped from the in-flight list, and
+# a job over ARGV[2] attempts is failed in place, so nothing that may not
+# run again ever becomes claimable. Returns {id, outcome, job_type, error}.
+REQUEUE_SCRIPT = """
+local id = redis.call('RPOP', KEYS[1])
+if not id then
+    return false
+end
+local job_key = 'job:' .. id
+local job = redis.call('HMGET', job_key, 'status', 'job_type', 'score')
+local status, job_type, score = job[1], job[2] or '', job[3]
+if not status or status == 'completed' or status == 'failed' or status == 'cancelled' or status == 'expired' then
+    return {id, 'dropped', job_type, ''}
+end
+local attempts = redis.call('HINCRBY', job_key, 'attempts', 1)
+if attempts > tonumber(ARGV[2]) then
+    local error = cjson.encode({
+        code = 'WORKER_LOST',
+        message = 'Job abandoned by workers ' .. attempts .. ' times',
+        recoverable = false
+    })
+    redis.call('HSET', job_key, 'status', 'failed', 'completed_at', ARGV[3], 'error', error)
+    return {id, 'failed', job_type, error}
+end
+if not score or score == '' then
+    score = ARGV[1]
+end
+redis.call('HSET', job_key, 'status', 'queued', 'stage', 'queued', 'progress', 0, 'stage_progress', 0, 'worker_id', '')
+redis.call('ZADD', KEYS[2], score, id)
+-- Without a type only unrestricted workers, which claim from KEYS[2], can
+-- take the job.
+if job_type ~= '' then
+    redis.call('ZADD', KEYS[2] .. ':pending:' .. job_type, score, id)
+end
+return {id, 'requeued', job_type, ''}
+"""
+
+# Writes a worker's final status unless the job was cancelled while it ran,
+# so a late completion cannot resurrect it. ARGV holds field/value pairs.
+FINISH_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'status') == 'cancelled' then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV))
+return 1
+"""
+
+
+# Before the sorted set, the pending queue was a LIST under the same key.
+# Moves such a list aside to KEYS[2], appending if an earlier migration left
+# one there, so the key can be used as a sorted set again right away.
+MOVE_LEGACY_SCRIPT = """
+if redis.call('TYPE', KEYS[1])['ok'] ~= 'list' then
+    return 0
+end
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    redis.call('RENAME', KEYS[1], KEYS[2])
+    return 1
+end
+while redis.call('LMOVE', KEYS[1], KEYS[2], 'LEFT', 'RIGHT') do
+end
+return 1
+"""
+
+# Pops a batch off the head of the legacy list KEYS[1] into the pending sets
+# of KEYS[2], but only if the head still holds the ids the caller scored, so
+# concurrent drains (API and workers starting together) cannot drop or
+# double-add jobs. ARGV holds id/score/job_type triples; an empty job_type
+# drops the id without queueing it.
+DRAIN_LEGACY_SCRIPT = """
+local n = #ARGV / 3
+local head = redis.call('LRANGE', KEYS[1], 0, n - 1)
+for i = 1, n do
+    if head[i] ~= ARGV[3 * i - 2] then
+        return 0
+    end
+end
+for i = 1, n do
+    local id, score, job_type = ARGV[3 * i - 2], ARGV[3 * i - 1], ARGV[3 * i]
+    if job_type ~= '' then
+        redis.call('HSET', 'job:' .. id, 'score', score)
+        redis.call('ZADD', KEYS[2], 'NX', score, id)
+        redis.call('ZADD', KEYS[2] .. ':pending:' .. job_type, 'NX', score, id)
+    end
+end
+redis.call('LTRIM', KEYS[1], n, -1)
+return 1
+"""
+
+# Cancels job ARGV[1] (hash KEYS[1]) only while it is still queued or
+# processing, so a completion that lands first is never overwritten, and
+# drops it from the pending sets of KEYS[2]. While other requesters share
+# the job through the result cache (counted in KEYS[3]) the caller is only
+# detached and the job keeps running. Returns 0 (refused), 1 (cancelled) or
+# 2 (detached).
+CANCEL_SCRIPT = """
+local job = redis.call('HMGET', KEYS[1], 'status', 'job_type')
+if job[1] ~= 'queued' and job[1] ~= 'processing' then
+    return 0
+end
+if tonumber(redis.call('GET', KEYS[3]) or '0') > 0 then
+    redis.call('DECR', KEYS[3])
+    return 2
+end
+redis.call('HSET', KEYS[1], 'status', 'cancelled', 'completed_at', ARGV[2])
+redis.call('ZREM', KEYS[2], ARGV[1])
+if job[2] then
+    redis.call('ZREM', KEYS[2] .. ':pending:' .. job[2], ARGV[1])
+end
+return 1
+"""
+
+JOB_TYPES = ["text_to_3d", "image_to_3d"]
+
+
+def cancellation_event(job_id: str) -> Dict[str, Any]:
+    # Terminal progress event for watchers of a cancelled job, in the same
+    # shape as the snapshot of one.
+    return {
+        "type": "error",
+        "job_id": job_id,
+        "status": "cancelled",
+        "error": {"code": "CANCELLED", "message": "Job cancelled"}
+    }
+
+
+def requesters_key(job_id: str) -> str:
+    # Requests attached to job_id through the result cache, besides the
+    # one that enqueued it.
+    return f"job:{job_id}:requesters"
+
+
+def enqueued_at(job: Dict[str, Any]) -> float:
+    # created_at is written as naive UTC.
+    try:
+        return datetime.fromisoformat(job["created_at"]).replace(tzinfo=timezone.utc).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time()
 
 
 class JobQueue:
     def __init__(self, redis_client: redis.Redis):
         self.redis = redis_client
         self.queue_name = settings.WORKER_QUEUE_NAME
+        self.workers_key = f"{self.queue_name}:workers"
+        self._claim_script = self.redis.register_script(CLAIM_SCRIPT)
+        self._requeue_script = self.redis.register_script(REQUEUE_SCRIPT)
+        self._claim_compatible_script = self.redis.register_script(CLAIM_COMPATIBLE_SCRIPT)
+        self._finish_script = self.redis.register_script(FINISH_SCRIPT)
+        self._cancel_script = self.redis.register_script(CANCEL_SCRIPT)
+        self._move_legacy_script = self.redis.register_script(MOVE_LEGACY_SCRIPT)
+        self._drain_legacy_script = self.redis.register_script(DRAIN_LEGACY_SCRIPT)
+
+    def processing_key(self, worker_id: str) -> str:
+        return f"{self.queue_name}:processing:{worker_id}"
+
+    def pending_key(self, job_type: str) -> str:
+        return f"{self.queue_name}:pending:{job_type}"
+
+    def notify_key(self, job_type: str) -> str:
+        return f"{self.queue_name}:notify:{job_type}"
+
+    def lease_key(self, worker_id: str) -> str:
+        return f"{self.queue_name}:lease:{worker_id}"
+
+    def live_workers_key(self, job_type: str) -> str:
+        # Workers accepting job_type, scored by when their lease runs out.
+        return f"{self.queue_name}:live:{job_type}"
+
+    def metrics_key(self, worker_id: str) -> str:
+        return f"{self.queue_name}:metrics:{worker_id}"
 
     async def enqueue(
         self,
         job_type: str,
         input_data: Dict[str, Any],
-        parameters: Dict[str, Any]
+        parameters: Dict[str, Any],
+        job_id: Optional[str] = None,
+        fingerprint: Optional[str] = None
     ) -> str:
-        job_id = str(uuid4())
+        job_id = job_id or str(uuid4())
+        cost = estimate_job_cost(job_type, parameters)
+        score = job_score(time.time(), cost)
 
         job_data = {
             "job_id": job_id,
@@ -33,7 +271,12 @@ class JobQueue:
             "error": None,
             "progress": 0,
             "stage": "queued",
-            "stage_progress": 0
+            "stage_progress": 0,
+            "attempts": 0,
+            "estimated_cost": cost,
+            "score": score,
+            "batch_key": batch_key(job_type, parameters),
+            "fingerprint": fingerprint
         }
 
         await self.redis.hset(
@@ -44,13 +287,42 @@ class JobQueue:
             }
         )
 
-        await self.redis.rpush(self.queue_name, job_id)
+        await self.redis.zadd(self.queue_name, {job_id: score})
+        await self.redis.zadd(self.pending_key(job_type), {job_id: score})
         await self.redis.expire(f"job:{job_id}", settings.JOB_RETENTION_HOURS * 3600)
+        await self.notify(job_type)
+        metrics.jobs_enqueued.inc(job_type=job_type)
 
         return job_id
 
     async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
         job_data = await self.redis.hgetall(f"job:{job_id}")
+        return self._decode_job(job_data)
+
+    async def get_jobs(
+        self,
+        job_ids: List[str],
+        fields: Optional[List[str]] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        if not job_ids:
+            return []
+
+        pipe = self.redis.pipeline(transaction=False)
+        for job_id in job_ids:
+            if fields:
+                pipe.hmget(f"job:{job_id}", fields)
+            else:
+                pipe.hgetall(f"job:{job_id}")
+        replies = await pipe.execute()
+
+        if fields:
+            replies = [
+                {f: v for f, v in zip(fields, values) if v is not None}
+                for values in replies
+            ]
+        return [self._decode_job(reply) for reply in replies]
+
+    def _decode_job(self, job_data: Dict) -> Optional[Dict[str, Any]]:
         if not job_data:
             return None
 
@@ -59,22 +331,27 @@ class JobQueue:
             key = k.decode() if isinstance(k, bytes) else k
             value = v.decode() if isinstance(v, bytes) else v
 
-            if key in ["input_data", "parameters", "result", "error"]:
+            if key in ["input_data", "parameters", "result", "error", "degradation"]:
                 try:
                     result[key] = json.loads(value) if value else None
                 except json.JSONDecodeError:
                     result[key] = value
-            elif key in ["progress", "stage_progress"]:
+            elif key in ["progress", "stage_progress", "attempts"]:
                 try:
                     result[key] = int(value) if value else 0
                 except ValueError:
                     result[key] = 0
+            elif key in ["estimated_cost", "score", "eta_at"]:
+                try:
+                    result[key] = float(value) if value else None
+                except ValueError:
+                    result[key] = None
             else:
                 result[key] = value
 
         return result
 
-    async def update_job(self, job_id: str, updates: Dict[str, Any]):
+    def _encode_updates(self, updates: Dict[str, Any]) -> Dict[str, str]:
         mapping = {}
         for k, v in updates.items():
             if isinstance(v, (dict, list)):
@@ -83,28 +360,269 @@ class JobQueue:
                 mapping[k] = ""
             else:
                 mapping[k] = str(v)
+        return mapping
+
+    async def update_job(self, job_id: str, updates: Dict[str, Any]):
+        await self.redis.hset(f"job:{job_id}", mapping=self._encode_updates(updates))
 
-        await self.redis.hset(f"job:{job_id}", mapping=mapping)
+    async def finish_job(self, job_id: str, updates: Dict[str, Any]) -> bool:
+        # False when the job was cancelled and the updates were dropped.
+        args = [item for pair in self._encode_updates(updates).items() for item in pair]
+        return bool(await self._finish_script(keys=[f"job:{job_id}"], args=args))
+
+    async def publish_event(self, job_id: str, message: Dict[str, Any]):
+        message["timestamp"] = datetime.utcnow().isoformat()
+        await self.redis.publish(f"job:{job_id}:progress", json.dumps(message))
+
+    async def notify(self, job_type: str):
+        # Wake-up tokens for idle workers serving this job type that are
+        # blocked in claim(); bounded so a backlog enqueued while no worker is
+        # running stays small.
+        await self.redis.rpush(self.notify_key(job_type), 1)
+        await self.redis.ltrim(self.notify_key(job_type), -100, -1)
 
     async def get_queue_size(self) -> int:
-        return await self.redis.llen(self.queue_name)
+        return await self.redis.zcard(self.queue_name)
+
+    async def get_backlog(self, scan_limit: Optional[int] = None) -> Dict[str, Any]:
+        # Depth plus the age of the oldest job among the first scan_limit by
+        # score; aging bounds how far an old job can sit behind that window.
+        scan_limit = scan_limit or settings.CLAIM_SCAN_LIMIT
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zcard(self.queue_name)
+        pipe.zrange(self.queue_name, 0, scan_limit - 1)
+        depth, head = await pipe.execute()
+
+        oldest_age = 0.0
+        head = [j.decode() if isinstance(j, bytes) else j for j in head]
+        now = datetime.utcnow()
+        for job in await self.get_jobs(head, fields=["created_at"]):
+            if job and job.get("created_at"):
+                age = (now - datetime.fromisoformat(job["created_at"])).total_seconds()
+                oldest_age = max(oldest_age, age)
+
+        return {"queue_depth": depth, "oldest_age": oldest_age}
 
     async def get_pending_jobs(self, limit: int = 10) -> List[str]:
-        jobs = await self.redis.lrange(self.queue_name, 0, limit - 1)
+        jobs = await self.redis.zrange(self.queue_name, 0, limit - 1)
         return [j.decode() if isinstance(j, bytes) else j for j in jobs]
 
-    async def cancel_job(self, job_id: str) -> bool:
-        job = await self.get_job(job_id)
-        if not job:
-            return False
+    async def cancel_job(self, job_id: str) -> Optional[str]:
+        # "cancelled", "detached" when other requesters still share the job,
+        # or None when it has already finished.
+        outcome = await self._cancel_script(
+            keys=[f"job:{job_id}", self.queue_name, requesters_key(job_id)],
+            args=[job_id, datetime.utcnow().isoformat()]
+        )
+        if outcome == 2:
+            return "detached"
+        if not outcome:
+            return None
+
+        await self.publish_event(job_id, cancellation_event(job_id))
+        return "cancelled"
+
+    async def renew_lease(
+        self,
+        worker_id: str,
+        lease_seconds: Optional[int] = None,
+        record: Optional[Dict[str, Any]] = None
+    ):
+        # The lease doubles as the worker's heartbeat record. It is written
+        # before registering so the reaper never sees a registered worker
+        # without one. The per-type live sets let ETAs count workers without
+        # reading every lease; entries past their expiry are pruned here.
+        record = record or {"worker_id": worker_id, "updated_at": datetime.utcnow().isoformat()}
+        lease_seconds = lease_seconds or settings.JOB_LEASE_SECONDS
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.set(self.lease_key(worker_id), json.dumps(record), ex=lease_seconds)
+        pipe.sadd(self.workers_key, worker_id)
+        for job_type in record.get("job_types") or JOB_TYPES:
+            pipe.zadd(self.live_workers_key(job_type), {worker_id: now + lease_seconds})
+            pipe.zremrangebyscore(self.live_workers_key(job_type), "-inf", now)
+        await pipe.execute()
+
+    async def get_workers(self) -> List[Dict[str, Any]]:
+        # Heartbeat records of workers holding a live lease, in two round
+        # trips however many workers there are.
+        worker_ids = sorted(
+            w.decode() if isinstance(w, bytes) else w
+            for w in await self.redis.smembers(self.workers_key)
+        )
+        if not worker_ids:
+            return []
+
+        values = await self.redis.mget([self.lease_key(w) for w in worker_ids])
+        workers = []
+        for worker_id, value in zip(worker_ids, values):
+            if value is None:
+                continue
+            try:
+                record = json.loads(value)
+            except (TypeError, ValueError):
+                record = None
+            if not isinstance(record, dict):
+                record = {}
+            record.setdefault("worker_id", worker_id)
+            workers.append(record)
+        return workers
+
+    async def get_worker_metrics(self, worker_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        # Metric snapshots published by the given workers, keyed by worker id.
+        if not worker_ids:
+            return {}
+
+        values = await self.redis.mget([self.metrics_key(w) for w in worker_ids])
+        snapshots = {}
+        for worker_id, value in zip(worker_ids, values):
+            if value is None:
+                continue
+            try:
+                snapshots[worker_id] = json.loads(value)
+            except (TypeError, ValueError):
+                continue
+        return snapshots
+
+    async def claim(
+        self,
+        worker_id: str,
+        timeout: int = 5,
+        job_types: Optional[List[str]] = None
+    ) -> Optional[str]:
+        keys = [self.queue_name, self.processing_key(worker_id)] + [self.pending_key(t) for t in job_types or []]
+        job_id = await self._claim_script(keys=keys)
+        if job_id is None:
+            notify_keys = [self.notify_key(t) for t in (job_types or JOB_TYPES)]
+            await self.redis.blpop(notify_keys, timeout=timeout)
+            job_id = await self._claim_script(keys=keys)
+        if job_id is None:
+            return None
+
+        job_id = job_id.decode() if isinstance(job_id, bytes) else job_id
+        await self.update_job(job_id, {"worker_id": worker_id})
+        return job_id
+
+    async def claim_compatible(self, worker_id: str, job_type: str, key: str, limit: int) -> List[str]:
+        if limit <= 0:
+            return []
+
+        job_ids = await self._claim_compatible_script(
+            keys=[self.queue_name, self.processing_key(worker_id), self.pending_key(job_type)],
+            args=[settings.CLAIM_SCAN_LIMIT, key, limit]
+        )
+        job_ids = [j.decode() if isinstance(j, bytes) else j for j in job_ids]
+        for job_id in job_ids:
+            await self.update_job(job_id, {"worker_id": worker_id})
+        return job_ids
+
+    async def index_pending(self, batch_size: int = 500) -> int:
+        # Adds pending jobs that predate the per-type sets to them. Safe to
+        # run on every start and alongside claims: ZADD of an indexed job is
+        # a no-op and a claimed one is skipped as stale by CLAIM_SCRIPT.
+        indexed = 0
+        start = 0
+        while True:
+            entries = await self.redis.zrange(self.queue_name, start, start + batch_size - 1, withscores=True)
+            if not entries:
+                return indexed
+            job_ids = [j.decode() if isinstance(j, bytes) else j for j, _ in entries]
+            jobs = await self.get_jobs(job_ids, fields=["job_type"])
+            pipe = self.redis.pipeline(transaction=False)
+            for job_id, (_, score), job in zip(job_ids, entries, jobs):
+                if job and job.get("job_type"):
+                    pipe.zadd(self.pending_key(job["job_type"]), {job_id: score}, nx=True)
+            indexed += sum(await pipe.execute())
+            start += batch_size
+
+    async def migrate_legacy_queue(self, batch_size: int = 500) -> int:
+        # Moves jobs still queued in the pre-scheduler LIST into the pending
+        # sets, scored as if enqueued at their created_at. Runs on every API
+        # and worker start; it is a no-op once the list is gone, and an
+        # interrupted run resumes from where it stopped.
+        legacy_key = f"{self.queue_name}:legacy"
+        await self._move_legacy_script(keys=[self.queue_name, legacy_key])
+        migrated = 0
+        while True:
+            raw_ids = await self.redis.lrange(legacy_key, 0, batch_size - 1)
+            if not raw_ids:
+                return migrated
+            job_ids = [j.decode() if isinstance(j, bytes) else j for j in raw_ids]
+            jobs = await self.get_jobs(job_ids, fields=["job_type", "status", "parameters", "created_at"])
+            args = []
+            job_types = []
+            for job_id, job in zip(job_ids, jobs):
+                if job and job.get("status") == "queued" and job.get("job_type"):
+                    cost = estimate_job_cost(job["job_type"], job.get("parameters") or {})
+                    args.extend([job_id, job_score(enqueued_at(job), cost), job["job_type"]])
+                    job_types.append(job["job_type"])
+                else:
+                    args.extend([job_id, 0, ""])
+            # Lost to a concurrent drain: read the new head and go again.
+            if await self._drain_legacy_script(keys=[legacy_key, self.queue_name], args=args):
+                migrated += len(job_types)
+                for job_type in set(job_types):
+                    await self.notify(job_type)
+
+    async def ack(self, worker_id: str, job_id: str):
+        await self.redis.lrem(self.processing_key(worker_id), 1, job_id)
+
+    async def release_worker(self, worker_id: str) -> List[str]:
+        requeued = await self.requeue_in_flight(worker_id)
+        await self.redis.srem(self.workers_key, worker_id)
+        await self.redis.delete(self.lease_key(worker_id), self.metrics_key(worker_id))
+        await self.forget_live_worker(worker_id)
+        return requeued
+
+    async def forget_live_worker(self, worker_id: str):
+        pipe = self.redis.pipeline(transaction=False)
+        for job_type in JOB_TYPES:
+            pipe.zrem(self.live_workers_key(job_type), worker_id)
+        await pipe.execute()
+
+    async def requeue_abandoned(self, max_retries: Optional[int] = None) -> List[str]:
+        requeued = []
+        worker_ids = await self.redis.smembers(self.workers_key)
+
+        for worker_id in worker_ids:
+            worker_id = worker_id.decode() if isinstance(worker_id, bytes) else worker_id
+            if await self.redis.exists(self.lease_key(worker_id)):
+                continue
+
+            print(f"Worker {worker_id} lease expired, reclaiming its jobs")
+            requeued.extend(await self.requeue_in_flight(worker_id, max_retries))
+            await self.redis.srem(self.workers_key, worker_id)
+            await self.forget_live_worker(worker_id)
+
+        return requeued
+
+    async def requeue_in_flight(self, worker_id: str, max_retries: Optional[int] = None) -> List[str]:
+        if max_retries is None:
+            max_retries = settings.JOB_MAX_RETRIES
+
+        requeued = []
+        processing_key = self.processing_key(worker_id)
 
-        if job["status"] in ["completed", "failed", "cancelled"]:
-            return False
+        while True:
+            # The script keeps the id in exactly one structure at all times, so
+            # concurrent reapers cannot drop or duplicate a job.
+            reply = await self._requeue_script(
+                keys=[processing_key, self.queue_name],
+                args=[time.time(), max_retries, datetime.utcnow().isoformat()]
+            )
+            if reply is None:
+                break
+            job_id, outcome, job_type, error = [v.decode() if isinstance(v, bytes) else v for v in reply]
 
-        await self.update_job(job_id, {
-            "status": "cancelled",
-            "completed_at": datetime.utcnow().isoformat()
-        })
+            if outcome == "failed":
+                await self.publish_event(job_id, {
+                    "type": "error",
+                    "job_id": job_id,
+                    "error": json.loads(error)
+                })
+            elif outcome == "requeued":
+                if job_type:
+                    await self.notify(job_type)
+                requeued.append(job_id)
 
-        await self.redis.lrem(self.queue_name, 0, job_id)
-        return True
+        return requeued
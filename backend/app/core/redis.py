@@ -28,3 +28,7 @@ def get_redis() -> redis.Redis:
     if redis_client is None:
         raise RuntimeError("Redis not initialized")
     return redis_client
+
+
+def get_redis_if_ready() -> Optional[redis.Redis]:
+    return redis_client
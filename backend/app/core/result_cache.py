@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import json
+from typing import Dict, Any, Optional, Tuple
+import redis.asyncio as redis
+
+from app.config import settings
+from app.core.scheduler import DEFAULT_SAMPLER_PARAMS
+from app.core.storage import storage_service
+
+
+# Seconds a fingerprint may point at a job id whose record has not been
+# written yet, which is how a request that won the reservation looks until
+# its enqueue (and, for images, its upload) completes.
+RESERVATION_SECONDS = 300
+
+# Reserves KEYS[1] for ARGV[1] unless its holder can serve the request.
+# Returns {holder, state}: "in_flight" for a queued, running or just reserved
+# holder, "completed" for a finished one (the caller checks its files), or
+# {ARGV[1], "miss"/"replaced"} when ARGV[1] now holds the entry. Only a
+# holder that failed, was cancelled or evicted, or whose record expired, is
+# overwritten. ARGV[2] is the entry TTL. An in-flight hit is counted on the
+# holder so cancelling it only detaches the caller while others remain.
+RESOLVE_SCRIPT = """
+local function attach(holder)
+    local requesters = 'job:' .. holder .. ':requesters'
+    redis.call('INCR', requesters)
+    redis.call('EXPIRE', requesters, ARGV[2])
+    return {holder, 'in_flight'}
+end
+local holder = redis.call('GET', KEYS[1])
+if not holder then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    return {ARGV[1], 'miss'}
+end
+local status = redis.call('HGET', 'job:' .. holder, 'status')
+if status == 'queued' or status == 'processing' then
+    return attach(holder)
+end
+if status == 'completed' then
+    return {holder, 'completed'}
+end
+if not status and redis.call('TTL', KEYS[1]) > tonumber(ARGV[2]) - tonumber(ARGV[3]) then
+    return attach(holder)
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return {ARGV[1], 'replaced'}
+"""
+
+# Points KEYS[1] at ARGV[2] only while ARGV[1] still holds it.
+REPLACE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+def compute_fingerprint(
+    job_type: str,
+    input_data: Dict[str, Any],
+    parameters: Dict[str, Any],
+    content_hash: Optional[str] = None
+) -> str:
+    resolution = parameters.get("resolution") or "medium"
+    defaults = DEFAULT_SAMPLER_PARAMS.get(resolution, DEFAULT_SAMPLER_PARAMS["medium"])
+
+    def sampler(params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        merged = defaults.copy()
+        merged.update(params or {})
+        return merged
+
+    enhance = bool(input_data.get("enhance_prompt"))
+    canonical = {
+        "job_type": job_type,
+        "prompt": (input_data.get("prompt") or "").strip(),
+        "image_sha256": content_hash,
+        "enhance_prompt": enhance,
+        "llm_provider": input_data.get("llm_provider") if enhance else None,
+        # The pipeline runs with `seed or 42`, so an omitted seed is seed 42.
+        "seed": parameters.get("seed") or 42,
+        "resolution": resolution,
+        "sparse_structure_sampler_params": sampler(parameters.get("sparse_structure_sampler_params")),
+        "slat_sampler_params": sampler(parameters.get("slat_sampler_params"))
+    }
+
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+        self.stats_key = "result_cache:stats"
+        self._resolve_script = self.redis.register_script(RESOLVE_SCRIPT)
+        self._replace_script = self.redis.register_script(REPLACE_SCRIPT)
+
+    def key(self, fingerprint: str) -> str:
+        return f"result_cache:{fingerprint}"
+
+    async def resolve(self, fingerprint: str, new_job_id: str) -> Tuple[str, Optional[str]]:
+        # Returns the job that serves this request plus "completed" when
+        # finished artifacts are reused, "in_flight" when attaching to a queued
+        # or running job, or None when new_job_id was reserved and the caller
+        # must enqueue it. Entries live as long as the job record.
+        ttl = settings.JOB_RETENTION_HOURS * 3600
+        key = self.key(fingerprint)
+
+        holder, state = await self._resolve_script(keys=[key], args=[new_job_id, ttl, RESERVATION_SECONDS])
+        holder = holder.decode() if isinstance(holder, bytes) else holder
+        state = state.decode() if isinstance(state, bytes) else state
+
+        if state == "in_flight":
+            await self.redis.hincrby(self.stats_key, "hits_in_flight", 1)
+            return holder, "in_flight"
+
+        if state == "completed":
+            if await asyncio.to_thread(storage_service.artifact_exists, holder, "glb"):
+                await self.redis.hincrby(self.stats_key, "hits_completed", 1)
+                return holder, "completed"
+            # The files are gone. Another request may have replaced the
+            # entry meanwhile, in which case this one joins it.
+            if not await self._replace_script(keys=[key], args=[holder, new_job_id, ttl]):
+                return await self.resolve(fingerprint, new_job_id)
+            state = "replaced"
+
+        if state == "replaced":
+            await self.redis.hincrby(self.stats_key, "evictions", 1)
+        await self.redis.hincrby(self.stats_key, "misses", 1)
+        return new_job_id, None
+
+    async def forget(self, fingerprint: str, job_id: str):
+        # Drops the entry only while job_id still holds it, so a later
+        # full-quality run of the same request is not discarded.
+        key = self.key(fingerprint)
+        holder = await self.redis.get(key)
+        holder = holder.decode() if isinstance(holder, bytes) else holder
+        if holder == job_id:
+            await self.redis.delete(key)
+
+    async def get_stats(self) -> Dict[str, int]:
+        stats = await self.redis.hgetall(self.stats_key)
+        result = {"hits_completed": 0, "hits_in_flight": 0, "misses": 0, "evictions": 0}
+        for k, v in stats.items():
+            key = k.decode() if isinstance(k, bytes) else k
+            result[key] = int(v)
+        return result
@@ -0,0 +1,100 @@
+import hashlib
+import json
+from typing import Dict, Any, Optional
+
+from app.config import settings
+
+
+DEFAULT_SAMPLER_PARAMS = {
+    "low": {"steps": 8, "cfg_strength": 7.5},
+    "medium": {"steps": 12, "cfg_strength": 7.5},
+    "high": {"steps": 20, "cfg_strength": 7.5}
+}
+
+
+def get_sampler_steps(resolution: str, params: Optional[Dict[str, Any]] = None) -> int:
+    defaults = DEFAULT_SAMPLER_PARAMS.get(resolution, DEFAULT_SAMPLER_PARAMS["medium"])
+    if params and params.get("steps"):
+        return int(params["steps"])
+    return defaults["steps"]
+
+
+def batch_key(job_type: str, parameters: Dict[str, Any]) -> str:
+    # Jobs with equal keys can share one batched sampling pass. The pipeline
+    # seeds a batch once, so the seed is part of the key.
+    resolution = parameters.get("resolution") or "medium"
+    defaults = DEFAULT_SAMPLER_PARAMS.get(resolution, DEFAULT_SAMPLER_PARAMS["medium"])
+    canonical = {
+        "job_type": job_type,
+        "resolution": resolution,
+        "seed": parameters.get("seed") or 42,
+        "sparse_structure_sampler_params": {**defaults, **(parameters.get("sparse_structure_sampler_params") or {})},
+        "slat_sampler_params": {**defaults, **(parameters.get("slat_sampler_params") or {})}
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def estimate_job_cost(job_type: str, parameters: Dict[str, Any]) -> float:
+    resolution = parameters.get("resolution") or "medium"
+    steps = (
+        get_sampler_steps(resolution, parameters.get("sparse_structure_sampler_params"))
+        + get_sampler_steps(resolution, parameters.get("slat_sampler_params"))
+    )
+    return settings.SCHEDULER_BASE_COST + settings.SCHEDULER_STEP_COST * steps
+
+
+def job_score(enqueued_at: float, cost: float, policy: Optional[str] = None) -> float:
+    # Shortest-expected-job-first with linear aging: at any time t the job
+    # with the lowest `cost * weight - (t - enqueued_at)` runs first, which
+    # orders the same as the static score below. A job can be overtaken by
+    # cheaper ones for at most `weight * (cost - cheapest_cost)` seconds.
+    policy = policy or settings.SCHEDULER_POLICY
+    if policy == "fifo":
+        return enqueued_at
+    return enqueued_at + settings.SCHEDULER_COST_WEIGHT * cost
+
+
+# Each rung trades quality for latency: sampler steps are scaled down (never
+# below MIN_SAMPLER_STEPS), textures shrink and meshes are simplified harder.
+# Level 0 is the requested quality.
+DEGRADATION_LADDER = [
+    {"steps_factor": 1.0, "texture_size": 1024, "simplify": 0.95},
+    {"steps_factor": 0.75, "texture_size": 768, "simplify": 0.96},
+    {"steps_factor": 0.5, "texture_size": 512, "simplify": 0.97},
+    {"steps_factor": 0.35, "texture_size": 512, "simplify": 0.98}
+]
+
+MIN_SAMPLER_STEPS = 4
+
+
+def degradation_level(queue_depth: int, oldest_age: float) -> int:
+    # Every multiple of a threshold climbs one rung, so a backlog twice the
+    # configured depth lands on level 2.
+    if not settings.OVERLOAD_MODE_ENABLED:
+        return 0
+
+    level = 0
+    if settings.OVERLOAD_QUEUE_DEPTH > 0:
+        level = max(level, queue_depth // settings.OVERLOAD_QUEUE_DEPTH)
+    if settings.OVERLOAD_OLDEST_AGE > 0:
+        level = max(level, int(oldest_age // settings.OVERLOAD_OLDEST_AGE))
+    return min(level, settings.OVERLOAD_MAX_LEVEL, len(DEGRADATION_LADDER) - 1)
+
+
+def apply_degradation(parameters: Dict[str, Any], level: int) -> Dict[str, Any]:
+    # Returns a copy of the job parameters with the rung's sampler steps,
+    # texture_size and simplify ratio filled in.
+    rung = DEGRADATION_LADDER[level]
+    resolution = parameters.get("resolution") or "medium"
+    degraded = dict(parameters)
+
+    for key in ["sparse_structure_sampler_params", "slat_sampler_params"]:
+        sampler = dict(parameters.get(key) or {})
+        requested = get_sampler_steps(resolution, sampler)
+        sampler["steps"] = min(requested, max(MIN_SAMPLER_STEPS, round(requested * rung["steps_factor"])))
+        degraded[key] = sampler
+
+    degraded["texture_size"] = min(parameters.get("texture_size") or rung["texture_size"], rung["texture_size"])
+    degraded["simplify"] = max(parameters.get("simplify") or rung["simplify"], rung["simplify"])
+    return degraded
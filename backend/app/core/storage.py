@@ -1,11 +1,15 @@
 import os
 import shutil
+import hashlib
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
 import aiofiles
+from fastapi import UploadFile
 from uuid import uuid4
 
 from app.config import settings
+from app.core.exceptions import FileTooLargeException
+from app.core.storage_backends import create_storage_backend
 
 
 class StorageService:
@@ -18,18 +22,111 @@ class StorageService:
         self.outputs_path.mkdir(parents=True, exist_ok=True)
         self.previews_path.mkdir(parents=True, exist_ok=True)
 
+        self.fanout_levels = settings.STORAGE_FANOUT_LEVELS
+
+        # The directories above are where files are written; the backend is
+        # where finished ones are kept and served from.
+        self.backend = create_storage_backend(self.find_path)
+
+    def shard(self, name: str) -> Path:
+        # Two hex digits of the name's hash per level, so no directory holds
+        # more than 256 shards and each shard a 65536th of the files.
+        digest = hashlib.sha256(name.encode()).hexdigest()
+        return Path(*(digest[2 * level:2 * level + 2] for level in range(self.fanout_levels)))
+
+    def root_path(self, prefix: str) -> Path:
+        roots = {"uploads": self.uploads_path, "outputs": self.outputs_path, "previews": self.previews_path}
+        if prefix not in roots:
+            raise ValueError(f"Unknown storage prefix: {prefix}")
+        return roots[prefix]
+
+    def local_path(self, key: str, legacy: bool = False) -> Path:
+        # Where a key is written: sharded on its first component (the job
+        # id or upload filename), or flat in the legacy layout.
+        prefix, _, rest = key.partition("/")
+        if not rest:
+            raise ValueError(f"Unknown storage key: {key}")
+        root = self.root_path(prefix)
+        if legacy or not self.fanout_levels:
+            return root / rest
+        return root / self.shard(rest.split("/", 1)[0]) / rest
+
+    def find_path(self, key: str) -> Path:
+        # Where a key can be read, falling back to the flat layout until
+        # storage_migration has moved it. Migration renames atomically, so
+        # checking the new layout again after the old one cannot miss it.
+        path = self.local_path(key)
+        if path.exists() or not self.fanout_levels:
+            return path
+        legacy_path = self.local_path(key, legacy=True)
+        if legacy_path.exists():
+            return legacy_path
+        return path
+
     async def save_upload(self, content: bytes, original_filename: str) -> str:
         ext = Path(original_filename).suffix.lower()
         filename = f"{uuid4()}{ext}"
-        file_path = self.uploads_path / filename
+        file_path = self.local_path(f"uploads/{filename}")
+        file_path.parent.mkdir(parents=True, exist_ok=True)
 
         async with aiofiles.open(file_path, "wb") as f:
             await f.write(content)
 
         return filename
 
+    async def stage_upload(
+        self,
+        upload: UploadFile,
+        max_size: int,
+        chunk_size: Optional[int] = None
+    ) -> Tuple[Path, str, int]:
+        # Streams the upload to a temp file next to its final location so the
+        # later rename is atomic; memory use is one chunk regardless of size.
+        chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+        temp_path = self.uploads_path / f".{uuid4()}.part"
+        digest = hashlib.sha256()
+        size = 0
+
+        try:
+            async with aiofiles.open(temp_path, "wb") as f:
+                while True:
+                    chunk = await upload.read(chunk_size)
+                    if not chunk:
+                        break
+
+                    size += len(chunk)
+                    if size > max_size:
+                        raise FileTooLargeException(size, max_size)
+
+                    digest.update(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        return temp_path, digest.hexdigest(), size
+
+    def commit_upload(self, temp_path: Path, original_filename: str, job_id: Optional[str] = None) -> str:
+        # Named after the job that uses it so artifact GC can tell from the
+        # job record when it is no longer needed.
+        ext = Path(original_filename or "").suffix.lower()
+        filename = f"{job_id or uuid4()}{ext}"
+        file_path = self.local_path(f"uploads/{filename}")
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, file_path)
+
+        if not self.backend.is_local:
+            try:
+                self.backend.put_file(f"uploads/{filename}", file_path)
+            finally:
+                file_path.unlink(missing_ok=True)
+        return filename
+
+    def discard_upload(self, temp_path: Path):
+        temp_path.unlink(missing_ok=True)
+
     async def save_output(self, job_id: str, content: bytes, file_type: str) -> str:
-        job_output_path = self.outputs_path / job_id
+        job_output_path = self.local_path(f"outputs/{job_id}")
         job_output_path.mkdir(parents=True, exist_ok=True)
 
         filename = f"model.{file_type}"
@@ -41,7 +138,7 @@ class StorageService:
         return str(file_path)
 
     def save_output_sync(self, job_id: str, content: bytes, file_type: str) -> str:
-        job_output_path = self.outputs_path / job_id
+        job_output_path = self.local_path(f"outputs/{job_id}")
         job_output_path.mkdir(parents=True, exist_ok=True)
 
         filename = f"model.{file_type}"
@@ -53,8 +150,8 @@ class StorageService:
         return str(file_path)
 
     async def save_preview(self, job_id: str, content: bytes) -> str:
-        filename = f"{job_id}.png"
-        file_path = self.previews_path / filename
+        file_path = self.local_path(f"previews/{job_id}.png")
+        file_path.parent.mkdir(parents=True, exist_ok=True)
 
         async with aiofiles.open(file_path, "wb") as f:
             await f.write(content)
@@ -62,8 +159,8 @@ class StorageService:
         return str(file_path)
 
     def save_preview_sync(self, job_id: str, content: bytes) -> str:
-        filename = f"{job_id}.png"
-        file_path = self.previews_path / filename
+        file_path = self.local_path(f"previews/{job_id}.png")
+        file_path.parent.mkdir(parents=True, exist_ok=True)
 
         with open(file_path, "wb") as f:
             f.write(content)
@@ -71,31 +168,66 @@ class StorageService:
         return str(file_path)
 
     def get_upload_path(self, filename: str) -> Optional[Path]:
-        file_path = self.uploads_path / filename
+        # Uploads held by a remote backend are fetched into the local
+        # uploads directory first.
+        key = f"uploads/{filename}"
+        file_path = self.find_path(key)
         if file_path.exists():
             return file_path
+        if not self.backend.is_local:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            if self.backend.download_file(key, file_path):
+                return file_path
         return None
 
     def get_output_path(self, job_id: str, file_type: str) -> Optional[Path]:
-        file_path = self.outputs_path / job_id / f"model.{file_type}"
+        file_path = self.find_path(f"outputs/{job_id}/model.{file_type}")
         if file_path.exists():
             return file_path
         return None
 
     def get_preview_path(self, job_id: str) -> Optional[Path]:
-        file_path = self.previews_path / f"{job_id}.png"
+        file_path = self.find_path(f"previews/{job_id}.png")
         if file_path.exists():
             return file_path
         return None
 
-    def cleanup_job(self, job_id: str):
-        job_output_path = self.outputs_path / job_id
-        if job_output_path.exists():
-            shutil.rmtree(job_output_path)
-
-        preview_path = self.previews_path / f"{job_id}.png"
+    def artifact_key(self, job_id: str, name: str) -> str:
+        # "preview" or the model file suffix, e.g. "glb", "quantized.glb.gz".
+        if name == "preview":
+            return f"previews/{job_id}.png"
+        return f"outputs/{job_id}/model.{name}"
+
+    def artifact_path(self, job_id: str, name: str) -> Path:
+        return self.find_path(self.artifact_key(job_id, name))
+
+    def artifact_exists(self, job_id: str, name: str) -> bool:
+        return self.backend.exists(self.artifact_key(job_id, name))
+
+    def list_artifacts(self, job_id: str) -> Dict[str, Path]:
+        artifacts = {}
+        job_output_path = self.find_path(f"outputs/{job_id}")
+        if job_output_path.is_dir():
+            for path in sorted(job_output_path.glob("model.*")):
+                artifacts[path.name[len("model."):]] = path
+        preview_path = self.artifact_path(job_id, "preview")
         if preview_path.exists():
-            preview_path.unlink()
+            artifacts["preview"] = preview_path
+        return artifacts
+
+    def discard_local(self, job_id: str):
+        for legacy in (False, True):
+            job_output_path = self.local_path(f"outputs/{job_id}", legacy)
+            if job_output_path.exists():
+                shutil.rmtree(job_output_path)
+
+            self.local_path(f"previews/{job_id}.png", legacy).unlink(missing_ok=True)
+
+    def cleanup_job(self, job_id: str):
+        self.discard_local(job_id)
+        if not self.backend.is_local:
+            self.backend.delete_prefix(f"outputs/{job_id}/")
+            self.backend.delete(self.artifact_key(job_id, "preview"))
 
     def get_file_size(self, file_path: Path) -> int:
         if file_path.exists():
@@ -0,0 +1,364 @@
+import hashlib
+import hmac
+import os
+import shutil
+import xml.etree.ElementTree as ET
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import httpx
+
+from app.config import settings
+
+
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+S3_NAMESPACE = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+# Artifacts are written once under a job id, so caches may keep them.
+OBJECT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CONTENT_TYPES = {
+    ".glb": "model/gltf-binary",
+    ".ply": "application/x-ply",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".json": "application/json"
+}
+
+
+class StorageError(Exception):
+    pass
+
+
+def object_headers(key: str) -> Dict[str, str]:
+    # Stored with the object so signed downloads come back with the same
+    # headers the API would have sent; "x.glb.gz" is a gzip-encoded GLB.
+    headers = {"Cache-Control": OBJECT_CACHE_CONTROL}
+    suffixes = Path(key).suffixes
+    if suffixes and suffixes[-1] == ".gz":
+        headers["Content-Encoding"] = "gzip"
+        suffixes = suffixes[:-1]
+    headers["Content-Type"] = CONTENT_TYPES.get(suffixes[-1] if suffixes else "", "application/octet-stream")
+    return headers
+
+
+class StorageBackend(ABC):
+    # Where job artifacts and uploads live, addressed by keys such as
+    # "outputs/{job_id}/model.glb", "previews/{job_id}.png" and
+    # "uploads/{filename}". Workers always write to local scratch paths and
+    # publish finished files here; is_local backends already hold them.
+    is_local = False
+    supports_signed_urls = False
+
+    @abstractmethod
+    def put_file(self, key: str, path: Path):
+        pass
+
+    @abstractmethod
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    def download_file(self, key: str, path: Path) -> bool:
+        pass
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def delete(self, key: str):
+        pass
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str):
+        pass
+
+    def signed_url(self, key: str, expires_in: int, filename: Optional[str] = None) -> str:
+        # Only called on backends that set supports_signed_urls.
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LocalStorageBackend(StorageBackend):
+    is_local = True
+
+    def __init__(self, resolve: Callable[[str], Path]):
+        # resolve maps a key to its path; StorageService passes its own so
+        # the configured directories stay the single source of truth.
+        self.resolve = resolve
+
+    def put_file(self, key: str, path: Path):
+        target = self.resolve(key)
+        if Path(path).resolve() == target.resolve():
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = target.with_name(f".{target.name}.part")
+        shutil.copyfile(path, temp_path)
+        os.replace(temp_path, target)
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            return self.resolve(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def download_file(self, key: str, path: Path) -> bool:
+        source = self.resolve(key)
+        if not source.exists():
+            return False
+        if source.resolve() != Path(path).resolve():
+            shutil.copyfile(source, path)
+        return True
+
+    def exists(self, key: str) -> bool:
+        return self.resolve(key).exists()
+
+    def delete(self, key: str):
+        self.resolve(key).unlink(missing_ok=True)
+
+    def delete_prefix(self, prefix: str):
+        path = self.resolve(prefix.rstrip("/"))
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink(missing_ok=True)
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+def _canonical_query(params: Dict[str, str]) -> str:
+    return "&".join(
+        f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+        for name, value in sorted(params.items())
+    )
+
+
+def signature_v4(
+    method: str,
+    url: str,
+    params: Dict[str, str],
+    headers: Dict[str, str],
+    payload_hash: str,
+    secret_key: str,
+    region: str,
+    timestamp: datetime,
+    service: str = "s3"
+) -> str:
+    # AWS Signature Version 4 over the path, query and the given headers
+    # (names lower-cased), as implemented by S3, MinIO and Ceph. The URL
+    # path must already be percent-encoded; S3 does not encode it twice.
+    date = timestamp.strftime("%Y%m%d")
+    canonical_headers = "".join(f"{name}:{headers[name].strip()}\n" for name in sorted(headers))
+    canonical_request = "\n".join([
+        method,
+        urlsplit(url).path or "/",
+        _canonical_query(params),
+        canonical_headers,
+        ";".join(sorted(headers)),
+        payload_hash
+    ])
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256",
+        timestamp.strftime("%Y%m%dT%H%M%SZ"),
+        f"{date}/{region}/{service}/aws4_request",
+        hashlib.sha256(canonical_request.encode()).hexdigest()
+    ])
+
+    signing_key = _hmac(f"AWS4{secret_key}".encode(), date)
+    for part in (region, service, "aws4_request"):
+        signing_key = _hmac(signing_key, part)
+    return hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+
+def presign_url(
+    url: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    expires_in: int,
+    params: Optional[Dict[str, str]] = None,
+    timestamp: Optional[datetime] = None,
+    method: str = "GET"
+) -> str:
+    timestamp = timestamp or datetime.now(timezone.utc)
+    query = {
+        **(params or {}),
+        "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+        "X-Amz-Credential": f"{access_key}/{timestamp:%Y%m%d}/{region}/s3/aws4_request",
+        "X-Amz-Date": timestamp.strftime("%Y%m%dT%H%M%SZ"),
+        "X-Amz-Expires": str(expires_in),
+        "X-Amz-SignedHeaders": "host"
+    }
+    signature = signature_v4(
+        method,
+        url,
+        query,
+        {"host": urlsplit(url).netloc},
+        UNSIGNED_PAYLOAD,
+        secret_key,
+        region,
+        timestamp
+    )
+    return f"{url}?{_canonical_query(query)}&X-Amz-Signature={signature}"
+
+
+class S3StorageBackend(StorageBackend):
+    # S3-compatible object storage (AWS S3, MinIO, Ceph RGW) over httpx with
+    # path-style addressing, which every implementation accepts.
+    supports_signed_urls = True
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        public_url: Optional[str] = None,
+        client: Optional[httpx.Client] = None
+    ):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        # Signed URLs are for browsers, which may reach the store under a
+        # different host than the API does (e.g. behind a CDN or proxy).
+        self.public_url = (public_url or endpoint_url).rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.client = client or httpx.Client(timeout=httpx.Timeout(30.0, connect=5.0))
+
+    def object_url(self, key: str, base: Optional[str] = None) -> str:
+        return f"{base or self.endpoint_url}/{self.bucket}/{quote(key, safe='/-_.~')}"
+
+    def request(
+        self,
+        method: str,
+        key: str = "",
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        content=None
+    ) -> Tuple[int, bytes]:
+        url = self.object_url(key) if key else f"{self.endpoint_url}/{self.bucket}"
+        timestamp = datetime.now(timezone.utc)
+        signed = {
+            "host": urlsplit(url).netloc,
+            "x-amz-content-sha256": UNSIGNED_PAYLOAD,
+            "x-amz-date": timestamp.strftime("%Y%m%dT%H%M%SZ")
+        }
+        signature = signature_v4(
+            method, url, params or {}, signed, UNSIGNED_PAYLOAD, self.secret_key, self.region, timestamp
+        )
+        credential = f"{self.access_key}/{timestamp:%Y%m%d}/{self.region}/s3/aws4_request"
+        request_headers = {
+            **(headers or {}),
+            **{name: value for name, value in signed.items() if name != "host"},
+            "Authorization": (
+                f"AWS4-HMAC-SHA256 Credential={credential}, "
+                f"SignedHeaders={';'.join(sorted(signed))}, Signature={signature}"
+            )
+        }
+        # The query goes out exactly as it was signed.
+        if params:
+            url = f"{url}?{_canonical_query(params)}"
+
+        try:
+            request = self.client.build_request(method, url, headers=request_headers, content=content)
+            response = self.client.send(request, stream=True)
+            try:
+                # Raw bytes: "x.glb.gz" objects are stored gzip-encoded and
+                # must not be inflated on the way through.
+                body = b"".join(response.iter_raw())
+            finally:
+                response.close()
+        except httpx.HTTPError as e:
+            raise StorageError(f"{method} {key or self.bucket} failed: {e}") from e
+
+        if response.status_code >= 300 and response.status_code != 404:
+            raise StorageError(f"{method} {key or self.bucket} failed with HTTP {response.status_code}")
+        return response.status_code, body
+
+    def put_file(self, key: str, path: Path):
+        with open(path, "rb") as f:
+            status, _ = self.request("PUT", key, headers=object_headers(key), content=f)
+        if status == 404:
+            raise StorageError(f"Bucket {self.bucket} not found")
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        status, body = self.request("GET", key)
+        return None if status == 404 else body
+
+    def download_file(self, key: str, path: Path) -> bool:
+        content = self.get_bytes(key)
+        if content is None:
+            return False
+        path = Path(path)
+        temp_path = path.with_name(f".{path.name}.part")
+        temp_path.write_bytes(content)
+        os.replace(temp_path, path)
+        return True
+
+    def exists(self, key: str) -> bool:
+        status, _ = self.request("HEAD", key)
+        return status != 404
+
+    def delete(self, key: str):
+        self.request("DELETE", key)
+
+    def list_keys(self, prefix: str) -> Iterator[str]:
+        params = {"list-type": "2", "prefix": prefix}
+        while True:
+            status, body = self.request("GET", params=params)
+            if status == 404:
+                raise StorageError(f"Bucket {self.bucket} not found")
+            root = ET.fromstring(body)
+            for item in root.iter(f"{S3_NAMESPACE}Contents"):
+                yield item.findtext(f"{S3_NAMESPACE}Key")
+            token = root.findtext(f"{S3_NAMESPACE}NextContinuationToken")
+            if root.findtext(f"{S3_NAMESPACE}IsTruncated") != "true" or not token:
+                return
+            params = {**params, "continuation-token": token}
+
+    def delete_prefix(self, prefix: str):
+        # Listed up front so deletes cannot shift the listing's pages.
+        keys: List[str] = list(self.list_keys(prefix))
+        for key in keys:
+            self.delete(key)
+
+    def signed_url(self, key: str, expires_in: int, filename: Optional[str] = None) -> str:
+        params = {}
+        if filename:
+            params["response-content-disposition"] = f'attachment; filename="{filename}"'
+        return presign_url(
+            self.object_url(key, self.public_url),
+            self.access_key,
+            self.secret_key,
+            self.region,
+            expires_in,
+            params
+        )
+
+    def close(self):
+        self.client.close()
+
+
+def create_storage_backend(resolve: Callable[[str], Path]) -> StorageBackend:
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorageBackend(resolve)
+    if settings.STORAGE_BACKEND == "s3":
+        return S3StorageBackend(
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            bucket=settings.S3_BUCKET,
+            access_key=settings.S3_ACCESS_KEY,
+            secret_key=settings.S3_SECRET_KEY,
+            region=settings.S3_REGION,
+            public_url=settings.S3_PUBLIC_URL
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
@@ -0,0 +1,136 @@
+"""Move storage written in the flat layout into hashed fan-out directories.
+
+Safe to run while the API and workers are up: every entry (a job's output
+directory, a preview or an upload) moves with a single rename, and reads
+fall back to the flat layout until it has. Nothing is recorded between
+runs because the flat entries left over are the remaining work, so an
+interrupted migration resumes by running it again:
+
+    python -m app.core.storage_migration --pause 0.1
+"""
+import argparse
+import os
+import shutil
+import string
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.storage import StorageService, storage_service
+
+
+def is_shard(entry: os.DirEntry) -> bool:
+    return len(entry.name) == 2 and all(c in string.hexdigits for c in entry.name) and entry.is_dir()
+
+
+class StorageMigration:
+    def __init__(
+        self,
+        storage: StorageService = storage_service,
+        batch_size: int = 500,
+        pause: float = 0.0,
+        dry_run: bool = False
+    ):
+        self.storage = storage
+        self.batch_size = batch_size
+        # Seconds to sleep after each batch, to leave disk bandwidth for
+        # live traffic.
+        self.pause = pause
+        self.dry_run = dry_run
+
+    def legacy_entries(self, prefix: str) -> Iterator[os.DirEntry]:
+        root = self.storage.root_path(prefix)
+        if not root.is_dir():
+            return
+        with os.scandir(root) as entries:
+            for entry in entries:
+                # Hidden names are in-flight temp files such as staged uploads.
+                if entry.name.startswith(".") or is_shard(entry):
+                    continue
+                yield entry
+
+    def migrate_entry(self, prefix: str, entry: os.DirEntry, stats: Dict[str, Any]):
+        source = Path(entry.path)
+        target = self.storage.local_path(f"{prefix}/{entry.name}")
+        if self.dry_run:
+            stats["moved"] += 1
+            return
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if not target.exists():
+            try:
+                os.rename(source, target)
+                stats["moved"] += 1
+                return
+            except FileNotFoundError:
+                # Deleted (cleanup, GC) after it was listed.
+                return
+            except OSError:
+                if not target.exists():
+                    raise
+
+        # Something already wrote the new location, e.g. a job re-exported
+        # after its old directory was listed. The new copy wins.
+        if source.is_dir() and target.is_dir():
+            for child in source.iterdir():
+                child_target = target / child.name
+                if not child_target.exists():
+                    os.rename(child, child_target)
+                elif child.is_dir():
+                    shutil.rmtree(child)
+                else:
+                    child.unlink()
+            source.rmdir()
+        else:
+            source.unlink(missing_ok=True)
+        stats["merged"] += 1
+
+    def migrate(self, prefix: str) -> Dict[str, Any]:
+        stats = {"moved": 0, "merged": 0, "failed": 0, "seconds": 0.0, "errors": {}}
+        started = time.monotonic()
+        in_batch = 0
+        for entry in self.legacy_entries(prefix):
+            try:
+                self.migrate_entry(prefix, entry, stats)
+            except OSError as e:
+                stats["failed"] += 1
+                stats["errors"][entry.name] = str(e)
+
+            in_batch += 1
+            if in_batch >= self.batch_size:
+                in_batch = 0
+                if self.pause:
+                    time.sleep(self.pause)
+        stats["seconds"] = time.monotonic() - started
+        return stats
+
+    def run(self, prefixes: List[str] = ("outputs", "previews", "uploads")) -> Dict[str, Dict[str, Any]]:
+        if not self.storage.fanout_levels:
+            raise ValueError("STORAGE_FANOUT_LEVELS is 0; there is no fan-out layout to migrate to")
+        return {prefix: self.migrate(prefix) for prefix in prefixes}
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep after each batch")
+    parser.add_argument("--dry-run", action="store_true", help="count entries without moving them")
+    args = parser.parse_args(argv)
+
+    migration = StorageMigration(batch_size=args.batch_size, pause=args.pause, dry_run=args.dry_run)
+    failed = 0
+    for prefix, stats in migration.run().items():
+        done = stats["moved"] + stats["merged"]
+        rate = done / stats["seconds"] if stats["seconds"] else 0.0
+        print(
+            f"{prefix}: {stats['moved']} moved, {stats['merged']} merged, {stats['failed']} failed "
+            f"in {stats['seconds']:.1f}s ({rate:.0f}/s)"
+        )
+        for name, error in stats["errors"].items():
+            print(f"  {name}: {error}")
+        failed += stats["failed"]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
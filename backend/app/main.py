@@ -5,9 +5,15 @@ from contextlib import asynccontextmanager
 import os
 
 from app.config import settings
+from app.api.upload_limit import MULTIPART_OVERHEAD, UploadLimitMiddleware
 from app.api.v1.router import api_router
+from app.api.v1.endpoints import metrics as metrics_endpoint
 from app.api.websocket.handlers import websocket_endpoint
+from app.api.websocket.subscriber import progress_subscriber
+from app.core.artifact_gc import artifact_collector
+from app.core.queue import JobQueue
 from app.core.redis import init_redis, close_redis
+from app.core.http_client import init_http_clients, close_http_clients
 
 
 @asynccontextmanager
@@ -16,8 +22,17 @@ async def lifespan(app: FastAPI):
     os.makedirs(settings.OUTPUTS_PATH, exist_ok=True)
     os.makedirs(settings.PREVIEWS_PATH, exist_ok=True)
 
-    await init_redis()
+    redis_client = await init_redis()
+    migrated = await JobQueue(redis_client).migrate_legacy_queue()
+    if migrated:
+        print(f"Moved {migrated} jobs from the legacy pending list")
+    await init_http_clients()
+    await progress_subscriber.start(redis_client)
+    await artifact_collector.start(redis_client)
     yield
+    await artifact_collector.stop()
+    await progress_subscriber.stop()
+    await close_http_clients()
     await close_redis()
 
 
@@ -36,7 +51,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    UploadLimitMiddleware,
+    paths=[f"/api/{settings.API_VERSION}/generate/image-to-3d"],
+    max_body=settings.MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD
+)
+
 app.include_router(api_router, prefix=f"/api/{settings.API_VERSION}")
+app.include_router(metrics_endpoint.router)
 
 if os.path.exists(settings.STORAGE_PATH):
     app.mount(
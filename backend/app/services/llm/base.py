@@ -20,6 +20,9 @@ Output ONLY the enhanced prompt, nothing else. Do not include any explanations o
 
 
 class BaseLLMProvider(ABC):
+    name: str = ""
+    default_model: str = ""
+
     @abstractmethod
     async def enhance_prompt(
         self,
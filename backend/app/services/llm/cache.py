@@ -0,0 +1,112 @@
+import asyncio
+import functools
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import redis.asyncio as redis
+
+from app.config import settings
+from app.core import metrics
+from app.services.llm.base import BaseLLMProvider, ENHANCEMENT_SYSTEM_PROMPT
+
+
+SYSTEM_PROMPT_VERSION = hashlib.sha256(ENHANCEMENT_SYSTEM_PROMPT.encode()).hexdigest()[:12]
+
+
+class PromptEnhancementCache:
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[int] = None):
+        self.max_entries = max_entries or settings.PROMPT_CACHE_MAX_ENTRIES
+        self.ttl = ttl or settings.PROMPT_CACHE_TTL
+        self._local: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.stats = {"hits_local": 0, "hits_redis": 0, "misses": 0, "coalesced": 0}
+
+    def make_key(self, provider: BaseLLMProvider, prompt: str, model: Optional[str]) -> str:
+        payload = f"{provider.name}\n{model or provider.default_model}\n{SYSTEM_PROMPT_VERSION}\n{prompt}"
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _remember(self, key: str, value: Tuple[str, str]):
+        self._local[key] = value
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def enhance(
+        self,
+        provider: BaseLLMProvider,
+        prompt: str,
+        model: Optional[str] = None,
+        redis_client: Optional[redis.Redis] = None
+    ) -> Tuple[str, str]:
+        key = self.make_key(provider, prompt, model)
+
+        if key in self._local:
+            self._local.move_to_end(key)
+            self.stats["hits_local"] += 1
+            return self._local[key]
+
+        task = self._in_flight.get(key)
+        if task is None:
+            # The load runs as its own task and every caller, the first one
+            # included, only waits on it, so a caller that is cancelled does
+            # not cancel the load for the others.
+            task = asyncio.create_task(self._load(key, provider, prompt, model, redis_client))
+            self._in_flight[key] = task
+            task.add_done_callback(functools.partial(self._loaded, key))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _loaded(self, key: str, task: asyncio.Task):
+        # Runs before any waiter resumes. Reading the exception also marks it
+        # retrieved, so a miss nobody waited on any more does not log
+        # "exception was never retrieved".
+        del self._in_flight[key]
+        if not task.cancelled() and task.exception() is None:
+            self._remember(key, task.result())
+
+    async def _load(
+        self,
+        key: str,
+        provider: BaseLLMProvider,
+        prompt: str,
+        model: Optional[str],
+        redis_client: Optional[redis.Redis]
+    ) -> Tuple[str, str]:
+        redis_key = f"prompt_cache:{key}"
+
+        if redis_client is not None:
+            try:
+                cached = await redis_client.get(redis_key)
+                if cached:
+                    data = json.loads(cached)
+                    self.stats["hits_redis"] += 1
+                    return data["enhanced"], data["model"]
+            except Exception as e:
+                print(f"Prompt cache read failed: {e}")
+
+        self.stats["misses"] += 1
+        started = time.perf_counter()
+        try:
+            enhanced, model_used = await provider.enhance_prompt(prompt, model=model)
+        except Exception:
+            metrics.llm_latency.observe(time.perf_counter() - started, provider=provider.name, outcome="error")
+            raise
+        metrics.llm_latency.observe(time.perf_counter() - started, provider=provider.name, outcome="ok")
+
+        if redis_client is not None:
+            try:
+                await redis_client.set(
+                    redis_key,
+                    json.dumps({"enhanced": enhanced, "model": model_used}),
+                    ex=self.ttl
+                )
+            except Exception as e:
+                print(f"Prompt cache write failed: {e}")
+
+        return enhanced, model_used
+
+
+prompt_cache = PromptEnhancementCache()
@@ -0,0 +1,369 @@
+import io
+import json
+import math
+import struct
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from PIL import Image
+
+
+GLB_MAGIC = 0x46546C67
+JSON_CHUNK = 0x4E4F534A
+BIN_CHUNK = 0x004E4942
+
+BYTE = 5120
+UNSIGNED_BYTE = 5121
+SHORT = 5122
+UNSIGNED_SHORT = 5123
+UNSIGNED_INT = 5125
+FLOAT = 5126
+
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+COMPONENT_FORMATS = {
+    BYTE: "b", UNSIGNED_BYTE: "B", SHORT: "h", UNSIGNED_SHORT: "H", UNSIGNED_INT: "I", FLOAT: "f"
+}
+TYPE_COMPONENTS = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+
+QUANTIZATION_EXTENSION = "KHR_mesh_quantization"
+
+
+class GLBFormatError(ValueError):
+    pass
+
+
+def _pad(data: bytes, fill: bytes = b"\x00") -> bytes:
+    return data + fill * (-len(data) % 4)
+
+
+def read_glb(data: bytes) -> Tuple[Dict[str, Any], bytes]:
+    if len(data) < 20:
+        raise GLBFormatError("Not a GLB file")
+    magic, version, length = struct.unpack_from("<III", data, 0)
+    if magic != GLB_MAGIC or version != 2:
+        raise GLBFormatError("Not a glTF 2.0 binary")
+
+    gltf, binary = None, b""
+    offset = 12
+    while offset < min(length, len(data)):
+        chunk_length, chunk_type = struct.unpack_from("<II", data, offset)
+        chunk = data[offset + 8:offset + 8 + chunk_length]
+        if chunk_type == JSON_CHUNK:
+            gltf = json.loads(chunk)
+        elif chunk_type == BIN_CHUNK:
+            binary = bytes(chunk)
+        offset += 8 + chunk_length
+
+    if gltf is None:
+        raise GLBFormatError("GLB has no JSON chunk")
+    return gltf, binary
+
+
+def write_glb(gltf: Dict[str, Any], binary: bytes) -> bytes:
+    json_chunk = _pad(json.dumps(gltf, separators=(",", ":")).encode(), b" ")
+    chunks = struct.pack("<II", len(json_chunk), JSON_CHUNK) + json_chunk
+    if binary:
+        binary = _pad(binary)
+        chunks += struct.pack("<II", len(binary), BIN_CHUNK) + binary
+    return struct.pack("<III", GLB_MAGIC, 2, 12 + len(chunks)) + chunks
+
+
+def _element_layout(accessor: Dict[str, Any]) -> Tuple[str, int, int]:
+    fmt = COMPONENT_FORMATS[accessor["componentType"]]
+    components = TYPE_COMPONENTS[accessor["type"]]
+    return fmt, components, struct.calcsize(fmt) * components
+
+
+def _accessor_span(gltf: Dict[str, Any], binary: bytes, index: int) -> Tuple[bytes, Optional[int]]:
+    # Raw bytes of an accessor and its stride (None when tightly packed).
+    accessor = gltf["accessors"][index]
+    if "sparse" in accessor or "bufferView" not in accessor:
+        raise GLBFormatError("Sparse and bufferless accessors are not supported")
+    view = gltf["bufferViews"][accessor["bufferView"]]
+    if view.get("buffer", 0) != 0:
+        raise GLBFormatError("External buffers are not supported")
+
+    _, _, size = _element_layout(accessor)
+    stride = view.get("byteStride")
+    start = view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+    count = accessor["count"]
+    if stride and stride != size:
+        return binary[start:start + (count - 1) * stride + size], stride
+    return binary[start:start + count * size], None
+
+
+def read_accessor(gltf: Dict[str, Any], binary: bytes, index: int) -> array:
+    # Flat component values as stored (normalized integers stay integers).
+    accessor = gltf["accessors"][index]
+    fmt, components, size = _element_layout(accessor)
+    span, stride = _accessor_span(gltf, binary, index)
+    if stride:
+        span = b"".join(span[i * stride:i * stride + size] for i in range(accessor["count"]))
+    values = array(fmt)
+    values.frombytes(span)
+    return values
+
+
+def _pack(fmt: str, values: Sequence, components: int, padded_components: int) -> bytes:
+    # Pads each element with zero components so vertex attributes stay
+    # 4-byte aligned as glTF requires.
+    if padded_components == components:
+        return array(fmt, values).tobytes()
+    out = array(fmt, bytes(struct.calcsize(fmt) * padded_components * (len(values) // components)))
+    for c in range(components):
+        out[c::padded_components] = array(fmt, values[c::components])
+    return out.tobytes()
+
+
+class _Builder:
+    def __init__(self):
+        self.binary = bytearray()
+        self.views: List[Dict[str, Any]] = []
+
+    def add(self, data: bytes, stride: Optional[int] = None, target: Optional[int] = None) -> int:
+        self.binary.extend(b"\x00" * (-len(self.binary) % 4))
+        view = {"buffer": 0, "byteOffset": len(self.binary), "byteLength": len(data)}
+        if stride:
+            view["byteStride"] = stride
+        if target:
+            view["target"] = target
+        self.binary.extend(data)
+        self.views.append(view)
+        return len(self.views) - 1
+
+
+def _attribute_roles(gltf: Dict[str, Any]) -> Dict[int, str]:
+    roles: Dict[int, str] = {}
+    for mesh in gltf.get("meshes", []):
+        for primitive in mesh["primitives"]:
+            for name, index in primitive.get("attributes", {}).items():
+                roles.setdefault(index, name)
+            if "indices" in primitive:
+                roles.setdefault(primitive["indices"], "INDICES")
+    return roles
+
+
+def _quantizable_meshes(gltf: Dict[str, Any]) -> List[int]:
+    # Positions are dequantized by a node transform, so only meshes that are
+    # placed by nodes and have no morph targets or skins qualify.
+    placed = {node["mesh"] for node in gltf.get("nodes", []) if "mesh" in node}
+    skinned = {node["mesh"] for node in gltf.get("nodes", []) if "mesh" in node and "skin" in node}
+    return [
+        index for index, mesh in enumerate(gltf.get("meshes", []))
+        if index in placed and index not in skinned
+        and not any("targets" in primitive for primitive in mesh["primitives"])
+    ]
+
+
+def _position_grids(gltf: Dict[str, Any], binary: bytes, bits: int) -> Dict[int, Tuple[List[float], float]]:
+    # One uniform grid per mesh: (origin, step). A uniform scale keeps
+    # normals valid under the dequantization transform.
+    grids = {}
+    for mesh_index in _quantizable_meshes(gltf):
+        lows, highs = [math.inf] * 3, [-math.inf] * 3
+        for primitive in gltf["meshes"][mesh_index]["primitives"]:
+            position = primitive.get("attributes", {}).get("POSITION")
+            if position is None or gltf["accessors"][position]["componentType"] != FLOAT:
+                break
+            values = read_accessor(gltf, binary, position)
+            for c in range(3):
+                axis = values[c::3]
+                if axis:
+                    lows[c] = min(lows[c], min(axis))
+                    highs[c] = max(highs[c], max(axis))
+        else:
+            if lows[0] == math.inf:
+                continue
+            extent = max(h - l for h, l in zip(highs, lows))
+            grids[mesh_index] = (lows, (extent / ((1 << bits) - 1)) or 1.0)
+    return grids
+
+
+def compact_texture(content: bytes, quality: int) -> Tuple[bytes, str]:
+    # Opaque PNG textures become JPEG; anything with real transparency, or
+    # that JPEG would not shrink, is kept as is.
+    image = Image.open(io.BytesIO(content))
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        image = image.convert("RGBA")
+        if image.getchannel("A").getextrema()[0] < 255:
+            return content, "image/png"
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG", quality=quality, optimize=True)
+    if buffer.tell() >= len(content):
+        return content, "image/png"
+    return buffer.getvalue(), "image/jpeg"
+
+
+def quantize_glb(
+    data: bytes,
+    position_bits: int = 14,
+    texcoord_bits: int = 12,
+    texture_quality: Optional[int] = 85
+) -> bytes:
+    # Rewrites a GLB with KHR_mesh_quantization: positions on a 16-bit
+    # integer grid per mesh, normals as normalized bytes, texcoords as
+    # normalized shorts, indices as shorts where they fit, and opaque PNG
+    # textures re-encoded as JPEG. Loaders that know the extension decode
+    # it without any codec, and the reduced precision also makes the file
+    # compress much better with gzip.
+    gltf, binary = read_glb(data)
+    if len(gltf.get("buffers", [])) > 1 or any("uri" in buffer for buffer in gltf.get("buffers", [])):
+        raise GLBFormatError("External buffers are not supported")
+
+    roles = _attribute_roles(gltf)
+    grids = _position_grids(gltf, binary, position_bits)
+    positions = {
+        primitive["attributes"]["POSITION"]: mesh_index
+        for mesh_index in grids
+        for primitive in gltf["meshes"][mesh_index]["primitives"]
+    }
+    builder = _Builder()
+    quantized = bool(grids)
+
+    for index, accessor in enumerate(gltf.get("accessors", [])):
+        role = roles.get(index)
+        is_float = accessor["componentType"] == FLOAT
+        target = ELEMENT_ARRAY_BUFFER if role == "INDICES" else ARRAY_BUFFER if role else None
+
+        if index in positions:
+            origin, step = grids[positions[index]]
+            values = read_accessor(gltf, binary, index)
+            grid = [round((values[i] - origin[i % 3]) / step) for i in range(len(values))]
+            accessor.update(
+                componentType=UNSIGNED_SHORT,
+                min=[min(grid[c::3], default=0) for c in range(3)],
+                max=[max(grid[c::3], default=0) for c in range(3)]
+            )
+            accessor["bufferView"] = builder.add(_pack("H", grid, 3, 4), 8, target)
+        elif role == "NORMAL" and is_float:
+            values = read_accessor(gltf, binary, index)
+            packed = [max(-127, min(127, round(v * 127))) for v in values]
+            accessor.update(componentType=BYTE, normalized=True)
+            accessor.pop("min", None)
+            accessor.pop("max", None)
+            accessor["bufferView"] = builder.add(_pack("b", packed, 3, 4), 4, target)
+            quantized = True
+        elif role and role.startswith("TEXCOORD_") and is_float:
+            values = read_accessor(gltf, binary, index)
+            if values and (min(values) < 0 or max(values) > 1):
+                accessor["bufferView"] = builder.add(values.tobytes(), None, target)
+            else:
+                levels = (1 << texcoord_bits) - 1
+                packed = [round(round(v * levels) * 65535 / levels) for v in values]
+                accessor.update(componentType=UNSIGNED_SHORT, normalized=True)
+                accessor.pop("min", None)
+                accessor.pop("max", None)
+                accessor["bufferView"] = builder.add(_pack("H", packed, 2, 2), None, target)
+                quantized = True
+        elif role == "INDICES" and accessor["componentType"] == UNSIGNED_INT:
+            values = read_accessor(gltf, binary, index)
+            if values and max(values) < 0xFFFF:
+                accessor["componentType"] = UNSIGNED_SHORT
+                values = array("H", values)
+            accessor["bufferView"] = builder.add(values.tobytes(), None, target)
+        else:
+            span, stride = _accessor_span(gltf, binary, index)
+            accessor["bufferView"] = builder.add(span, stride, target)
+        accessor.pop("byteOffset", None)
+
+    for image in gltf.get("images", []):
+        if "bufferView" not in image:
+            continue
+        view = gltf["bufferViews"][image["bufferView"]]
+        content = binary[view.get("byteOffset", 0):view.get("byteOffset", 0) + view["byteLength"]]
+        if texture_quality and image.get("mimeType") == "image/png":
+            content, image["mimeType"] = compact_texture(content, texture_quality)
+        image["bufferView"] = builder.add(content)
+
+    nodes = gltf.get("nodes", [])
+    for node in list(nodes):
+        mesh_index = node.get("mesh")
+        if mesh_index not in grids:
+            continue
+        # The dequantization transform goes on a new child node so the
+        # original node's children do not inherit it.
+        origin, step = grids[mesh_index]
+        del node["mesh"]
+        nodes.append({"mesh": mesh_index, "translation": origin, "scale": [step] * 3})
+        node.setdefault("children", []).append(len(nodes) - 1)
+
+    gltf["bufferViews"] = builder.views
+    gltf["buffers"] = [{"byteLength": len(builder.binary)}]
+    if quantized:
+        for key in ["extensionsUsed", "extensionsRequired"]:
+            extensions = gltf.setdefault(key, [])
+            if QUANTIZATION_EXTENSION not in extensions:
+                extensions.append(QUANTIZATION_EXTENSION)
+
+    return write_glb(gltf, bytes(builder.binary))
+
+
+def build_glb(
+    positions: Sequence[float],
+    normals: Sequence[float],
+    texcoords: Sequence[float],
+    indices: Sequence[int],
+    texture_png: Optional[bytes] = None
+) -> bytes:
+    # A single textured triangle mesh with float attributes, laid out the
+    # way trimesh exports TRELLIS meshes.
+    builder = _Builder()
+    count = len(positions) // 3
+    accessors = [
+        {
+            "bufferView": builder.add(array("f", positions).tobytes(), None, ARRAY_BUFFER),
+            "componentType": FLOAT, "count": count, "type": "VEC3",
+            "min": [min(positions[c::3]) for c in range(3)],
+            "max": [max(positions[c::3]) for c in range(3)]
+        },
+        {
+            "bufferView": builder.add(array("f", normals).tobytes(), None, ARRAY_BUFFER),
+            "componentType": FLOAT, "count": count, "type": "VEC3"
+        },
+        {
+            "bufferView": builder.add(array("f", texcoords).tobytes(), None, ARRAY_BUFFER),
+            "componentType": FLOAT, "count": count, "type": "VEC2"
+        },
+        {
+            "bufferView": builder.add(array("I", indices).tobytes(), None, ELEMENT_ARRAY_BUFFER),
+            "componentType": UNSIGNED_INT, "count": len(indices), "type": "SCALAR"
+        }
+    ]
+    primitive = {"attributes": {"POSITION": 0, "NORMAL": 1, "TEXCOORD_0": 2}, "indices": 3, "mode": 4}
+    gltf: Dict[str, Any] = {
+        "asset": {"version": "2.0", "generator": "trellis-backend"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [primitive]}],
+        "accessors": accessors
+    }
+    if texture_png:
+        primitive["material"] = 0
+        gltf["images"] = [{"bufferView": builder.add(texture_png), "mimeType": "image/png"}]
+        gltf["textures"] = [{"source": 0}]
+        gltf["materials"] = [{"pbrMetallicRoughness": {"baseColorTexture": {"index": 0}}}]
+    gltf["bufferViews"] = builder.views
+    gltf["buffers"] = [{"byteLength": len(builder.binary)}]
+    return write_glb(gltf, bytes(builder.binary))
+
+
+def uv_sphere(rings: int, segments: int) -> Tuple[List[float], List[float], List[float], List[int]]:
+    # Positions, normals, texcoords and indices of a unit sphere; stands in
+    # for generated meshes in the mock pipeline and benchmarks.
+    positions, normals, texcoords, indices = [], [], [], []
+    for ring in range(rings + 1):
+        theta = math.pi * ring / rings
+        for segment in range(segments + 1):
+            phi = 2 * math.pi * segment / segments
+            normal = [math.sin(theta) * math.cos(phi), math.cos(theta), math.sin(theta) * math.sin(phi)]
+            positions.extend(normal)
+            normals.extend(normal)
+            texcoords.extend([segment / segments, ring / rings])
+    for ring in range(rings):
+        for segment in range(segments):
+            a = ring * (segments + 1) + segment
+            b = a + segments + 1
+            indices.extend([a, b, a + 1, a + 1, b, b + 1])
+    return positions, normals, texcoords, indices
@@ -1,7 +1,12 @@
 import os
 import sys
 import io
-from typing import Dict, Any, Optional, Callable, List
+import gzip
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Optional, Callable, List, Tuple
 from pathlib import Path
 from PIL import Image
 import torch
@@ -11,20 +16,54 @@ if TRELLIS_PATH not in sys.path:
     sys.path.insert(0, TRELLIS_PATH)
 
 from app.config import settings
+from app.core.exceptions import JobCancelledException, JobTimeoutException
 from app.core.storage import storage_service
+from app.core.scheduler import DEFAULT_SAMPLER_PARAMS
+from app.services.trellis.glb import build_glb, quantize_glb, uv_sphere
 
 
 os.environ['SPCONV_ALGO'] = 'native'
 
+# Stage reported while each artifact exports; these run concurrently.
+EXPORT_STAGES = {"glb": "exporting_glb", "ply": "exporting_ply", "preview": "generating_preview"}
+
+# Optional re-encodings of the exported GLB, stored as model.<name>.glb.
+GLB_VARIANTS = {
+    "quantized": lambda data: quantize_glb(
+        data,
+        position_bits=settings.GLB_POSITION_BITS,
+        texcoord_bits=settings.GLB_TEXCOORD_BITS,
+        texture_quality=settings.GLB_TEXTURE_QUALITY
+    )
+}
+
 
 class TRELLISPipeline:
     def __init__(self):
-        self.image_pipeline = None
-        self.text_pipeline = None
         self.device = settings.TRELLIS_DEVICE
         self._initialized = False
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self.pipelines: "OrderedDict[str, Any]" = OrderedDict()
+        self.pipeline_memory: Dict[str, int] = {}
+        # Sizes measured on earlier loads, kept after eviction so the next
+        # load of the same modality can make room for it up front.
+        self.measured_memory: Dict[str, int] = {}
+        self.memory_budget = settings.PIPELINE_MEMORY_BUDGET_MB * 1024 * 1024
+        self.load_stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        # Synthetic per-artifact export costs in seconds for the mock
+        # pipeline, used by benchmarks.
+        self.mock_export_costs: Dict[str, float] = {}
+        # Mock sampling seconds per stage, and the share of that each extra
+        # job in a batch adds on top (GPUs amortize most of a batch).
+        self.mock_stage_seconds = 0.5
+        self.mock_batch_marginal_cost = 0.3
+        # A real (untextured) mesh so GLB variants work without TRELLIS.
+        self.mock_glb = build_glb(*uv_sphere(16, 32))
 
     def initialize(self):
+        # Only resolves the TRELLIS modules; model weights are loaded on the
+        # first job of each modality by get_pipeline().
         if self._initialized:
             return
 
@@ -35,36 +74,118 @@ class TRELLISPipeline:
             self.render_utils = render_utils
             self.postprocessing_utils = postprocessing_utils
 
-            print(f"Loading TRELLIS image model from {settings.TRELLIS_MODEL_PATH}...")
-            self.image_pipeline = TrellisImageTo3DPipeline.from_pretrained(
-                settings.TRELLIS_MODEL_PATH
-            )
-            if self.device == "cuda":
-                self.image_pipeline.cuda()
-
-            print(f"Loading TRELLIS text model from {settings.TRELLIS_TEXT_MODEL_PATH}...")
-            self.text_pipeline = TrellisTextTo3DPipeline.from_pretrained(
-                settings.TRELLIS_TEXT_MODEL_PATH
-            )
-            if self.device == "cuda":
-                self.text_pipeline.cuda()
+            self._loaders = {
+                "image": lambda: TrellisImageTo3DPipeline.from_pretrained(settings.TRELLIS_MODEL_PATH),
+                "text": lambda: TrellisTextTo3DPipeline.from_pretrained(settings.TRELLIS_TEXT_MODEL_PATH)
+            }
 
             self._initialized = True
-            print("TRELLIS pipelines initialized successfully")
+            print("TRELLIS available, pipelines will be loaded on first use")
 
         except ImportError as e:
             print(f"TRELLIS not installed: {e}")
             print("Running in mock mode for development")
             self._initialized = True
 
-    def _get_sampler_params(self, resolution: str, params: Optional[Dict] = None) -> Dict:
-        defaults = {
-            "low": {"steps": 8, "cfg_strength": 7.5},
-            "medium": {"steps": 12, "cfg_strength": 7.5},
-            "high": {"steps": 20, "cfg_strength": 7.5}
+    def _estimate_memory(self, pipeline: Any) -> int:
+        total = 0
+        for model in getattr(pipeline, "models", {}).values():
+            for tensor in list(model.parameters()) + list(model.buffers()):
+                total += tensor.numel() * tensor.element_size()
+        return total
+
+    def _record(self, modality: str, event: str, seconds: float):
+        stats = self.load_stats.setdefault(modality, {
+            "loads": 0,
+            "evictions": 0,
+            "last_load_seconds": None,
+            "last_evict_seconds": None
+        })
+        stats["loads" if event == "load" else "evictions"] += 1
+        stats[f"last_{event}_seconds"] = round(seconds, 3)
+
+    def _evict(self, modality: str):
+        started = time.perf_counter()
+        pipeline = self.pipelines.pop(modality)
+        freed = self.pipeline_memory.pop(modality, 0)
+        del pipeline
+        self.release_memory()
+        elapsed = time.perf_counter() - started
+        self._record(modality, "evict", elapsed)
+        print(f"Evicted {modality} pipeline ({freed / 1024 ** 2:.0f} MiB) in {elapsed:.2f}s")
+
+    def release_memory(self):
+        # Returns cached blocks of freed tensors, e.g. after an aborted run.
+        if self.device == "cuda":
+            torch.cuda.empty_cache()
+
+    def expected_memory(self, modality: str) -> int:
+        if modality in self.measured_memory:
+            return self.measured_memory[modality]
+        if settings.PIPELINE_MEMORY_ESTIMATE_MB:
+            return settings.PIPELINE_MEMORY_ESTIMATE_MB * 1024 * 1024
+        return self.memory_budget
+
+    def get_pipeline(self, modality: str) -> Optional[Any]:
+        self.initialize()
+        if modality not in self._loaders:
+            return None
+
+        with self._lock:
+            if modality in self.pipelines:
+                self.pipelines.move_to_end(modality)
+                return self.pipelines[modality]
+
+            # Room is made before loading so the new weights never sit on top
+            # of pipelines that would be evicted for them. Without a measured
+            # size or PIPELINE_MEMORY_ESTIMATE_MB, it is assumed to need the
+            # whole budget.
+            expected = self.expected_memory(modality)
+            while (
+                self.memory_budget
+                and self.pipelines
+                and sum(self.pipeline_memory.values()) + expected > self.memory_budget
+            ):
+                self._evict(next(iter(self.pipelines)))
+
+            started = time.perf_counter()
+            print(f"Loading TRELLIS {modality} pipeline...")
+            pipeline = self._loaders[modality]()
+            if self.device == "cuda":
+                pipeline.cuda()
+            elapsed = time.perf_counter() - started
+
+            self.pipelines[modality] = pipeline
+            self.pipeline_memory[modality] = self._estimate_memory(pipeline)
+            self.measured_memory[modality] = self.pipeline_memory[modality]
+            self._record(modality, "load", elapsed)
+            print(
+                f"Loaded {modality} pipeline "
+                f"({self.pipeline_memory[modality] / 1024 ** 2:.0f} MiB) in {elapsed:.2f}s"
+            )
+
+            # A pipeline larger than expected can still leave the total over
+            # budget. Least recently used pipelines go first; the one just
+            # loaded is kept even if it alone exceeds the budget.
+            while (
+                self.memory_budget
+                and sum(self.pipeline_memory.values()) > self.memory_budget
+                and len(self.pipelines) > 1
+            ):
+                self._evict(next(iter(self.pipelines)))
+
+            return pipeline
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": list(self.pipelines.keys()),
+            "memory_bytes": dict(self.pipeline_memory),
+            "memory_budget_bytes": self.memory_budget,
+            "events": {k: dict(v) for k, v in self.load_stats.items()}
         }
 
-        result = defaults.get(resolution, defaults["medium"]).copy()
+    def _get_sampler_params(self, resolution: str, params: Optional[Dict] = None) -> Dict:
+        result = DEFAULT_SAMPLER_PARAMS.get(resolution, DEFAULT_SAMPLER_PARAMS["medium"]).copy()
 
         if params:
             result.update(params)
@@ -79,6 +200,8 @@ class TRELLISPipeline:
         resolution: str = "medium",
         sparse_structure_sampler_params: Optional[Dict] = None,
         slat_sampler_params: Optional[Dict] = None,
+        texture_size: int = 1024,
+        simplify: float = 0.95,
         progress_callback: Optional[Callable[[int, str, int], None]] = None
     ) -> Dict[str, Any]:
         self.initialize()
@@ -88,7 +211,8 @@ class TRELLISPipeline:
 
         image = Image.open(image_path)
 
-        if self.image_pipeline is None:
+        image_pipeline = self.get_pipeline("image")
+        if image_pipeline is None:
             return self._mock_generate(job_id, progress_callback)
 
         if progress_callback:
@@ -100,7 +224,7 @@ class TRELLISPipeline:
         if progress_callback:
             progress_callback(30, "generating_sparse_structure", 0)
 
-        outputs = self.image_pipeline.run(
+        outputs = image_pipeline.run(
             image,
             seed=seed or 42,
             formats=["mesh", "gaussian"],
@@ -112,7 +236,7 @@ class TRELLISPipeline:
         if progress_callback:
             progress_callback(70, "exporting", 0)
 
-        return self._export_outputs(job_id, outputs, progress_callback)
+        return self._export_outputs(job_id, outputs, texture_size, simplify, progress_callback)
 
     def generate_from_text(
         self,
@@ -122,6 +246,8 @@ class TRELLISPipeline:
         resolution: str = "medium",
         sparse_structure_sampler_params: Optional[Dict] = None,
         slat_sampler_params: Optional[Dict] = None,
+        texture_size: int = 1024,
+        simplify: float = 0.95,
         progress_callback: Optional[Callable[[int, str, int], None]] = None
     ) -> Dict[str, Any]:
         self.initialize()
@@ -129,7 +255,8 @@ class TRELLISPipeline:
         if progress_callback:
             progress_callback(10, "preparing_prompt", 100)
 
-        if self.text_pipeline is None:
+        text_pipeline = self.get_pipeline("text")
+        if text_pipeline is None:
             return self._mock_generate(job_id, progress_callback)
 
         ss_params = self._get_sampler_params(resolution, sparse_structure_sampler_params)
@@ -138,7 +265,7 @@ class TRELLISPipeline:
         if progress_callback:
             progress_callback(30, "generating_sparse_structure", 0)
 
-        outputs = self.text_pipeline.run(
+        outputs = text_pipeline.run(
             prompt,
             seed=seed or 42,
             formats=["mesh", "gaussian"],
@@ -149,113 +276,299 @@ class TRELLISPipeline:
         if progress_callback:
             progress_callback(70, "exporting", 0)
 
-        return self._export_outputs(job_id, outputs, progress_callback)
+        return self._export_outputs(job_id, outputs, texture_size, simplify, progress_callback)
 
     def _export_outputs(
         self,
         job_id: str,
         outputs: Dict,
+        texture_size: int = 1024,
+        simplify: float = 0.95,
         progress_callback: Optional[Callable] = None
     ) -> Dict[str, Any]:
-        result = {
-            "glb_path": None,
-            "ply_path": None,
-            "preview_path": None,
-            "file_sizes": {}
-        }
-
-        try:
-            if progress_callback:
-                progress_callback(75, "exporting_glb", 0)
+        gaussian = outputs['gaussian'][0]
+        mesh = outputs['mesh'][0]
 
+        def export_glb() -> Tuple[str, int]:
             glb = self.postprocessing_utils.to_glb(
-                outputs['gaussian'][0],
-                outputs['mesh'][0],
-                simplify=0.95,
-                texture_size=1024,
+                gaussian,
+                mesh,
+                simplify=simplify,
+                texture_size=texture_size,
                 verbose=False
             )
-
             glb_buffer = io.BytesIO()
             glb.export(glb_buffer, file_type='glb')
-            glb_data = glb_buffer.getvalue()
-
-            glb_path = storage_service.save_output_sync(job_id, glb_data, "glb")
-            result["glb_path"] = glb_path
-            result["file_sizes"]["glb"] = len(glb_data)
-
-            if progress_callback:
-                progress_callback(85, "exporting_ply", 0)
+            return self._save_glb(job_id, glb_buffer.getvalue())
 
+        def export_ply() -> Tuple[str, int]:
             ply_buffer = io.BytesIO()
-            outputs['gaussian'][0].save_ply(ply_buffer)
+            gaussian.save_ply(ply_buffer)
             ply_data = ply_buffer.getvalue()
+            return storage_service.save_output_sync(job_id, ply_data, "ply"), len(ply_data)
+
+        def export_preview() -> Optional[Tuple[str, int]]:
+            video = self.render_utils.render_video(gaussian, num_frames=1)
+            if not video or 'color' not in video or len(video['color']) == 0:
+                return None
+            preview_img = Image.fromarray(video['color'][0])
+            preview_buffer = io.BytesIO()
+            preview_img.save(preview_buffer, format='PNG')
+            preview_data = preview_buffer.getvalue()
+            return storage_service.save_preview_sync(job_id, preview_data), len(preview_data)
+
+        try:
+            return self._run_exporters(
+                job_id,
+                {"glb": export_glb, "ply": export_ply, "preview": export_preview},
+                progress_callback
+            )
+        except Exception as e:
+            print(f"Export error: {e}")
+            raise
+        finally:
+            self.release_memory()
+
+    def _save_glb(self, job_id: str, glb_data: bytes) -> Tuple[str, int, Dict[str, int]]:
+        # Writes the GLB plus the configured variants and, with
+        # GLB_PRECOMPRESS, a gzip sibling of each for Content-Encoding.
+        path = storage_service.save_output_sync(job_id, glb_data, "glb")
+        if settings.GLB_PRECOMPRESS:
+            storage_service.save_output_sync(job_id, gzip.compress(glb_data, mtime=0), "glb.gz")
+
+        # Variants are optional: whatever goes wrong building or writing one
+        # (an unknown name, a texture PIL cannot decode, a GLB layout the
+        # encoder does not expect), the job still completes with the GLB.
+        variant_sizes = {}
+        for name in settings.GLB_VARIANTS:
+            try:
+                variant = GLB_VARIANTS[name](glb_data)
+                storage_service.save_output_sync(job_id, variant, f"{name}.glb")
+                if settings.GLB_PRECOMPRESS:
+                    storage_service.save_output_sync(job_id, gzip.compress(variant, mtime=0), f"{name}.glb.gz")
+            except Exception as e:
+                print(f"Skipping GLB variant {name} for {job_id}: {e!r}")
+                continue
+            variant_sizes[f"glb_{name}"] = len(variant)
+
+        return path, len(glb_data), variant_sizes
 
-            ply_path = storage_service.save_output_sync(job_id, ply_data, "ply")
-            result["ply_path"] = ply_path
-            result["file_sizes"]["ply"] = len(ply_data)
+    def _run_exporters(
+        self,
+        job_id: str,
+        producers: Dict[str, Callable[[], Optional[Tuple]]],
+        progress_callback: Optional[Callable] = None
+    ) -> Dict[str, Any]:
+        # Artifacts only read the generated outputs, so they are produced
+        # side by side on a bounded pool; a failed preview is not fatal.
+        # Producers return (path, size) or (path, size, extra_sizes) when
+        # they also wrote derived files.
+        result = {
+            "glb_path": None,
+            "ply_path": None,
+            "preview_path": None,
+            "file_sizes": {},
+            "export_timings": {}
+        }
+        lock = threading.Lock()
+        finished = [0]
+
+        def current_progress() -> int:
+            return 75 + 20 * finished[0] // len(producers)
 
+        def run(name: str, producer: Callable):
+            stage = EXPORT_STAGES.get(name, f"exporting_{name}")
             if progress_callback:
-                progress_callback(95, "generating_preview", 0)
+                progress_callback(current_progress(), stage, 0)
+            started = time.perf_counter()
+            try:
+                return producer(), time.perf_counter() - started
+            finally:
+                with lock:
+                    finished[0] += 1
+                if progress_callback:
+                    progress_callback(current_progress(), stage, 100)
+
+        export_started = time.perf_counter()
+        with ThreadPoolExecutor(
+            max_workers=settings.EXPORT_MAX_WORKERS,
+            thread_name_prefix=f"export-{job_id[:8]}"
+        ) as pool:
+            futures = {pool.submit(run, name, producer): name for name, producer in producers.items()}
+
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    output, elapsed = future.result()
+                except (JobCancelledException, JobTimeoutException):
+                    # Raised by the progress callback, not the renderer: the
+                    # job must stop even if only the preview saw it.
+                    raise
+                except Exception as e:
+                    if name != "preview":
+                        raise
+                    print(f"Failed to generate preview: {e}")
+                    continue
+
+                result["export_timings"][name] = round(elapsed, 3)
+                if output:
+                    path, size, *extra = output
+                    result[f"{name}_path"] = path
+                    if name != "preview":
+                        result["file_sizes"][name] = size
+                    if extra:
+                        result["file_sizes"].update(extra[0])
+
+        result["export_timings"]["total"] = round(time.perf_counter() - export_started, 3)
+        timings = ", ".join(f"{k}={v:.2f}s" for k, v in result["export_timings"].items())
+        print(f"Export timings for {job_id}: {timings}")
+
+        return result
 
+    def generate_batch(
+        self,
+        job_type: str,
+        items: List[Dict[str, Any]],
+        seed: Optional[int] = None,
+        resolution: str = "medium",
+        sparse_structure_sampler_params: Optional[Dict] = None,
+        slat_sampler_params: Optional[Dict] = None
+    ) -> List[Any]:
+        # Each item carries job_id, prompt or image_path, texture_size,
+        # simplify and progress_callback. Sampling runs once for the batch,
+        # exports run per job. Returns each job's result or exception.
+        self.initialize()
+        dropped: Dict[int, Exception] = {}
+
+        def report(progress: int, stage: str, stage_progress: int):
+            # A job whose callback raises (cancelled or timed out) leaves the
+            # batch and skips export; sampling stops once no job is left.
+            for index, item in enumerate(items):
+                if index in dropped or not item.get("progress_callback"):
+                    continue
+                try:
+                    item["progress_callback"](progress, stage, stage_progress)
+                except Exception as e:
+                    dropped[index] = e
+            if len(dropped) == len(items):
+                raise next(iter(dropped.values()))
+
+        modality = "image" if job_type == "image_to_3d" else "text"
+        pipeline = self.get_pipeline(modality)
+
+        outputs = None
+        try:
+            if pipeline is None:
+                self._mock_sample(report, len(items))
+            else:
+                if modality == "image":
+                    report(10, "loading_image", 100)
+                    inputs = [pipeline.preprocess_image(Image.open(item["image_path"])) for item in items]
+                    report(20, "preprocessing", 100)
+                else:
+                    report(10, "preparing_prompt", 100)
+                    inputs = [item["prompt"] for item in items]
+
+                ss_params = self._get_sampler_params(resolution, sparse_structure_sampler_params)
+                slat_params = self._get_sampler_params(resolution, slat_sampler_params)
+
+                report(30, "generating_sparse_structure", 0)
+                outputs = self._run_batched(pipeline, inputs, seed or 42, ss_params, slat_params)
+                report(70, "exporting", 0)
+        except Exception:
+            if len(dropped) < len(items):
+                raise
+            self.release_memory()
+            return [dropped[index] for index in range(len(items))]
+
+        results: List[Any] = []
+        for index, item in enumerate(items):
+            if index in dropped:
+                results.append(dropped[index])
+                continue
             try:
-                video = self.render_utils.render_video(outputs['gaussian'][0], num_frames=1)
-                if video and 'color' in video and len(video['color']) > 0:
-                    preview_frame = video['color'][0]
-                    preview_img = Image.fromarray(preview_frame)
-                    preview_buffer = io.BytesIO()
-                    preview_img.save(preview_buffer, format='PNG')
-                    preview_data = preview_buffer.getvalue()
-                    preview_path = storage_service.save_preview_sync(job_id, preview_data)
-                    result["preview_path"] = preview_path
+                if outputs is None:
+                    results.append(self._mock_export(item["job_id"], item.get("progress_callback")))
+                else:
+                    results.append(self._export_outputs(
+                        item["job_id"],
+                        {"gaussian": [outputs["gaussian"][index]], "mesh": [outputs["mesh"][index]]},
+                        item.get("texture_size", 1024),
+                        item.get("simplify", 0.95),
+                        item.get("progress_callback")
+                    ))
             except Exception as e:
-                print(f"Failed to generate preview: {e}")
+                results.append(e)
 
-        except Exception as e:
-            print(f"Export error: {e}")
-            raise
-
-        finally:
-            if self.device == "cuda":
-                torch.cuda.empty_cache()
+        return results
 
-        return result
+    @torch.no_grad()
+    def _run_batched(
+        self,
+        pipeline: Any,
+        inputs: List[Any],
+        seed: int,
+        ss_params: Dict,
+        slat_params: Dict
+    ) -> Dict[str, List[Any]]:
+        # The TRELLIS run() methods take one prompt or image; this is the same
+        # sequence of steps with one conditioning row per job.
+        cond = pipeline.get_cond(inputs)
+        torch.manual_seed(seed)
+        coords = pipeline.sample_sparse_structure(cond, len(inputs), ss_params)
+        slat = pipeline.sample_slat(cond, coords, slat_params)
+        return pipeline.decode_slat(slat, ["mesh", "gaussian"])
 
     def _mock_generate(
         self,
         job_id: str,
         progress_callback: Optional[Callable] = None
     ) -> Dict[str, Any]:
-        import time
+        self._mock_sample(progress_callback, 1)
+        return self._mock_export(job_id, progress_callback)
 
+    def _mock_sample(self, progress_callback: Optional[Callable], batch_size: int):
         stages = [
             (20, "preprocessing", 100),
             (40, "generating_sparse_structure", 100),
-            (60, "generating_slat", 100),
-            (80, "exporting", 100),
-            (95, "finalizing", 100)
+            (60, "generating_slat", 100)
         ]
+        stage_seconds = self.mock_stage_seconds * (1 + self.mock_batch_marginal_cost * (batch_size - 1))
 
         for progress, stage, stage_progress in stages:
             if progress_callback:
                 progress_callback(progress, stage, stage_progress)
-            time.sleep(0.5)
+            time.sleep(stage_seconds)
 
-        mock_glb = b"mock_glb_content"
-        mock_ply = b"mock_ply_content"
+    def _mock_export(
+        self,
+        job_id: str,
+        progress_callback: Optional[Callable] = None
+    ) -> Dict[str, Any]:
+        def mock_producer(name: str, content: bytes):
+            def produce() -> Tuple:
+                time.sleep(self.mock_export_costs.get(name, 0))
+                if name == "preview":
+                    return storage_service.save_preview_sync(job_id, content), len(content)
+                if name == "glb":
+                    return self._save_glb(job_id, content)
+                return storage_service.save_output_sync(job_id, content, name), len(content)
+            return produce
+
+        producers = {
+            "glb": mock_producer("glb", self.mock_glb),
+            "ply": mock_producer("ply", b"mock_ply_content")
+        }
+        if "preview" in self.mock_export_costs:
+            producers["preview"] = mock_producer("preview", b"mock_preview_content")
 
-        glb_path = storage_service.save_output_sync(job_id, mock_glb, "glb")
-        ply_path = storage_service.save_output_sync(job_id, mock_ply, "ply")
+        result = self._run_exporters(job_id, producers, progress_callback)
 
-        return {
-            "glb_path": glb_path,
-            "ply_path": ply_path,
-            "preview_path": None,
-            "file_sizes": {
-                "glb": len(mock_glb),
-                "ply": len(mock_ply)
-            }
-        }
+        if progress_callback:
+            progress_callback(95, "finalizing", 100)
+        time.sleep(self.mock_stage_seconds)
+
+        return result
 
 
 trellis_pipeline = TRELLISPipeline()
@@ -1,26 +1,89 @@
 import asyncio
+import functools
 import json
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from uuid import uuid4
 import redis.asyncio as aioredis
 import redis
 
 from app.config import settings
-from app.core.queue import JobQueue
+from app.core import metrics
+from app.core.artifact_gc import ArtifactUsage
+from app.core.artifacts import publish_job
+from app.core.exceptions import AppException, JobCancelledException, JobTimeoutException
+from app.core.eta import ETAEstimator, expected_total, remaining_from_stage
+from app.core.queue import JobQueue, JOB_TYPES, FINISH_SCRIPT, cancellation_event
+from app.core.result_cache import ResultCache
+from app.core.scheduler import degradation_level, apply_degradation
+from app.core.http_client import init_http_clients, close_http_clients
 from app.core.storage import storage_service
-from app.services.trellis.pipeline import trellis_pipeline
+from app.core.storage_backends import StorageError
+from app.workers.loop_monitor import LoopLagMonitor
+from app.workers.progress import ProgressReporter, StageTimer
+from app.workers.watchdog import JobWatchdog, stage_timeout
+from app.services.trellis.pipeline import trellis_pipeline, EXPORT_STAGES
+from app.services.llm.cache import prompt_cache
 from app.services.llm.ollama import OllamaProvider
 from app.services.llm.groq import GroqProvider
 
 
+BATCH_POLL_INTERVAL = 0.05
+# Progress callbacks look for a cancel on every new stage and at most this
+# often within one.
+CANCEL_CHECK_INTERVAL = 0.5
+# Exit status of a worker that gave up on hung inference; the supervisor
+# restarts it like any other crash.
+WATCHDOG_EXIT_CODE = 75
+
+
+def error_record(error: Exception) -> Dict[str, Any]:
+    if isinstance(error, AppException):
+        return {
+            "code": error.code,
+            "message": error.message,
+            "recoverable": getattr(error, "recoverable", False)
+        }
+    return {"code": "PROCESSING_ERROR", "message": str(error), "recoverable": False}
+
+
 class GPUWorker:
     def __init__(self):
         self.redis: Optional[aioredis.Redis] = None
         self.sync_redis: Optional[redis.Redis] = None
         self.queue: Optional[JobQueue] = None
+        self.progress_reporter: Optional[ProgressReporter] = None
         self.ollama_provider = OllamaProvider()
         self.groq_provider = GroqProvider()
         self.running = False
+        self.worker_id = settings.WORKER_ID or f"{socket.gethostname()}-{os.getpid()}-{uuid4().hex[:8]}"
+        # None means every job type, which lets claims skip the type filter.
+        self.job_types = None if set(settings.WORKER_JOB_TYPES) >= set(JOB_TYPES) else settings.WORKER_JOB_TYPES
+        self.current_job_id: Optional[str] = None
+        self.current_job_ids: List[str] = []
+        self.current_stage: Optional[str] = None
+        self.job_started_at: Optional[float] = None
+        self.started_at = datetime.utcnow().isoformat()
+        self._started_monotonic = time.monotonic()
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+        # Per-job stage timer and ETA state between begin and finish.
+        self._running_jobs: Dict[str, Dict[str, Any]] = {}
+        self._stop_event = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self.watchdog = JobWatchdog(self.abandon_hung_jobs)
+        self._last_reap: Optional[float] = None
+        # Model loading, sampling, export and cache release all run on this
+        # one thread, in order, so the event loop stays free for Redis, LLM
+        # calls and progress while the GPU is busy.
+        self.inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.loop_monitor = LoopLagMonitor()
 
     async def initialize(self):
         self.redis = aioredis.Redis(
@@ -40,65 +103,204 @@ class GPUWorker:
         )
 
         self.queue = JobQueue(self.redis)
+        migrated = await self.queue.migrate_legacy_queue()
+        if migrated:
+            print(f"Moved {migrated} jobs from the legacy pending list")
+        indexed = await self.queue.index_pending()
+        if indexed:
+            print(f"Indexed {indexed} pending jobs by type")
+        self.progress_reporter = ProgressReporter(self.sync_redis)
+        self.progress_reporter.start()
+        await init_http_clients()
 
         print("Initializing TRELLIS pipeline...")
-        trellis_pipeline.initialize()
+        await self.run_inference(trellis_pipeline.initialize)
         print("Worker initialized successfully")
 
+    async def run_inference(self, fn: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.inference_executor, functools.partial(fn, *args, **kwargs))
+
+    def start_heartbeat(self):
+        # Leases are renewed from a plain thread with the sync client so they
+        # stay fresh even if something does stall the event loop.
+        self._write_heartbeat()
+
+        self._stop_event.clear()
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop,
+            name=f"heartbeat-{self.worker_id}",
+            daemon=True
+        )
+        self._heartbeat_thread.start()
+
+    def heartbeat_record(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "job_types": self.job_types or JOB_TYPES,
+            "current_job": self.current_job_id,
+            "batch_size": len(self.current_job_ids),
+            "stage": self.current_stage,
+            "job_elapsed": round(time.monotonic() - self.job_started_at, 1) if self.job_started_at else None,
+            "pipelines": trellis_pipeline.get_stats(),
+            "started_at": self.started_at,
+            "uptime": round(time.monotonic() - self._started_monotonic, 1),
+            "jobs_completed": self.jobs_completed,
+            "jobs_failed": self.jobs_failed,
+            "loop_lag_max": round(self.loop_monitor.max_lag, 3),
+            "updated_at": datetime.utcnow().isoformat()
+        }
+
+    def _write_heartbeat(self):
+        pipe = self.sync_redis.pipeline(transaction=False)
+        pipe.set(
+            self.queue.lease_key(self.worker_id),
+            json.dumps(self.heartbeat_record()),
+            ex=settings.JOB_LEASE_SECONDS
+        )
+        pipe.sadd(self.queue.workers_key, self.worker_id)
+        pipe.set(
+            self.queue.metrics_key(self.worker_id),
+            json.dumps(metrics.registry.snapshot()),
+            ex=settings.JOB_LEASE_SECONDS
+        )
+        pipe.execute()
+
+    def publish_heartbeat(self):
+        # Called on job boundaries so the registry does not lag a whole
+        # heartbeat interval behind. Only a worker that already heartbeats
+        # holds a lease worth refreshing.
+        if self._heartbeat_thread is None:
+            return
+        try:
+            self._write_heartbeat()
+        except Exception as e:
+            print(f"Heartbeat failed: {e}")
+
+    def _heartbeat_loop(self):
+        while not self._stop_event.wait(settings.JOB_HEARTBEAT_INTERVAL):
+            try:
+                self._write_heartbeat()
+            except Exception as e:
+                print(f"Heartbeat failed: {e}")
+
     async def broadcast_progress(self, job_id: str, message: Dict[str, Any]):
         message["timestamp"] = datetime.utcnow().isoformat()
         await self.redis.publish(f"job:{job_id}:progress", json.dumps(message))
 
     def create_progress_callback(self, job_id: str):
-        def callback(progress: int, stage: str, stage_progress: int):
-            self.sync_redis.hset(
-                f"job:{job_id}",
-                mapping={
-                    "progress": str(progress),
-                    "stage": stage,
-                    "stage_progress": str(stage_progress)
-                }
-            )
+        running = self._running_jobs.get(job_id)
 
-            self.sync_redis.publish(
-                f"job:{job_id}:progress",
-                json.dumps({
-                    "type": "progress_update",
-                    "job_id": job_id,
-                    "progress": progress,
-                    "stage": stage,
-                    "stage_progress": stage_progress,
-                    "message": f"Stage: {stage} ({stage_progress}%)",
-                    "timestamp": datetime.utcnow().isoformat()
-                })
-            )
+        def callback(progress: int, stage: str, stage_progress: int):
+            # Raising here is how a timed-out job stops at the next stage.
+            self.watchdog.checkpoint(stage)
+            self.current_stage = stage
+            eta_at = None
+            if running:
+                self.check_cancelled(job_id, running, stage)
+                timer = running["timer"]
+                if stage not in timer.starts:
+                    # Re-estimate once per stage from what that stage has
+                    # historically left to run.
+                    elapsed = time.monotonic() - running["began"]
+                    running["eta_at"] = time.time() + remaining_from_stage(
+                        running["stats"], running["parameters"], stage, elapsed
+                    )
+                timer.update(stage, stage_progress)
+                eta_at = running["eta_at"]
+            self.progress_reporter.report(job_id, progress, stage, stage_progress, eta_at=eta_at)
 
         return callback
 
+    def check_cancelled(self, job_id: str, running: Dict[str, Any], stage: str):
+        # Runs on inference threads, hence the sync client. Raising aborts
+        # the job at this stage boundary, before any further sampling or
+        # export.
+        now = time.monotonic()
+        if stage in running["timer"].starts and now - running["cancel_checked_at"] < CANCEL_CHECK_INTERVAL:
+            return
+        running["cancel_checked_at"] = now
+        if self.sync_redis.hget(f"job:{job_id}", "status") == b"cancelled":
+            raise JobCancelledException(job_id)
+
     async def enhance_prompt(self, prompt: str, provider: str) -> str:
         try:
-            if provider == "ollama":
-                enhanced, _ = await self.ollama_provider.enhance_prompt(prompt)
-            else:
-                enhanced, _ = await self.groq_provider.enhance_prompt(prompt)
+            llm = self.ollama_provider if provider == "ollama" else self.groq_provider
+            enhanced, _ = await prompt_cache.enhance(llm, prompt, redis_client=self.redis)
             return enhanced
         except Exception as e:
             print(f"Prompt enhancement failed: {e}")
             return prompt
 
-    async def process_job(self, job_id: str):
+    async def plan_quality(self, job_data: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        # Returns the parameters to run with plus the degradation record, or
+        # None when the job runs at its requested quality.
+        parameters = job_data["parameters"]
+        if not settings.OVERLOAD_MODE_ENABLED:
+            return parameters, None
+
+        backlog = await self.queue.get_backlog()
+        level = degradation_level(backlog["queue_depth"], backlog["oldest_age"])
+        if level == 0:
+            return parameters, None
+
+        degraded = apply_degradation(parameters, level)
+        return degraded, {
+            "level": level,
+            "queue_depth": backlog["queue_depth"],
+            "oldest_age": round(backlog["oldest_age"], 1),
+            "sparse_structure_steps": degraded["sparse_structure_sampler_params"]["steps"],
+            "slat_steps": degraded["slat_sampler_params"]["steps"],
+            "texture_size": degraded["texture_size"],
+            "simplify": degraded["simplify"]
+        }
+
+    async def begin_job(self, job_id: str) -> Optional[Dict[str, Any]]:
         job_data = await self.queue.get_job(job_id)
         if not job_data:
             print(f"Job {job_id} not found")
-            return
+            return None
+
+        if job_data["status"] == "cancelled":
+            print(f"Job {job_id} was cancelled, skipping")
+            return None
 
         print(f"Processing job {job_id}...")
 
+        job_type = job_data.get("job_type")
+        parameters = job_data.get("parameters") or {}
+        if job_data.get("created_at"):
+            waited = (datetime.utcnow() - datetime.fromisoformat(job_data["created_at"])).total_seconds()
+            metrics.queue_wait.observe(waited, job_type=job_type)
+
+        try:
+            stats = await ETAEstimator(self.queue).load(job_type, parameters)
+        except Exception as e:
+            print(f"Failed to load ETA stats: {e}")
+            stats = {}
+
+        running = {
+            "job_type": job_type,
+            "parameters": parameters,
+            "stats": stats,
+            "began": time.monotonic(),
+            "cancel_checked_at": 0.0,
+            "eta_at": time.time() + expected_total(stats, parameters),
+            "timer": StageTimer(
+                lambda stage, seconds: metrics.stage_duration.observe(seconds, job_type=job_type, stage=stage),
+                EXPORT_STAGES.values()
+            )
+        }
+        self._running_jobs[job_id] = running
+
         await self.queue.update_job(job_id, {
             "status": "processing",
             "started_at": datetime.utcnow().isoformat(),
             "progress": 0,
-            "stage": "initializing"
+            "stage": "initializing",
+            "eta_at": round(running["eta_at"], 3)
         })
 
         await self.broadcast_progress(job_id, {
@@ -107,127 +309,394 @@ class GPUWorker:
             "status": "processing"
         })
 
+        return job_data
+
+    async def record_degradation(self, job_id: str, job_data: Dict[str, Any], degradation: Optional[Dict[str, Any]]):
+        # Always written so a retried job does not keep a stale record.
+        await self.queue.update_job(job_id, {"degradation": degradation})
+        if degradation:
+            print(f"Job {job_id} degraded to level {degradation['level']} under load")
+            if job_data.get("fingerprint"):
+                await ResultCache(self.redis).forget(job_data["fingerprint"], job_id)
+
+    async def resolve_prompt(self, job_id: str, input_data: Dict[str, Any]) -> str:
+        prompt = input_data.get("prompt", "")
+        if not input_data.get("enhance_prompt") or not prompt:
+            return prompt
+
+        self.watchdog.checkpoint("enhancing_prompt")
+        self.current_stage = "enhancing_prompt"
+        await self.queue.update_job(job_id, {
+            "stage": "enhancing_prompt",
+            "progress": 5
+        })
+
+        try:
+            enhanced_prompt = await asyncio.wait_for(
+                self.enhance_prompt(prompt, input_data.get("llm_provider", "ollama")),
+                timeout=self.watchdog.remaining()
+            )
+        except asyncio.TimeoutError:
+            raise self.watchdog.expired() or JobTimeoutException(
+                "stage", stage_timeout("enhancing_prompt"), "enhancing_prompt"
+            )
+        input_data["enhanced_prompt"] = enhanced_prompt
+        await self.queue.update_job(job_id, {"input_data": input_data})
+        return enhanced_prompt
+
+    def resolve_image_path(self, input_data: Dict[str, Any]) -> str:
+        image_path = storage_service.get_upload_path(input_data["image_filename"])
+        if not image_path:
+            raise FileNotFoundError(f"Image not found: {input_data['image_filename']}")
+        return str(image_path)
+
+    async def record_durations(self, running: Dict[str, Any], degradation: Optional[Dict[str, Any]]):
+        ended = time.monotonic()
+        running["timer"].finish()
+        # Degraded runs are faster than their parameters say, so they would
+        # skew the estimates for full-quality jobs.
+        if degradation:
+            return
+        try:
+            await ETAEstimator(self.queue).record(
+                running["job_type"],
+                running["parameters"],
+                total=ended - running["began"],
+                remaining={stage: ended - started for stage, started in running["timer"].starts.items()}
+            )
+        except Exception as e:
+            print(f"Failed to record ETA stats: {e}")
+
+    async def complete_job(self, job_id: str, result: Dict[str, Any], degradation: Optional[Dict[str, Any]] = None):
+        job_result = {
+            "glb_url": f"/api/v1/download/{job_id}.glb" if result.get("glb_path") else None,
+            "ply_url": f"/api/v1/download/{job_id}.ply" if result.get("ply_path") else None,
+            "preview_url": f"/api/v1/download/preview/{job_id}.png" if result.get("preview_path") else None,
+            "file_sizes": result.get("file_sizes", {}),
+            "export_timings": result.get("export_timings", {}),
+            "glb_variants": [
+                name[len("glb_"):] for name in result.get("file_sizes", {}) if name.startswith("glb_")
+            ]
+        }
+
+        manifest = None
+        try:
+            manifest = await asyncio.to_thread(publish_job, job_id)
+        except StorageError as e:
+            # The artifacts are unreachable without the upload.
+            await self.fail_job(job_id, e)
+            return
+        except OSError as e:
+            print(f"Failed to write artifact manifest for {job_id}: {e}")
+
+        finished = await self.queue.finish_job(job_id, {
+            "status": "completed",
+            "completed_at": datetime.utcnow().isoformat(),
+            "result": job_result,
+            "progress": 100,
+            "stage": "completed"
+        })
+        if not finished:
+            # Cancelled after its last progress callback.
+            await self.discard_cancelled_job(job_id)
+            return
+
+        await self.broadcast_progress(job_id, {
+            "type": "completion",
+            "job_id": job_id,
+            "status": "completed",
+            "result": job_result,
+            "degradation": degradation
+        })
+
+        if manifest is not None:
+            try:
+                await ArtifactUsage(self.queue.redis).register(
+                    job_id, sum(entry["size"] for entry in manifest.values())
+                )
+            except Exception as e:
+                print(f"Failed to record artifact usage for {job_id}: {e}")
+
+        self.jobs_completed += 1
+        running = self._running_jobs.pop(job_id, None)
+        job_type = running["job_type"] if running else None
+        if running:
+            await self.record_durations(running, degradation)
+        metrics.jobs_finished.inc(job_type=job_type, status="completed")
+        for name, size in job_result["file_sizes"].items():
+            metrics.artifact_size.observe(size, format=name)
+        print(f"Job {job_id} completed successfully")
+
+    async def discard_cancelled_job(self, job_id: str):
+        running = self._running_jobs.pop(job_id, None)
+        self.progress_reporter.discard(job_id)
+        await asyncio.to_thread(storage_service.cleanup_job, job_id)
+        await self.run_inference(trellis_pipeline.release_memory)
+        metrics.jobs_finished.inc(job_type=running["job_type"] if running else None, status="cancelled")
+        # Also sent by cancel_job; repeated here so sockets that connected
+        # while the job ran still get a terminal event.
+        await self.broadcast_progress(job_id, cancellation_event(job_id))
+        print(f"Job {job_id} cancelled, stopped at stage {self.current_stage}")
+
+    async def fail_job(self, job_id: str, error: Exception):
+        if isinstance(error, JobCancelledException):
+            await self.discard_cancelled_job(job_id)
+            return
+
+        print(f"Job {job_id} failed: {error}")
+        self.progress_reporter.discard(job_id)
+        error = error_record(error)
+
+        finished = await self.queue.finish_job(job_id, {
+            "status": "failed",
+            "completed_at": datetime.utcnow().isoformat(),
+            "error": error
+        })
+        if not finished:
+            await self.discard_cancelled_job(job_id)
+            return
+
+        self.jobs_failed += 1
+        running = self._running_jobs.pop(job_id, None)
+        metrics.jobs_finished.inc(job_type=running["job_type"] if running else None, status="failed")
+
+        await self.broadcast_progress(job_id, {
+            "type": "error",
+            "job_id": job_id,
+            "error": error
+        })
+
+    def abandon_hung_jobs(self, job_ids: List[str], error: JobTimeoutException):
+        # Runs on the watchdog thread. A hung inference thread cannot be
+        # interrupted, so the jobs are failed and dropped from the in-flight
+        # list with the sync client before the process exits to free the GPU.
+        # Jobs cancelled meanwhile keep their status and get no error event.
+        record = error_record(error)
+        finish = self.sync_redis.register_script(FINISH_SCRIPT)
+        pipe = self.sync_redis.pipeline(transaction=False)
+        for job_id in job_ids:
+            finish(keys=[f"job:{job_id}"], args=[
+                "status", "failed",
+                "completed_at", datetime.utcnow().isoformat(),
+                "error", json.dumps(record)
+            ], client=pipe)
+            pipe.lrem(self.queue.processing_key(self.worker_id), 1, job_id)
+        finished = pipe.execute()[::2]
+
+        pipe = self.sync_redis.pipeline(transaction=False)
+        for job_id, failed in zip(job_ids, finished):
+            if failed:
+                pipe.publish(f"job:{job_id}:progress", json.dumps({
+                    "type": "error",
+                    "job_id": job_id,
+                    "error": record,
+                    "timestamp": datetime.utcnow().isoformat()
+                }))
+        pipe.execute()
+
+        print(f"Restarting worker {self.worker_id} to recover from hung inference")
+        os._exit(WATCHDOG_EXIT_CODE)
+
+    async def process_job(self, job_id: str):
+        job_data = await self.begin_job(job_id)
+        if not job_data:
+            return
+
         try:
             job_type = job_data["job_type"]
             input_data = job_data["input_data"]
-            parameters = job_data["parameters"]
-
-            enhanced_prompt = None
-            if input_data.get("enhance_prompt"):
-                await self.queue.update_job(job_id, {
-                    "stage": "enhancing_prompt",
-                    "progress": 5
-                })
-
-                prompt = input_data.get("prompt", "")
-                if prompt:
-                    enhanced_prompt = await self.enhance_prompt(
-                        prompt,
-                        input_data.get("llm_provider", "ollama")
-                    )
-                    input_data["enhanced_prompt"] = enhanced_prompt
-                    await self.queue.update_job(job_id, {"input_data": input_data})
+            parameters, degradation = await self.plan_quality(job_data)
+            await self.record_degradation(job_id, job_data, degradation)
+            prompt_to_use = await self.resolve_prompt(job_id, input_data)
 
             progress_callback = self.create_progress_callback(job_id)
 
             if job_type == "text_to_3d":
-                prompt_to_use = enhanced_prompt or input_data.get("prompt", "")
-                result = trellis_pipeline.generate_from_text(
+                result = await self.run_inference(
+                    trellis_pipeline.generate_from_text,
                     prompt=prompt_to_use,
                     job_id=job_id,
                     seed=parameters.get("seed"),
                     resolution=parameters.get("resolution", "medium"),
                     sparse_structure_sampler_params=parameters.get("sparse_structure_sampler_params"),
                     slat_sampler_params=parameters.get("slat_sampler_params"),
+                    texture_size=parameters.get("texture_size", 1024),
+                    simplify=parameters.get("simplify", 0.95),
                     progress_callback=progress_callback
                 )
             elif job_type == "image_to_3d":
-                image_path = storage_service.get_upload_path(input_data["image_filename"])
-                if not image_path:
-                    raise FileNotFoundError(f"Image not found: {input_data['image_filename']}")
-
-                result = trellis_pipeline.generate_from_image(
-                    image_path=str(image_path),
+                result = await self.run_inference(
+                    trellis_pipeline.generate_from_image,
+                    image_path=self.resolve_image_path(input_data),
                     job_id=job_id,
                     seed=parameters.get("seed"),
                     resolution=parameters.get("resolution", "medium"),
                     sparse_structure_sampler_params=parameters.get("sparse_structure_sampler_params"),
                     slat_sampler_params=parameters.get("slat_sampler_params"),
+                    texture_size=parameters.get("texture_size", 1024),
+                    simplify=parameters.get("simplify", 0.95),
                     progress_callback=progress_callback
                 )
             else:
                 raise ValueError(f"Unknown job type: {job_type}")
 
-            job_result = {
-                "glb_url": f"/api/v1/download/{job_id}.glb" if result.get("glb_path") else None,
-                "ply_url": f"/api/v1/download/{job_id}.ply" if result.get("ply_path") else None,
-                "preview_url": f"/api/v1/download/preview/{job_id}.png" if result.get("preview_path") else None,
-                "file_sizes": result.get("file_sizes", {})
-            }
-
-            await self.queue.update_job(job_id, {
-                "status": "completed",
-                "completed_at": datetime.utcnow().isoformat(),
-                "result": job_result,
-                "progress": 100,
-                "stage": "completed"
-            })
-
-            await self.broadcast_progress(job_id, {
-                "type": "completion",
-                "job_id": job_id,
-                "status": "completed",
-                "result": job_result
-            })
-
-            print(f"Job {job_id} completed successfully")
+            # Land the last coalesced progress before the completion record so
+            # a late flush cannot overwrite the final stage.
+            self.progress_reporter.flush()
+
+            await self.complete_job(job_id, result, degradation)
 
         except Exception as e:
-            print(f"Job {job_id} failed: {e}")
-
-            await self.queue.update_job(job_id, {
-                "status": "failed",
-                "completed_at": datetime.utcnow().isoformat(),
-                "error": {
-                    "code": "PROCESSING_ERROR",
-                    "message": str(e),
-                    "recoverable": False
-                }
-            })
-
-            await self.broadcast_progress(job_id, {
-                "type": "error",
-                "job_id": job_id,
-                "error": {
-                    "code": "PROCESSING_ERROR",
-                    "message": str(e)
+            await self.fail_job(job_id, e)
+
+    async def gather_batch(self, job_id: str) -> List[str]:
+        # Collects queued jobs sharing job_id's batch key until the batch is
+        # full or BATCH_WINDOW has passed since the first claim.
+        job = (await self.queue.get_jobs([job_id], fields=["job_type", "batch_key"]))[0]
+        if not job or not job.get("batch_key"):
+            return []
+
+        wanted = settings.BATCH_MAX_SIZE - 1
+        gathered: List[str] = []
+        deadline = time.monotonic() + settings.BATCH_WINDOW
+        while True:
+            gathered.extend(await self.queue.claim_compatible(
+                self.worker_id, job["job_type"], job["batch_key"], wanted - len(gathered)
+            ))
+            remaining = deadline - time.monotonic()
+            if len(gathered) >= wanted or remaining <= 0:
+                return gathered
+            await asyncio.sleep(min(remaining, BATCH_POLL_INTERVAL))
+
+    async def process_batch(self, job_ids: List[str]):
+        # Compatible jobs share one sampling pass; each then exports and
+        # completes or fails on its own.
+        jobs = [job for job in [await self.begin_job(job_id) for job_id in job_ids] if job]
+        if not jobs:
+            return
+
+        job_type = jobs[0]["job_type"]
+        print(f"Running batch of {len(jobs)} {job_type} jobs")
+
+        try:
+            parameters, degradation = await self.plan_quality(jobs[0])
+        except Exception as e:
+            for job_data in jobs:
+                await self.fail_job(job_data["job_id"], e)
+            return
+
+        items = []
+        for job_data in jobs:
+            job_id = job_data["job_id"]
+            try:
+                await self.record_degradation(job_id, job_data, degradation)
+                item = {
+                    "job_id": job_id,
+                    "texture_size": parameters.get("texture_size", 1024),
+                    "simplify": parameters.get("simplify", 0.95),
+                    "progress_callback": self.create_progress_callback(job_id)
                 }
-            })
+                item["prompt"] = await self.resolve_prompt(job_id, job_data["input_data"])
+                if job_type == "image_to_3d":
+                    item["image_path"] = self.resolve_image_path(job_data["input_data"])
+                items.append(item)
+            except Exception as e:
+                await self.fail_job(job_id, e)
+
+        if not items:
+            return
+
+        try:
+            results = await self.run_inference(
+                trellis_pipeline.generate_batch,
+                job_type,
+                items,
+                seed=parameters.get("seed"),
+                resolution=parameters.get("resolution", "medium"),
+                sparse_structure_sampler_params=parameters.get("sparse_structure_sampler_params"),
+                slat_sampler_params=parameters.get("slat_sampler_params")
+            )
+        except Exception as e:
+            results = [e] * len(items)
+
+        self.progress_reporter.flush()
+
+        for item, result in zip(items, results):
+            if isinstance(result, Exception):
+                await self.fail_job(item["job_id"], result)
+            else:
+                await self.complete_job(item["job_id"], result, degradation)
+
+    async def run_once(self, timeout: int = 5):
+        if self._last_reap is None or time.monotonic() - self._last_reap >= settings.JOB_REAPER_INTERVAL:
+            self._last_reap = time.monotonic()
+            requeued = await self.queue.requeue_abandoned()
+            if requeued:
+                print(f"Requeued abandoned jobs: {', '.join(requeued)}")
+
+        job_id = await self.queue.claim(self.worker_id, timeout=timeout, job_types=self.job_types)
+        if not job_id:
+            return
+
+        job_ids = [job_id]
+        if settings.BATCH_MAX_SIZE > 1:
+            job_ids.extend(await self.gather_batch(job_id))
+
+        self.current_job_id = job_id
+        self.current_job_ids = job_ids
+        self.current_stage = "initializing"
+        self.job_started_at = time.monotonic()
+        self.publish_heartbeat()
+        self.watchdog.begin(job_ids)
+        try:
+            if len(job_ids) == 1:
+                await self.process_job(job_id)
+            else:
+                await self.process_batch(job_ids)
+        finally:
+            self.watchdog.finish()
+            self.current_job_id = None
+            self.current_job_ids = []
+            self.current_stage = None
+            self.job_started_at = None
+            for claimed_id in job_ids:
+                await self.queue.ack(self.worker_id, claimed_id)
+            self.publish_heartbeat()
 
     async def run(self):
         await self.initialize()
         self.running = True
+        self.start_heartbeat()
+        self.watchdog.start()
+        self.loop_monitor.start()
 
-        print(f"Worker started, listening on queue: {settings.WORKER_QUEUE_NAME}")
+        print(f"Worker {self.worker_id} started, listening on queue: {settings.WORKER_QUEUE_NAME}")
 
         while self.running:
             try:
-                result = await self.redis.blpop(
-                    settings.WORKER_QUEUE_NAME,
-                    timeout=5
-                )
-
-                if result:
-                    _, job_id = result
-                    job_id = job_id.decode() if isinstance(job_id, bytes) else job_id
-                    await self.process_job(job_id)
-
+                await self.run_once()
             except Exception as e:
                 print(f"Worker error: {e}")
                 await asyncio.sleep(1)
 
+    def request_stop(self):
+        self.running = False
+
     async def stop(self):
         self.running = False
+        self._stop_event.set()
+        self.watchdog.stop()
+        await self.loop_monitor.stop()
+        if self.progress_reporter:
+            self.progress_reporter.stop()
+        if self.queue:
+            try:
+                await self.queue.release_worker(self.worker_id)
+            except Exception as e:
+                print(f"Failed to release worker: {e}")
+        await close_http_clients()
+        # Not waited for: after a watchdog timeout the thread may never return.
+        self.inference_executor.shutdown(wait=False, cancel_futures=True)
         if self.redis:
             await self.redis.close()
         if self.sync_redis:
@@ -236,9 +705,15 @@ class GPUWorker:
 
 async def main():
     worker = GPUWorker()
+    loop = asyncio.get_running_loop()
+    # The loop exits after the job in hand, so a SIGTERM drains the worker
+    # instead of leaving its job for the lease reaper.
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.request_stop)
+
     try:
         await worker.run()
-    except KeyboardInterrupt:
+    finally:
         print("Shutting down worker...")
         await worker.stop()
 
@@ -0,0 +1,40 @@
+import asyncio
+import time
+from typing import Callable, Optional
+
+from app.config import settings
+from app.core import metrics
+
+
+class LoopLagMonitor:
+    # Sleeps for interval seconds at a time and records how late each wakeup
+    # was. Anything that holds the event loop (a blocking call, a long
+    # synchronous stretch) shows up as lag on the next wakeup.
+    def __init__(self, interval: Optional[float] = None, observe: Optional[Callable[[float], None]] = None):
+        self.interval = interval if interval is not None else settings.WORKER_LOOP_LAG_INTERVAL
+        self.observe = observe or metrics.loop_lag.observe
+        self._task: Optional[asyncio.Task] = None
+        self.samples = 0
+        self.max_lag = 0.0
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(time.monotonic() - due, 0.0)
+            self.samples += 1
+            self.max_lag = max(self.max_lag, lag)
+            self.observe(lag)
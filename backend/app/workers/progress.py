@@ -0,0 +1,156 @@
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Any, Iterable, Optional
+import redis
+
+from app.config import settings
+
+
+class ProgressReporter:
+    # Inference threads hand progress over here and return immediately; a
+    # background thread writes the latest value per job at most once per
+    # interval, hash update and publish in a single pipelined round trip.
+    def __init__(self, redis_client: redis.Redis, interval: Optional[float] = None):
+        self.redis = redis_client
+        self.interval = interval if interval is not None else settings.PROGRESS_FLUSH_INTERVAL
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushes = 0
+        self.coalesced = 0
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="progress-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def report(
+        self,
+        job_id: str,
+        progress: int,
+        stage: str,
+        stage_progress: int,
+        eta_at: Optional[float] = None
+    ):
+        update = {
+            "progress": progress,
+            "stage": stage,
+            "stage_progress": stage_progress,
+            "eta_at": eta_at,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            if job_id in self._pending:
+                self.coalesced += 1
+            self._pending[job_id] = update
+        self._wakeup.set()
+
+    def discard(self, job_id: str):
+        with self._lock:
+            self._pending.pop(job_id, None)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+
+            pipe = self.redis.pipeline(transaction=False)
+            now = time.time()
+            for job_id, update in pending.items():
+                fields = {
+                    "progress": str(update["progress"]),
+                    "stage": update["stage"],
+                    "stage_progress": str(update["stage_progress"])
+                }
+                message = {
+                    "type": "progress_update",
+                    "job_id": job_id,
+                    "progress": update["progress"],
+                    "stage": update["stage"],
+                    "stage_progress": update["stage_progress"],
+                    "message": f"Stage: {update['stage']} ({update['stage_progress']}%)",
+                    "timestamp": update["timestamp"]
+                }
+                if update["eta_at"] is not None:
+                    fields["eta_at"] = str(round(update["eta_at"], 3))
+                    message["eta"] = max(0, round(update["eta_at"] - now))
+
+                pipe.hset(f"job:{job_id}", mapping=fields)
+                pipe.publish(f"job:{job_id}:progress", json.dumps(message))
+            pipe.execute()
+            self.flushes += 1
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+
+            started = time.monotonic()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Progress flush failed: {e}")
+
+            remaining = self.interval - (time.monotonic() - started)
+            if remaining > 0:
+                self._stopped.wait(remaining)
+
+
+class StageTimer:
+    # Turns progress callbacks into stage durations. A sequential stage lasts
+    # until the next one starts; the concurrent export stages report their own
+    # start (stage_progress 0) and end (100).
+    def __init__(
+        self,
+        observe: Callable[[str, float], None],
+        concurrent_stages: Iterable[str] = ()
+    ):
+        self.observe = observe
+        self.concurrent_stages = set(concurrent_stages)
+        self._current: Optional[str] = None
+        self._started = 0.0
+        self._open: Dict[str, float] = {}
+        # Monotonic time each stage was first reported.
+        self.starts: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def update(self, stage: str, stage_progress: int):
+        now = time.monotonic()
+        with self._lock:
+            self.starts.setdefault(stage, now)
+            if stage in self.concurrent_stages:
+                if stage_progress == 0:
+                    self._open[stage] = now
+                elif stage_progress >= 100 and stage in self._open:
+                    self.observe(stage, now - self._open.pop(stage))
+                return
+
+            if stage == self._current:
+                return
+            if self._current is not None:
+                self.observe(self._current, now - self._started)
+            self._current, self._started = stage, now
+
+    def finish(self):
+        with self._lock:
+            if self._current is not None:
+                self.observe(self._current, time.monotonic() - self._started)
+                self._current = None
+            self._open.clear()
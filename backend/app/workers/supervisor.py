@@ -0,0 +1,183 @@
+import asyncio
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional, Set
+from uuid import uuid4
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.core.queue import JobQueue
+
+
+WORKER_COMMAND = [sys.executable, "-m", "app.workers.gpu_worker"]
+
+
+def parse_cpu_set(spec: str) -> Set[int]:
+    # "0-3,8" -> {0, 1, 2, 3, 8}, the same syntax as taskset and cgroups.
+    cpus = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.update(range(int(start), int(end) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def restart_delay(failures: int) -> float:
+    if failures <= 0:
+        return 0.0
+    return min(settings.WORKER_RESTART_BACKOFF * 2 ** (failures - 1), settings.WORKER_RESTART_BACKOFF_MAX)
+
+
+class WorkerSlot:
+    def __init__(self, index: int, device: Optional[str] = None, cpus: Optional[Set[int]] = None):
+        self.index = index
+        self.device = device
+        self.cpus = cpus
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.worker_id: Optional[str] = None
+        self.started_at = 0.0
+        self.failures = 0
+        self.restarts = 0
+
+
+class WorkerSupervisor:
+    # Runs WORKER_COUNT worker processes, restarting crashed ones with
+    # exponential backoff. SIGTERM and SIGINT are forwarded so children finish
+    # their current job before exiting.
+    def __init__(self, count: Optional[int] = None, command: Optional[List[str]] = None):
+        count = count or settings.WORKER_COUNT
+        devices = settings.WORKER_DEVICES
+        cpu_sets = settings.WORKER_CPU_SETS
+
+        self.command = command or WORKER_COMMAND
+        self.prefix = settings.WORKER_ID or socket.gethostname()
+        self.slots = [
+            WorkerSlot(
+                index,
+                device=devices[index % len(devices)] if devices else None,
+                cpus=parse_cpu_set(cpu_sets[index % len(cpu_sets)]) if cpu_sets else None
+            )
+            for index in range(count)
+        ]
+        self.stopping = asyncio.Event()
+        self.redis: Optional[aioredis.Redis] = None
+        self._kill_timer: Optional[asyncio.TimerHandle] = None
+
+    def child_env(self, slot: WorkerSlot) -> Dict[str, str]:
+        env = os.environ.copy()
+        # A fresh id per spawn keeps a restarted child from renewing the
+        # lease of the one that crashed, so its jobs are still reclaimed.
+        env["WORKER_ID"] = slot.worker_id
+        if slot.device is not None:
+            env["CUDA_VISIBLE_DEVICES"] = slot.device
+        if slot.cpus:
+            env.setdefault("OMP_NUM_THREADS", str(len(slot.cpus)))
+        return env
+
+    async def spawn(self, slot: WorkerSlot):
+        slot.worker_id = f"{self.prefix}-{slot.index}-{uuid4().hex[:8]}"
+
+        preexec_fn = None
+        if slot.cpus and hasattr(os, "sched_setaffinity"):
+            cpus = slot.cpus
+            preexec_fn = lambda: os.sched_setaffinity(0, cpus)  # noqa: E731
+
+        slot.process = await asyncio.create_subprocess_exec(
+            *self.command,
+            env=self.child_env(slot),
+            preexec_fn=preexec_fn
+        )
+        slot.started_at = time.monotonic()
+        pinning = ", ".join(filter(None, [
+            f"device {slot.device}" if slot.device is not None else None,
+            f"cpus {sorted(slot.cpus)}" if slot.cpus else None
+        ]))
+        print(f"Started worker {slot.worker_id} (pid {slot.process.pid}){f' on {pinning}' if pinning else ''}")
+
+    async def release(self, worker_id: str):
+        # Requeues a dead child's in-flight jobs now instead of after its
+        # lease expires; the lease reaper still covers any failure here.
+        if self.redis is None:
+            return
+        try:
+            requeued = await JobQueue(self.redis).release_worker(worker_id)
+            if requeued:
+                print(f"Requeued jobs of {worker_id}: {', '.join(requeued)}")
+        except Exception as e:
+            print(f"Failed to release {worker_id}: {e}")
+
+    async def supervise(self, slot: WorkerSlot):
+        while not self.stopping.is_set():
+            await self.spawn(slot)
+            code = await slot.process.wait()
+            if self.stopping.is_set():
+                break
+
+            await self.release(slot.worker_id)
+
+            if time.monotonic() - slot.started_at >= settings.WORKER_RESTART_BACKOFF_MAX:
+                slot.failures = 0
+            slot.failures += 1
+            slot.restarts += 1
+            delay = restart_delay(slot.failures)
+            print(f"Worker {slot.worker_id} exited with code {code}, restarting in {delay:.1f}s")
+
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def request_stop(self):
+        if self.stopping.is_set():
+            return
+        print("Stopping workers, waiting for current jobs to finish...")
+        self.stopping.set()
+        for slot in self.slots:
+            if slot.process and slot.process.returncode is None:
+                slot.process.send_signal(signal.SIGTERM)
+        self._kill_timer = asyncio.get_running_loop().call_later(
+            settings.WORKER_DRAIN_TIMEOUT, self.kill_remaining
+        )
+
+    def kill_remaining(self):
+        for slot in self.slots:
+            if slot.process and slot.process.returncode is None:
+                print(f"Worker {slot.worker_id} did not drain in time, killing it")
+                slot.process.kill()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.request_stop)
+
+        self.redis = aioredis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD
+        )
+
+        print(f"Supervising {len(self.slots)} worker(s)")
+        try:
+            await asyncio.gather(*(self.supervise(slot) for slot in self.slots))
+        finally:
+            if self._kill_timer:
+                self._kill_timer.cancel()
+            self.kill_remaining()
+            await self.redis.aclose()
+
+
+async def main():
+    await WorkerSupervisor().run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+import threading
+import time
+from typing import Callable, List, Optional, Set
+
+from app.config import settings
+from app.core.exceptions import JobTimeoutException
+
+
+WATCHDOG_POLL_INTERVAL = 1.0
+
+
+def stage_timeout(stage: str) -> float:
+    return settings.JOB_STAGE_TIMEOUTS.get(stage, settings.JOB_STAGE_TIMEOUT)
+
+
+class JobWatchdog:
+    # Enforces JOB_TIMEOUT for a claim and a per-stage timeout for each stage
+    # in it. Deadlines are checked cooperatively at progress checkpoints; if
+    # the job has not stopped JOB_TIMEOUT_GRACE seconds after a deadline (a
+    # sampler or LLM call that never returns), on_hang gets the job ids and
+    # the timeout from the watchdog thread.
+    def __init__(self, on_hang: Callable[[List[str], JobTimeoutException], None]):
+        self.on_hang = on_hang
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.job_ids: List[str] = []
+        self.stage: Optional[str] = None
+        self._seen: Set[str] = set()
+        self._job_deadline: Optional[float] = None
+        self._stage_deadline: Optional[float] = None
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="job-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def begin(self, job_ids: List[str]):
+        with self._lock:
+            self.job_ids = list(job_ids)
+            self.stage = None
+            self._seen = set()
+            self._job_deadline = time.monotonic() + settings.JOB_TIMEOUT
+            self._stage_deadline = None
+
+    def finish(self):
+        with self._lock:
+            self.job_ids = []
+            self.stage = None
+            self._job_deadline = None
+            self._stage_deadline = None
+
+    def expired(self, now: Optional[float] = None) -> Optional[JobTimeoutException]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._job_deadline is not None and now >= self._job_deadline:
+                return JobTimeoutException("job", settings.JOB_TIMEOUT, self.stage)
+            if self._stage_deadline is not None and now >= self._stage_deadline:
+                return JobTimeoutException("stage", stage_timeout(self.stage), self.stage)
+        return None
+
+    def checkpoint(self, stage: Optional[str] = None):
+        # Raises once a deadline has passed, then starts the stage clock the
+        # first time a stage is seen. Batched and concurrent export callbacks
+        # repeat stages, which must not push the deadline back.
+        error = self.expired()
+        if error:
+            raise error
+        if stage is None:
+            return
+        with self._lock:
+            if self._job_deadline is None or stage in self._seen:
+                return
+            self._seen.add(stage)
+            self.stage = stage
+            self._stage_deadline = time.monotonic() + stage_timeout(stage)
+
+    def remaining(self) -> Optional[float]:
+        # Seconds until the nearest deadline, for bounding awaits.
+        with self._lock:
+            deadlines = [d for d in (self._job_deadline, self._stage_deadline) if d is not None]
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.monotonic(), 0.0)
+
+    def _run(self):
+        while not self._stop_event.wait(WATCHDOG_POLL_INTERVAL):
+            with self._lock:
+                job_ids = list(self.job_ids)
+                deadlines = [d for d in (self._job_deadline, self._stage_deadline) if d is not None]
+            if not job_ids or not deadlines:
+                continue
+
+            now = time.monotonic()
+            if now < min(deadlines) + settings.JOB_TIMEOUT_GRACE:
+                continue
+
+            error = self.expired(now)
+            if error is None:
+                continue
+            print(f"Jobs {', '.join(job_ids)} ignored their timeout: {error}")
+            try:
+                self.on_hang(job_ids, error)
+            except Exception as e:
+                print(f"Watchdog failed to release hung jobs: {e}")
+            self.finish()
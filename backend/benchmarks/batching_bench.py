@@ -0,0 +1,88 @@
+"""Throughput and latency of the mock worker with and without micro-batching.
+
+Jobs arrive at a fixed rate into an in-memory Redis and one worker drains
+them. The mock pipeline charges --stage seconds per sampling stage, plus
+--marginal of that for every extra job in a batch. Latency is measured from
+each job's arrival to its completion. Run from the backend directory:
+
+    python -m benchmarks.batching_bench --jobs 48 --rate 4 --stage 0.2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_storage = tempfile.mkdtemp(prefix="batching_bench_")
+for _name in ["UPLOADS", "OUTPUTS", "PREVIEWS"]:
+    os.environ[f"{_name}_PATH"] = os.path.join(_storage, _name.lower())
+
+import fakeredis  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.core.queue import JobQueue  # noqa: E402
+from app.services.trellis.pipeline import trellis_pipeline  # noqa: E402
+from app.workers.gpu_worker import GPUWorker  # noqa: E402
+from app.workers.progress import ProgressReporter  # noqa: E402
+
+
+async def run(jobs: int, rate: float) -> tuple:
+    server = fakeredis.FakeServer()
+    worker = GPUWorker()
+    worker.redis = fakeredis.aioredis.FakeRedis(server=server)
+    worker.sync_redis = fakeredis.FakeRedis(server=server)
+    worker.queue = JobQueue(worker.redis)
+    worker.progress_reporter = ProgressReporter(worker.sync_redis)
+
+    arrivals = {}
+    finished = {}
+    complete_job = worker.complete_job
+
+    async def record(job_id, result, degradation=None):
+        finished[job_id] = time.monotonic()
+        await complete_job(job_id, result, degradation)
+
+    worker.complete_job = record
+
+    async def produce():
+        started = time.monotonic()
+        for i in range(jobs):
+            due = started + i / rate
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            job_id = await worker.queue.enqueue("text_to_3d", {"prompt": f"object {i}"}, {"resolution": "low"})
+            arrivals[job_id] = due
+
+    producer = asyncio.create_task(produce())
+    while len(finished) < jobs:
+        await worker.run_once(timeout=1)
+    await producer
+
+    latencies = sorted(finished[job_id] - arrivals[job_id] for job_id in finished)
+    span = max(finished.values()) - min(arrivals.values())
+    return jobs / span, statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=48)
+    parser.add_argument("--rate", type=float, default=4.0, help="arrivals per second")
+    parser.add_argument("--stage", type=float, default=0.2, help="mock seconds per sampling stage")
+    parser.add_argument("--marginal", type=float, default=0.3)
+    parser.add_argument("--window", type=float, default=0.25)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    trellis_pipeline.mock_stage_seconds = args.stage
+    trellis_pipeline.mock_batch_marginal_cost = args.marginal
+    settings.BATCH_WINDOW = args.window
+
+    print(f"{'batch':>5} {'jobs/s':>8} {'p50':>8} {'p95':>8}")
+    for size in args.sizes:
+        settings.BATCH_MAX_SIZE = size
+        throughput, p50, p95 = asyncio.run(run(args.jobs, args.rate))
+        print(f"{size:>5} {throughput:>8.2f} {p50:>7.2f}s {p95:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
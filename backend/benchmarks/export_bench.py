@@ -0,0 +1,47 @@
+"""Per-artifact export timings of the mock pipeline, sequential vs concurrent.
+
+Synthetic export costs stand in for GLB baking, PLY serialization and
+preview rendering. Run from the backend directory:
+
+    python -m benchmarks.export_bench --glb 0.6 --ply 0.25 --preview 0.35
+"""
+import argparse
+import os
+import statistics
+import tempfile
+
+_storage = tempfile.mkdtemp(prefix="export_bench_")
+for _name in ["UPLOADS", "OUTPUTS", "PREVIEWS"]:
+    os.environ[f"{_name}_PATH"] = os.path.join(_storage, _name.lower())
+
+from app.config import settings  # noqa: E402
+from app.services.trellis.pipeline import trellis_pipeline  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--glb", type=float, default=0.6)
+    parser.add_argument("--ply", type=float, default=0.25)
+    parser.add_argument("--preview", type=float, default=0.35)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    trellis_pipeline.mock_export_costs = {"glb": args.glb, "ply": args.ply, "preview": args.preview}
+
+    print(f"{'pool':>4} {'glb':>8} {'ply':>8} {'preview':>8} {'export':>8}")
+    for workers in [1, settings.EXPORT_MAX_WORKERS]:
+        settings.EXPORT_MAX_WORKERS = workers
+        samples = []
+        for run in range(args.runs):
+            result = trellis_pipeline.generate_from_text("bench", job_id=f"bench-{workers}-{run}")
+            samples.append(result["export_timings"])
+
+        columns = [
+            statistics.median(s[name] for s in samples)
+            for name in ["glb", "ply", "preview", "total"]
+        ]
+        print(f"{workers:>4} " + " ".join(f"{c:>7.2f}s" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
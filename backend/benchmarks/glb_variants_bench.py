@@ -0,0 +1,84 @@
+"""Size and decode time of the GLB variants against the baseline export.
+
+A UV sphere with a 1024px texture stands in for a TRELLIS mesh. Decode time
+is parsing the GLB and expanding every accessor to floats in Python, plus
+inflating the gzip sibling when there is one; absolute numbers are far
+slower than a browser loader, the ratios are what matter. Run from the
+backend directory:
+
+    python -m benchmarks.glb_variants_bench --rings 128 --segments 256
+"""
+import argparse
+import gzip
+import io
+import statistics
+import time
+
+from PIL import Image
+
+from app.services.trellis.glb import build_glb, quantize_glb, read_accessor, read_glb, uv_sphere
+
+
+def decode(data: bytes, compressed: bool) -> int:
+    if compressed:
+        data = gzip.decompress(data)
+    gltf, binary = read_glb(data)
+    floats = 0
+    for index, accessor in enumerate(gltf["accessors"]):
+        values = read_accessor(gltf, binary, index)
+        if accessor.get("normalized"):
+            scale = 1 / (127 if accessor["componentType"] == 5120 else 65535)
+            values = [v * scale for v in values]
+        floats += len(values)
+    for image in gltf.get("images", []):
+        view = gltf["bufferViews"][image["bufferView"]]
+        Image.open(io.BytesIO(binary[view["byteOffset"]:view["byteOffset"] + view["byteLength"]])).load()
+    return floats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rings", type=int, default=128)
+    parser.add_argument("--segments", type=int, default=256)
+    parser.add_argument("--texture", type=int, default=1024)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    size = (args.texture, args.texture)
+    texture = Image.merge("RGB", [
+        Image.effect_mandelbrot(size, (-2, -1.5, 1, 1.5), 100),
+        Image.effect_noise(size, 24),
+        Image.linear_gradient("L").resize(size)
+    ])
+    buffer = io.BytesIO()
+    texture.save(buffer, format="PNG")
+
+    mesh = uv_sphere(args.rings, args.segments)
+    baseline = build_glb(*mesh, texture_png=buffer.getvalue())
+    started = time.perf_counter()
+    quantized = quantize_glb(baseline)
+    encode_seconds = time.perf_counter() - started
+
+    variants = {
+        "baseline": (baseline, False),
+        "baseline.gz": (gzip.compress(baseline, mtime=0), True),
+        "quantized": (quantized, False),
+        "quantized.gz": (gzip.compress(quantized, mtime=0), True)
+    }
+
+    print(f"{len(mesh[0]) // 3} vertices, {len(mesh[3]) // 3} triangles, quantize took {encode_seconds:.2f}s")
+    print(f"{'variant':>13} {'bytes':>10} {'ratio':>6} {'decode':>8}")
+    for name, (data, compressed) in variants.items():
+        samples = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            decode(data, compressed)
+            samples.append(time.perf_counter() - started)
+        print(
+            f"{name:>13} {len(data):>10} {len(data) / len(baseline):>6.2f} "
+            f"{statistics.median(samples) * 1000:>6.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
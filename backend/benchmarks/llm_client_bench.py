@@ -0,0 +1,101 @@
+"""Compare per-call and pooled HTTP clients against a local stub LLM server.
+
+Run from the backend directory:
+
+    python -m benchmarks.llm_client_bench --requests 200 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.core import http_client
+from app.services.llm.ollama import OllamaProvider
+
+
+class StubLLMServer:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self.server = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode().split("\r\n"):
+                    if line.lower().startswith("content-length:"):
+                        length = int(line.split(":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+
+                self.requests += 1
+                await asyncio.sleep(self.latency)
+                body = json.dumps({"response": "A detailed stub object"}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def run(label: str, provider: OllamaProvider, stub: StubLLMServer, requests: int, concurrency: int):
+    stub.connections = 0
+    stub.requests = 0
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with limiter:
+            await provider.enhance_prompt(f"object {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(requests)])
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{label:<10} {stub.requests:>8} {stub.connections:>12} "
+        f"{requests / elapsed:>10.1f} {elapsed / requests * 1000:>12.2f}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    stub = StubLLMServer(args.latency)
+    port = await stub.start()
+    provider = OllamaProvider()
+    provider.base_url = f"http://127.0.0.1:{port}"
+
+    print(f"{'client':<10} {'requests':>8} {'connections':>12} {'req/s':>10} {'ms/request':>12}")
+    await run("per-call", provider, stub, args.requests, args.concurrency)
+
+    await http_client.init_http_clients()
+    try:
+        await run("pooled", provider, stub, args.requests, args.concurrency)
+    finally:
+        await http_client.close_http_clients()
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""Event loop lag of the worker while it runs mock jobs.
+
+One worker drains --jobs mock jobs from an in-memory Redis while a monitor
+samples how late the event loop wakes from --interval sleeps, and a probe
+task times a Redis PING every --interval. "inline" calls the pipeline on the
+event loop as the worker used to; "executor" runs it on the worker's
+inference thread. Run from the backend directory:
+
+    python -m benchmarks.loop_lag_bench --jobs 4 --stage 1.0
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_storage = tempfile.mkdtemp(prefix="loop_lag_bench_")
+for _name in ["UPLOADS", "OUTPUTS", "PREVIEWS"]:
+    os.environ[f"{_name}_PATH"] = os.path.join(_storage, _name.lower())
+
+import fakeredis  # noqa: E402
+
+from app.core.queue import JobQueue  # noqa: E402
+from app.services.trellis.pipeline import trellis_pipeline  # noqa: E402
+from app.workers.gpu_worker import GPUWorker  # noqa: E402
+from app.workers.loop_monitor import LoopLagMonitor  # noqa: E402
+from app.workers.progress import ProgressReporter  # noqa: E402
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def run(mode: str, jobs: int, interval: float) -> tuple:
+    server = fakeredis.FakeServer()
+    worker = GPUWorker()
+    worker.redis = fakeredis.aioredis.FakeRedis(server=server)
+    worker.sync_redis = fakeredis.FakeRedis(server=server)
+    worker.queue = JobQueue(worker.redis)
+    worker.progress_reporter = ProgressReporter(worker.sync_redis)
+    worker.progress_reporter.start()
+
+    if mode == "inline":
+        async def run_inline(fn, *args, **kwargs):
+            return fn(*args, **kwargs)
+
+        worker.run_inference = run_inline
+
+    for i in range(jobs):
+        await worker.queue.enqueue("text_to_3d", {"prompt": f"object {i}"}, {"resolution": "low"})
+
+    lags = []
+    pings = []
+
+    async def probe():
+        while True:
+            started = time.monotonic()
+            await worker.redis.ping()
+            pings.append(time.monotonic() - started)
+            await asyncio.sleep(interval)
+
+    monitor = LoopLagMonitor(interval=interval, observe=lags.append)
+    monitor.start()
+    prober = asyncio.create_task(probe())
+    started = time.monotonic()
+    for _ in range(jobs):
+        await worker.run_once(timeout=1)
+    elapsed = time.monotonic() - started
+    prober.cancel()
+    await monitor.stop()
+    worker.progress_reporter.stop()
+    worker.inference_executor.shutdown()
+    return elapsed, lags, pings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--stage", type=float, default=1.0, help="mock seconds per pipeline stage")
+    parser.add_argument("--interval", type=float, default=0.01)
+    args = parser.parse_args()
+
+    trellis_pipeline.mock_stage_seconds = args.stage
+
+    print(f"{'mode':>8} {'seconds':>8} {'samples':>8} {'lag p50':>8} {'lag p99':>8} {'lag max':>8} {'pings':>6}")
+    for mode in ["inline", "executor"]:
+        elapsed, lags, pings = asyncio.run(run(mode, args.jobs, args.interval))
+        print(
+            f"{mode:>8} {elapsed:>8.1f} {len(lags):>8} "
+            f"{statistics.median(lags) * 1000:>6.1f}ms {percentile(lags, 0.99) * 1000:>6.1f}ms "
+            f"{max(lags) * 1000:>6.0f}ms {len(pings):>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Measure API-side Redis commands per second as WebSocket watchers grow.
+
+Drives websocket_endpoint with in-memory sockets against fakeredis while a
+simulated worker publishes progress for a handful of jobs. Run from the
+backend directory:
+
+    python -m benchmarks.websocket_fanout_bench --sockets 10 100 1000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import fakeredis
+
+from app.api.websocket.handlers import websocket_endpoint
+from app.api.websocket.subscriber import ProgressSubscriber
+from app.core import redis as redis_state
+from app.core.queue import JobQueue
+
+
+class CountingRedis(fakeredis.aioredis.FakeRedis):
+    commands = 0
+
+    async def execute_command(self, *args, **options):
+        CountingRedis.commands += 1
+        return await super().execute_command(*args, **options)
+
+
+class MemoryWebSocket:
+    def __init__(self):
+        self.received = 0
+        self.closed = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        self.received += 1
+
+    async def receive_text(self):
+        await self.closed.wait()
+        raise ConnectionError("closed")
+
+
+async def measure(sockets: int, jobs: int, duration: float, rate: float):
+    server = fakeredis.FakeServer()
+    api_redis = CountingRedis(server=server)
+    worker_redis = fakeredis.aioredis.FakeRedis(server=server)
+    redis_state.redis_client = api_redis
+
+    queue = JobQueue(worker_redis)
+    job_ids = [
+        await queue.enqueue("text_to_3d", {"type": "text", "prompt": f"object {i}"}, {"seed": i})
+        for i in range(jobs)
+    ]
+
+    subscriber = ProgressSubscriber()
+    await subscriber.start(api_redis)
+
+    websockets = [MemoryWebSocket() for _ in range(sockets)]
+    handlers = [
+        asyncio.create_task(websocket_endpoint(ws, job_ids[i % jobs]))
+        for i, ws in enumerate(websockets)
+    ]
+    await asyncio.sleep(0.5)
+
+    CountingRedis.commands = 0
+    start = time.perf_counter()
+    progress = 0
+    while time.perf_counter() - start < duration:
+        progress = min(progress + 1, 99)
+        for job_id in job_ids:
+            await worker_redis.publish(f"job:{job_id}:progress", json.dumps({
+                "type": "progress_update",
+                "job_id": job_id,
+                "progress": progress
+            }))
+        await asyncio.sleep(1 / rate)
+    elapsed = time.perf_counter() - start
+    commands = CountingRedis.commands
+
+    for ws in websockets:
+        ws.closed.set()
+    await asyncio.gather(*handlers, return_exceptions=True)
+    await subscriber.stop()
+
+    delivered = sum(ws.received for ws in websockets)
+    return commands / elapsed, delivered / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sockets", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--jobs", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--rate", type=float, default=5.0, help="progress events per job per second")
+    args = parser.parse_args()
+
+    print(f"{'sockets':>8} {'redis cmd/s':>12} {'polling cmd/s':>14} {'msgs/s':>10}")
+    for sockets in args.sockets:
+        commands_per_second, messages_per_second = await measure(
+            sockets, args.jobs, args.duration, args.rate
+        )
+        # The previous handler issued one HGETALL per socket every 0.5s.
+        print(f"{sockets:>8} {commands_per_second:>12.1f} {sockets * 2:>14} {messages_per_second:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
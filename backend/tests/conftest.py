@@ -1,7 +1,11 @@
+import hmac
+import httpx
 import pytest
+from datetime import datetime, timedelta, timezone
 from fastapi.testclient import TestClient
 from unittest.mock import AsyncMock, MagicMock, patch
 import redis.asyncio as aioredis
+from urllib.parse import unquote
 
 from app.main import app
 from app.core.redis import init_redis, close_redis
@@ -50,3 +54,152 @@ def sample_job():
         "stage": "queued",
         "stage_progress": 0
     }
+
+
+class RawStream(httpx.SyncByteStream):
+    def __init__(self, content):
+        self.content = content
+
+    def __iter__(self):
+        yield self.content
+
+
+class FakeS3:
+    # In-memory stand-in for an S3-compatible server such as MinIO. Checks
+    # header and presigned signatures the way the real thing does and pages
+    # listings two keys at a time.
+    PAGE_SIZE = 2
+
+    def __init__(self, bucket="trellis", access_key="minio", secret_key="minio-secret", region="us-east-1"):
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.objects = {}
+        self.requests = []
+
+    def backend(self, **kwargs):
+        from app.core.storage_backends import S3StorageBackend
+
+        return S3StorageBackend(
+            endpoint_url="http://minio:9000",
+            bucket=self.bucket,
+            access_key=self.access_key,
+            secret_key=self.secret_key,
+            region=self.region,
+            client=httpx.Client(transport=httpx.MockTransport(self.handle)),
+            **kwargs
+        )
+
+    def authorized(self, request, params):
+        from app.core.storage_backends import UNSIGNED_PAYLOAD, signature_v4
+
+        url = str(request.url).split("?")[0]
+        if "X-Amz-Signature" in params:
+            timestamp = datetime.strptime(params["X-Amz-Date"], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+            if datetime.now(timezone.utc) > timestamp + timedelta(seconds=int(params["X-Amz-Expires"])):
+                return False
+            signed = {name: value for name, value in params.items() if name != "X-Amz-Signature"}
+            headers = {name: request.headers[name] for name in params["X-Amz-SignedHeaders"].split(";")}
+            expected = signature_v4(
+                request.method, url, signed, headers, UNSIGNED_PAYLOAD, self.secret_key, self.region, timestamp
+            )
+            return hmac.compare_digest(expected, params["X-Amz-Signature"])
+
+        authorization = request.headers.get("authorization", "")
+        fields = dict(part.strip().split("=", 1) for part in authorization.split(" ", 1)[-1].split(","))
+        if not fields.get("Credential", "").startswith(f"{self.access_key}/"):
+            return False
+        timestamp = datetime.strptime(request.headers["x-amz-date"], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+        headers = {name: request.headers[name] for name in fields["SignedHeaders"].split(";")}
+        expected = signature_v4(
+            request.method, url, params, headers, request.headers["x-amz-content-sha256"],
+            self.secret_key, self.region, timestamp
+        )
+        return hmac.compare_digest(expected, fields.get("Signature", ""))
+
+    def response(self, status, content=b"", headers=None):
+        # Unread like a network response; httpx marks in-memory content as
+        # already streamed, which raw reads refuse.
+        return httpx.Response(status, headers=headers, stream=RawStream(content))
+
+    def handle(self, request):
+        query = request.url.query.decode()
+        params = {unquote(name): unquote(value) for name, _, value in (p.partition("=") for p in query.split("&") if p)}
+        self.requests.append((request.method, request.url.path, params))
+        if not self.authorized(request, params):
+            return self.response(403)
+
+        bucket, _, key = request.url.path.lstrip("/").partition("/")
+        if bucket != self.bucket:
+            return self.response(404)
+
+        if not key and request.method == "GET":
+            return self.list_objects(params)
+        if request.method == "PUT":
+            headers = {
+                name: request.headers[name]
+                for name in ("content-type", "content-encoding", "cache-control") if name in request.headers
+            }
+            self.objects[key] = (request.read(), headers)
+            return self.response(200)
+        if key not in self.objects:
+            return self.response(404)
+        if request.method == "DELETE":
+            del self.objects[key]
+            return self.response(204)
+
+        content, headers = self.objects[key]
+        headers = dict(headers)
+        if "response-content-disposition" in params:
+            headers["content-disposition"] = params["response-content-disposition"]
+        return self.response(200, b"" if request.method == "HEAD" else content, headers)
+
+    def list_objects(self, params):
+        keys = sorted(key for key in self.objects if key.startswith(params.get("prefix", "")))
+        start = int(params.get("continuation-token", 0))
+        page = keys[start:start + self.PAGE_SIZE]
+        truncated = start + self.PAGE_SIZE < len(keys)
+        contents = "".join(f"<Contents><Key>{key}</Key></Contents>" for key in page)
+        token = f"<NextContinuationToken>{start + self.PAGE_SIZE}</NextContinuationToken>" if truncated else ""
+        body = (
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f"<IsTruncated>{str(truncated).lower()}</IsTruncated>{contents}{token}</ListBucketResult>"
+        )
+        return self.response(200, body.encode())
+
+
+@pytest.fixture
+def fake_s3():
+    return FakeS3()
+
+
+@pytest.fixture
+def stage_seconds():
+    # Seconds each mock pipeline stage sleeps in the worker fixture; modules
+    # that time stage boundaries override this.
+    return 0.1
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch, stage_seconds):
+    # A GPU worker on an in-memory Redis, writing outputs under tmp_path.
+    fakeredis = pytest.importorskip("fakeredis")
+    from app.core.queue import JobQueue
+    from app.core.storage import storage_service
+    from app.services.trellis.pipeline import trellis_pipeline
+    from app.workers.gpu_worker import GPUWorker
+    from app.workers.progress import ProgressReporter
+
+    monkeypatch.setattr(storage_service, "outputs_path", tmp_path)
+    monkeypatch.setattr(trellis_pipeline, "mock_stage_seconds", stage_seconds)
+
+    server = fakeredis.FakeServer()
+    worker = GPUWorker()
+    worker.worker_id = "worker-a"
+    worker.redis = fakeredis.aioredis.FakeRedis(server=server)
+    worker.sync_redis = fakeredis.FakeRedis(server=server)
+    worker.queue = JobQueue(worker.redis)
+    worker.progress_reporter = ProgressReporter(worker.sync_redis)
+    yield worker
+    worker.inference_executor.shutdown()
@@ -1,6 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import AsyncMock, patch, MagicMock
+import gzip
 import json
 
 from app.main import app
@@ -122,6 +123,166 @@ class TestJobEndpoints:
                 assert response.status_code == 200
 
 
+    def test_batch_status(self, client, mock_queue):
+        from app.api.v1.endpoints import jobs
+
+        mock_queue.get_jobs = AsyncMock(return_value=[
+            {"job_id": "a", "status": "processing", "progress": 40, "stage": "exporting", "stage_progress": 0},
+            None
+        ])
+        app.dependency_overrides[jobs.get_queue] = lambda: mock_queue
+        try:
+            response = client.post("/api/v1/jobs/status", json={"job_ids": ["a", "b"]})
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["jobs"][0]["progress"] == 40
+        assert data["missing"] == ["b"]
+        mock_queue.get_jobs.assert_awaited_once()
+
+    def test_list_workers(self, client, mock_queue):
+        from app.api.v1.endpoints import workers
+
+        mock_queue.get_workers = AsyncMock(return_value=[
+            {"worker_id": "gpu-0", "current_job": "a", "stage": "generating_slat", "jobs_completed": 3},
+            {"worker_id": "gpu-1", "jobs_completed": 5}
+        ])
+        app.dependency_overrides[workers.get_queue] = lambda: mock_queue
+        try:
+            response = client.get("/api/v1/workers")
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 2
+        assert data["busy"] == 1
+        assert data["workers"][0]["stage"] == "generating_slat"
+
+
+class TestDownloadEndpoints:
+    @pytest.fixture
+    def outputs(self, tmp_path, mock_queue):
+        from app.api.v1.endpoints import download
+        from app.core.storage import storage_service
+
+        job_dir = tmp_path / "job-1"
+        job_dir.mkdir()
+        (job_dir / "model.glb").write_bytes(b"original")
+        (job_dir / "model.quantized.glb").write_bytes(b"quantized")
+        (job_dir / "model.quantized.glb.gz").write_bytes(gzip.compress(b"quantized"))
+
+        mock_queue.get_job = AsyncMock(return_value={"job_id": "job-1", "status": "completed"})
+        mock_queue.redis = MagicMock(zadd=AsyncMock())
+        app.dependency_overrides[download.get_queue] = lambda: mock_queue
+        with patch.object(storage_service, "outputs_path", tmp_path):
+            yield
+        app.dependency_overrides.clear()
+
+    def test_glb_defaults_to_original(self, client, outputs):
+        response = client.get("/api/v1/download/job-1.glb", headers={"Accept-Encoding": "identity"})
+
+        assert response.content == b"original"
+        assert response.headers["x-glb-variant"] == "original"
+
+    def test_glb_variant_by_query_and_accept(self, client, outputs):
+        response = client.get("/api/v1/download/job-1.glb?variant=quantized", headers={"Accept-Encoding": "identity"})
+        assert response.content == b"quantized"
+
+        response = client.get("/api/v1/download/job-1.glb", headers={
+            "Accept": "model/gltf-binary;q=0.5, model/gltf-binary;variant=draco, model/gltf-binary;variant=quantized;q=0.9",
+            "Accept-Encoding": "identity"
+        })
+        assert response.headers["x-glb-variant"] == "quantized"
+        assert "Accept" in response.headers["vary"]
+
+        assert client.get("/api/v1/download/job-1.glb?variant=draco").status_code == 404
+
+    def test_precompressed_glb_is_served_with_content_encoding(self, client, outputs):
+        response = client.get(
+            "/api/v1/download/job-1.glb?variant=quantized",
+            headers={"Accept-Encoding": "gzip"}
+        )
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.content == b"quantized"
+
+    def test_artifacts_are_immutable_and_revalidate_by_etag(self, client, outputs):
+        response = client.get("/api/v1/download/job-1.glb", headers={"Accept-Encoding": "identity"})
+        etag = response.headers["etag"]
+        assert "immutable" in response.headers["cache-control"]
+
+        response = client.get("/api/v1/download/job-1.glb", headers={
+            "Accept-Encoding": "identity",
+            "If-None-Match": f'"other", W/{etag}'
+        })
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+    def test_range_requests(self, client, outputs):
+        url = "/api/v1/download/job-1.glb"
+        headers = {"Accept-Encoding": "identity"}
+
+        response = client.get(url, headers={**headers, "Range": "bytes=2-4"})
+        assert response.status_code == 206
+        assert response.content == b"igi"
+        assert response.headers["content-range"] == "bytes 2-4/8"
+
+        response = client.get(url, headers={**headers, "Range": "bytes=-3"})
+        assert response.content == b"nal"
+
+        response = client.get(url, headers={**headers, "Range": "bytes=8-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == "bytes */8"
+
+        # A stale If-Range gets the whole file.
+        response = client.get(url, headers={**headers, "Range": "bytes=2-4", "If-Range": '"stale"'})
+        assert response.status_code == 200
+        assert response.content == b"original"
+
+    def test_manifest_answers_without_the_job_record(self, client, outputs, mock_queue, tmp_path):
+        from app.api.v1.endpoints import download
+        from app.core.artifacts import ArtifactIndex, write_manifest
+
+        write_manifest("job-1")
+        mock_queue.get_job.reset_mock()
+        with patch.object(download, "artifact_index", ArtifactIndex()):
+            response = client.get("/api/v1/download/job-1.glb?variant=quantized", headers={"Accept-Encoding": "identity"})
+            assert response.content == b"quantized"
+            assert client.get("/api/v1/download/job-1.ply").status_code == 404
+
+        mock_queue.get_job.assert_not_called()
+
+    def test_remote_artifacts_redirect_to_signed_urls(self, client, outputs, fake_s3):
+        from app.api.v1.endpoints import download
+        from app.core.artifacts import ArtifactIndex, publish_job
+        from app.core.storage import storage_service
+
+        backend = fake_s3.backend()
+        with patch.object(storage_service, "backend", backend), \
+             patch.object(download, "artifact_index", ArtifactIndex()):
+            manifest = publish_job("job-1")
+            url = "/api/v1/download/job-1.glb?variant=quantized"
+
+            response = client.get(url, headers={"Accept-Encoding": "gzip"}, follow_redirects=False)
+            assert response.status_code == 307
+            assert response.headers["cache-control"] == "private, no-store"
+            assert response.headers["etag"] == manifest["quantized.glb.gz"]["etag"]
+
+            stored = backend.client.get(response.headers["location"])
+            assert stored.headers["content-encoding"] == "gzip"
+            assert stored.content == b"quantized"
+
+            response = client.get(url, headers={
+                "Accept-Encoding": "gzip",
+                "If-None-Match": response.headers["etag"]
+            }, follow_redirects=False)
+            assert response.status_code == 304
+
+
 class TestPromptEndpoints:
     def test_enhance_prompt_success(self, client):
         with patch('app.api.v1.endpoints.prompts.ollama_provider') as mock_ollama:
@@ -0,0 +1,50 @@
+import pytest
+from unittest.mock import patch
+
+from app.config import settings
+from app.services.trellis.pipeline import trellis_pipeline
+
+
+@pytest.fixture
+def stage_seconds():
+    return 0
+
+
+@pytest.mark.asyncio
+async def test_compatible_jobs_run_as_one_batch(worker):
+    compatible = [
+        await worker.queue.enqueue("text_to_3d", {"prompt": f"chair {i}"}, {"resolution": "low"})
+        for i in range(3)
+    ]
+    other = await worker.queue.enqueue("text_to_3d", {"prompt": "table"}, {"resolution": "high"})
+
+    calls = []
+    generate_batch = trellis_pipeline.generate_batch
+
+    def record(job_type, items, **kwargs):
+        calls.append([item["job_id"] for item in items])
+        return generate_batch(job_type, items, **kwargs)
+
+    with patch.multiple(settings, BATCH_MAX_SIZE=4, BATCH_WINDOW=0.1), \
+            patch.object(trellis_pipeline, "generate_batch", side_effect=record):
+        await worker.run_once(timeout=1)
+
+    assert calls == [compatible]
+    for job_id in compatible:
+        job = await worker.queue.get_job(job_id)
+        assert job["status"] == "completed"
+        assert job["result"]["glb_url"] == f"/api/v1/download/{job_id}.glb"
+
+    assert await worker.queue.get_pending_jobs() == [other]
+    assert await worker.redis.llen(worker.queue.processing_key("worker-a")) == 0
+
+
+@pytest.mark.asyncio
+async def test_batching_is_off_by_default(worker):
+    first = await worker.queue.enqueue("text_to_3d", {"prompt": "chair"}, {"resolution": "low"})
+    second = await worker.queue.enqueue("text_to_3d", {"prompt": "chair 2"}, {"resolution": "low"})
+
+    await worker.run_once(timeout=1)
+
+    assert (await worker.queue.get_job(first))["status"] == "completed"
+    assert await worker.queue.get_pending_jobs() == [second]
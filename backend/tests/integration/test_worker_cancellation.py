@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+import pytest
+
+from app.config import settings
+from app.core.storage import storage_service
+
+STAGE_SECONDS = 0.3
+
+
+@pytest.fixture
+def stage_seconds():
+    return STAGE_SECONDS
+
+
+def cancel_during(worker, job_id: str, stage: str, cancelled_at: list):
+    # The cancel arrives from another thread, as it would from the API
+    # process.
+    def run():
+        deadline = time.monotonic() + 10
+        while worker.current_stage != stage and time.monotonic() < deadline:
+            time.sleep(0.005)
+        worker.sync_redis.hset(f"job:{job_id}", "status", "cancelled")
+        cancelled_at.append(time.monotonic())
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+@pytest.mark.asyncio
+async def test_cancelled_job_stops_within_one_stage(worker):
+    first = await worker.queue.enqueue("text_to_3d", {"type": "text", "prompt": "a chair"}, {"resolution": "low"})
+    second = await worker.queue.enqueue("text_to_3d", {"type": "text", "prompt": "a lamp"}, {"resolution": "low"})
+
+    begun = {}
+    begin_job = worker.begin_job
+
+    async def timed_begin(job_id):
+        begun[job_id] = time.monotonic()
+        return await begin_job(job_id)
+
+    worker.begin_job = timed_begin
+    cancelled_at = []
+    thread = cancel_during(worker, first, "generating_sparse_structure", cancelled_at)
+
+    await worker.run_once(timeout=1)
+    thread.join()
+    await worker.run_once(timeout=1)
+
+    assert begun[second] - cancelled_at[0] < STAGE_SECONDS * 1.5
+    job = await worker.queue.get_job(first)
+    assert job["status"] == "cancelled"
+    assert job["result"] is None
+    # Export was skipped and the worker moved on.
+    assert not storage_service.find_path(f"outputs/{first}").exists()
+    assert (await worker.queue.get_job(second))["status"] == "completed"
+    assert storage_service.find_path(f"outputs/{second}").exists()
+    assert await worker.redis.llen(worker.queue.processing_key("worker-a")) == 0
+
+
+@pytest.mark.asyncio
+async def test_watchers_are_told_the_job_was_cancelled(worker):
+    job_id = await worker.queue.enqueue("text_to_3d", {"type": "text", "prompt": "a chair"}, {"resolution": "low"})
+    pubsub = worker.redis.pubsub()
+    await pubsub.subscribe(f"job:{job_id}:progress")
+    thread = cancel_during(worker, job_id, "generating_sparse_structure", [])
+
+    await worker.run_once(timeout=1)
+    thread.join()
+
+    events = []
+    while (message := await pubsub.get_message(timeout=0.1)) is not None:
+        if message["type"] == "message":
+            events.append(json.loads(message["data"]))
+    await pubsub.aclose()
+    assert events[-1]["type"] == "error"
+    assert events[-1]["status"] == "cancelled"
+    assert events[-1]["error"]["code"] == "CANCELLED"
+
+
+@pytest.mark.asyncio
+async def test_cancel_after_last_callback_is_not_overwritten(worker):
+    job_id = await worker.queue.enqueue("text_to_3d", {"type": "text", "prompt": "a chair"}, {"resolution": "low"})
+    thread = cancel_during(worker, job_id, "finalizing", [])
+
+    await worker.run_once(timeout=1)
+    thread.join()
+
+    assert (await worker.queue.get_job(job_id))["status"] == "cancelled"
+    assert not storage_service.find_path(f"outputs/{job_id}").exists()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_job_leaves_its_batch(worker, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_SIZE", 2)
+    monkeypatch.setattr(settings, "BATCH_WINDOW", 0)
+    job_ids = [
+        await worker.queue.enqueue("text_to_3d", {"type": "text", "prompt": prompt}, {"resolution": "low", "seed": 1})
+        for prompt in ["a chair", "a lamp"]
+    ]
+    thread = cancel_during(worker, job_ids[0], "generating_slat", [])
+
+    await worker.run_once(timeout=1)
+    thread.join()
+
+    statuses = [job["status"] for job in await worker.queue.get_jobs(job_ids)]
+    assert statuses == ["cancelled", "completed"]
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import pytest
+
+from app.core.queue import JobQueue
+from app.workers.gpu_worker import GPUWorker
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def make_worker(server, worker_id: str) -> GPUWorker:
+    worker = GPUWorker()
+    worker.worker_id = worker_id
+    worker.redis = fakeredis.aioredis.FakeRedis(server=server)
+    worker.sync_redis = fakeredis.FakeRedis(server=server)
+    worker.queue = JobQueue(worker.redis)
+    return worker
+
+
+@pytest.mark.asyncio
+async def test_killed_worker_job_is_picked_up_by_another_worker(server):
+    worker_a = make_worker(server, "worker-a")
+    worker_b = make_worker(server, "worker-b")
+
+    job_id = await worker_a.queue.enqueue(
+        job_type="text_to_3d",
+        input_data={"type": "text", "prompt": "a red chair"},
+        parameters={"seed": 42, "resolution": "low"}
+    )
+
+    started = asyncio.Event()
+
+    async def hang(job_id):
+        await worker_a.queue.update_job(job_id, {"status": "processing"})
+        started.set()
+        await asyncio.Event().wait()
+
+    processed_by_b = []
+
+    async def record(job_id):
+        processed_by_b.append(job_id)
+
+    worker_a.process_job = hang
+    worker_b.process_job = record
+
+    await worker_a.queue.renew_lease("worker-a", lease_seconds=1)
+    await worker_b.queue.renew_lease("worker-b", lease_seconds=30)
+
+    task = asyncio.create_task(worker_a.run_once(timeout=1))
+    await asyncio.wait_for(started.wait(), timeout=5)
+
+    # Worker A is now wedged mid-job and stops renewing its lease, exactly as
+    # after a crash: the job is never acked.
+    assert await worker_a.redis.lrange(worker_a.queue.processing_key("worker-a"), 0, -1) == [job_id.encode()]
+    assert await worker_a.queue.get_queue_size() == 0
+
+    await asyncio.sleep(1.2)
+
+    await worker_b.run_once(timeout=1)
+
+    assert processed_by_b == [job_id]
+    job = await worker_b.queue.get_job(job_id)
+    assert job["attempts"] == 1
+    assert job["worker_id"] == "worker-b"
+    assert await worker_b.redis.llen(worker_b.queue.processing_key("worker-a")) == 0
+    assert await worker_b.redis.llen(worker_b.queue.processing_key("worker-b")) == 0
+    assert not await worker_b.redis.sismember(worker_b.queue.workers_key, "worker-a")
+
+    task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_job_fails_after_max_retries(server):
+    queue = JobQueue(fakeredis.aioredis.FakeRedis(server=server))
+
+    job_id = await queue.enqueue(
+        job_type="text_to_3d",
+        input_data={"type": "text", "prompt": "a red chair"},
+        parameters={"seed": 42}
+    )
+
+    pubsub = queue.redis.pubsub()
+    await pubsub.subscribe(f"job:{job_id}:progress")
+
+    for attempt in range(2):
+        await queue.renew_lease("worker-a", lease_seconds=30)
+        assert await queue.claim("worker-a", timeout=1) == job_id
+        await queue.redis.delete(queue.lease_key("worker-a"))
+        await queue.requeue_abandoned(max_retries=1)
+
+    job = await queue.get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["error"]["code"] == "WORKER_LOST"
+    assert await queue.get_queue_size() == 0
+
+    events = []
+    while (message := await pubsub.get_message(timeout=0.1)) is not None:
+        if message["type"] == "message":
+            events.append(json.loads(message["data"]))
+    await pubsub.aclose()
+    assert [e["error"]["code"] for e in events if e["type"] == "error"] == ["WORKER_LOST"]
+
+
+@pytest.mark.asyncio
+async def test_finished_jobs_are_never_requeued(server):
+    queue = JobQueue(fakeredis.aioredis.FakeRedis(server=server))
+    job_ids = []
+    for status in ["completed", "failed", "cancelled", "expired"]:
+        job_id = await queue.enqueue("text_to_3d", {"type": "text", "prompt": status}, {"resolution": "low"})
+        assert await queue.claim("worker-a", timeout=1) == job_id
+        await queue.update_job(job_id, {"status": status})
+        job_ids.append(job_id)
+    untyped = await queue.enqueue("text_to_3d", {"type": "text", "prompt": "untyped"}, {"resolution": "low"})
+    assert await queue.claim("worker-a", timeout=1) == untyped
+    await queue.redis.hdel(f"job:{untyped}", "job_type")
+
+    assert await queue.requeue_in_flight("worker-a") == [untyped]
+
+    assert await queue.redis.zrange(queue.queue_name, 0, -1) == [untyped.encode()]
+    assert not await queue.redis.exists(queue.pending_key("None"), queue.pending_key(""))
+    assert [(await queue.get_job(j))["status"] for j in job_ids] == ["completed", "failed", "cancelled", "expired"]
+    assert await queue.redis.llen(queue.processing_key("worker-a")) == 0
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import threading
+import pytest
+from unittest.mock import patch
+
+from app.config import settings
+from app.core.exceptions import JobTimeoutException
+from app.workers import watchdog
+from app.workers.gpu_worker import WATCHDOG_EXIT_CODE
+
+
+async def enqueue(worker, prompt: str) -> str:
+    return await worker.queue.enqueue("text_to_3d", {"type": "text", "prompt": prompt}, {"resolution": "low"})
+
+
+@pytest.mark.asyncio
+async def test_slow_stage_fails_with_recoverable_timeout(worker):
+    slow = await enqueue(worker, "a slow chair")
+
+    with patch.multiple(settings, JOB_STAGE_TIMEOUT=0.05, JOB_STAGE_TIMEOUTS={}):
+        await worker.run_once(timeout=1)
+
+    job = await worker.queue.get_job(slow)
+    assert job["status"] == "failed"
+    assert job["error"]["code"] == "JOB_TIMEOUT"
+    assert job["error"]["recoverable"] is True
+    assert "stage: preprocessing" in job["error"]["message"]
+    assert await worker.redis.llen(worker.queue.processing_key("worker-a")) == 0
+
+    # The worker is free for the next job straight away.
+    fast = await enqueue(worker, "a fast chair")
+    await worker.run_once(timeout=1)
+    assert (await worker.queue.get_job(fast))["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_overall_timeout_covers_the_whole_job(worker):
+    job_id = await enqueue(worker, "a chair")
+
+    with patch.object(settings, "JOB_TIMEOUT", 0.15):
+        await worker.run_once(timeout=1)
+
+    job = await worker.queue.get_job(job_id)
+    assert job["error"]["code"] == "JOB_TIMEOUT"
+    assert "job timeout of 0.15s" in job["error"]["message"]
+
+
+@pytest.mark.asyncio
+async def test_stalled_prompt_enhancement_times_out(worker):
+    job_id = await worker.queue.enqueue(
+        "text_to_3d",
+        {"type": "text", "prompt": "a chair", "enhance_prompt": True, "llm_provider": "ollama"},
+        {"resolution": "low"}
+    )
+
+    async def stall(prompt, provider):
+        await asyncio.Event().wait()
+
+    worker.enhance_prompt = stall
+    with patch.object(settings, "JOB_STAGE_TIMEOUTS", {"enhancing_prompt": 0.1}):
+        await asyncio.wait_for(worker.run_once(timeout=1), timeout=5)
+
+    job = await worker.queue.get_job(job_id)
+    assert job["error"]["code"] == "JOB_TIMEOUT"
+    assert "stage: enhancing_prompt" in job["error"]["message"]
+
+
+@pytest.mark.asyncio
+async def test_hung_inference_restarts_the_worker(worker, monkeypatch):
+    # Sampling that never reaches a progress callback can only be stopped by
+    # exiting; the watchdog fails the job first so it is not requeued.
+    job_id = await enqueue(worker, "a chair")
+    claimed = await worker.queue.claim("worker-a", timeout=1)
+    exited = threading.Event()
+    exit_codes = []
+
+    def fake_exit(code):
+        exit_codes.append(code)
+        exited.set()
+
+    monkeypatch.setattr(watchdog, "WATCHDOG_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(os, "_exit", fake_exit)
+
+    with patch.multiple(settings, JOB_TIMEOUT=0.05, JOB_TIMEOUT_GRACE=0.05):
+        worker.watchdog.start()
+        worker.watchdog.begin([claimed])
+        try:
+            assert exited.wait(timeout=5)
+        finally:
+            worker.watchdog.stop()
+
+    assert exit_codes == [WATCHDOG_EXIT_CODE]
+    job = await worker.queue.get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["error"]["code"] == "JOB_TIMEOUT"
+    assert await worker.redis.llen(worker.queue.processing_key("worker-a")) == 0
+    assert await worker.queue.requeue_in_flight("worker-a") == []
+
+
+@pytest.mark.asyncio
+async def test_hung_job_cancelled_meanwhile_stays_cancelled(worker, monkeypatch):
+    cancelled = await enqueue(worker, "a cancelled chair")
+    hung = await enqueue(worker, "a hung chair")
+    for _ in range(2):
+        await worker.queue.claim("worker-a", timeout=1)
+    await worker.redis.hset(f"job:{cancelled}", "status", "cancelled")
+    pubsub = worker.redis.pubsub()
+    await pubsub.psubscribe("job:*:progress")
+    monkeypatch.setattr(os, "_exit", lambda code: None)
+
+    worker.abandon_hung_jobs([cancelled, hung], JobTimeoutException("job", 0.05))
+
+    assert (await worker.queue.get_job(cancelled))["status"] == "cancelled"
+    assert (await worker.queue.get_job(hung))["status"] == "failed"
+    assert await worker.redis.llen(worker.queue.processing_key("worker-a")) == 0
+    channels = []
+    while (message := await pubsub.get_message(timeout=0.1)) is not None:
+        if message["type"] == "pmessage":
+            channels.append(message["channel"])
+    await pubsub.aclose()
+    assert channels == [f"job:{hung}:progress".encode()]
@@ -0,0 +1,175 @@
+import json
+import os
+import time
+import pytest
+from unittest.mock import patch
+
+from app.config import settings
+from app.core.artifact_gc import GC_CURSOR_KEY, ArtifactCollector, _recent_touches
+from app.core.artifacts import ArtifactIndex
+from app.core.storage import StorageService
+
+fakeredis = pytest.importorskip("fakeredis")
+
+OLD = time.time() - 7 * 24 * 3600
+
+
+@pytest.fixture
+def storage(tmp_path):
+    service = StorageService()
+    service.uploads_path = tmp_path / "uploads"
+    service.outputs_path = tmp_path / "outputs"
+    service.previews_path = tmp_path / "previews"
+    service.fanout_levels = 1
+    return service
+
+
+@pytest.fixture
+async def collector(storage):
+    redis_client = fakeredis.aioredis.FakeRedis()
+    collector = ArtifactCollector(storage, ArtifactIndex())
+    _recent_touches.clear()
+    with patch.multiple(
+        settings, ARTIFACT_GC_INTERVAL=0, ARTIFACT_GC_PAUSE=0, ARTIFACT_GC_BATCH=2, ARTIFACT_DISK_QUOTA_MB=0
+    ):
+        await collector.start(redis_client)
+        assert await collector.acquire()
+        yield collector
+
+
+def write_job(storage, job_id, size=1000, mtime=OLD):
+    path = storage.local_path(f"outputs/{job_id}/model.glb")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    preview = storage.local_path(f"previews/{job_id}.png")
+    preview.parent.mkdir(parents=True, exist_ok=True)
+    preview.write_bytes(b"p" * 10)
+    for p in (path.parent, preview):
+        os.utime(p, (mtime, mtime))
+    return size + 10
+
+
+async def test_ledger_tracks_bytes_and_download_recency(collector):
+    usage = collector.usage
+    await usage.register("job-1", 100, accessed_at=1)
+    await usage.register("job-2", 50, accessed_at=2)
+    await usage.register("job-1", 100, accessed_at=3)
+    assert await usage.total() == 150
+    assert await usage.least_recent(2) == ["job-1", "job-2"]
+
+    await usage.touch("job-1")
+    assert await usage.least_recent(2) == ["job-2", "job-1"]
+    await usage.touch("job-gone")
+    assert await collector.redis.zscore("artifacts:lru", "job-gone") is None
+
+    assert await usage.unregister(["job-1", "job-missing"]) == 100
+    assert await usage.total() == 50
+
+
+async def test_expired_jobs_are_collected_and_live_ones_kept(collector, storage):
+    redis_client = collector.redis
+    for n in range(5):
+        size = write_job(storage, f"job-{n}")
+        await collector.usage.register(f"job-{n}", size)
+    await redis_client.hset("job:job-3", "status", "completed")
+    # Failed before publishing: files on disk, no ledger entry, record gone.
+    write_job(storage, "job-untracked")
+    write_job(storage, "job-fresh", mtime=time.time())
+    flat = storage.outputs_path / "job-flat"
+    flat.mkdir(parents=True)
+    (flat / "model.ply").write_bytes(b"y" * 300)
+    os.utime(flat, (OLD, OLD))
+
+    with patch.object(settings, "ARTIFACT_GC_MIN_AGE", 3600):
+        stats = await collector.collect()
+
+    assert stats["reclaimed"]["expired"] == 4 * 1010 + 1010 + 300
+    assert stats["scanned"]["ledger"] == 5
+    assert storage.get_output_path("job-3", "glb")
+    assert storage.get_output_path("job-fresh", "glb")
+    for job_id in ("job-0", "job-4", "job-untracked", "job-flat"):
+        assert not storage.list_artifacts(job_id)
+    assert await collector.usage.total() == 1010
+    assert await redis_client.get(GC_CURSOR_KEY) == b"0:0"
+
+
+async def test_uploads_are_kept_until_their_job_finishes(collector, storage):
+    redis_client = collector.redis
+    uploads = {}
+    for name, status in (("queued", "queued"), ("done", "completed"), ("legacy", None)):
+        path = uploads[name] = storage.local_path(f"uploads/{name}.png")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"i" * 20)
+        os.utime(path, (OLD, OLD))
+        if status:
+            await redis_client.hset(f"job:{name}", "status", status)
+    recent = storage.local_path("uploads/recent.png")
+    recent.parent.mkdir(parents=True, exist_ok=True)
+    recent.write_bytes(b"i" * 20)
+    os.utime(recent, (time.time() - 60, time.time() - 60))
+
+    with patch.object(settings, "ARTIFACT_GC_MIN_AGE", 0):
+        stats = await collector.collect()
+
+    # Older than the retention period, but its job is still queued.
+    assert uploads["queued"].exists()
+    assert not uploads["done"].exists()
+    assert not uploads["legacy"].exists()
+    assert recent.exists()
+    assert stats["reclaimed"]["uploads"] == 40
+
+
+async def test_quota_evicts_least_recently_downloaded(collector, storage):
+    redis_client = collector.redis
+    for n in range(4):
+        await redis_client.hset(f"job:job-{n}", "status", "completed")
+        await collector.usage.register(f"job-{n}", write_job(storage, f"job-{n}", size=1024 * 1024 - 10), accessed_at=n)
+    await collector.usage.touch("job-0")
+    pubsub = redis_client.pubsub()
+    await pubsub.psubscribe("job:*:progress")
+
+    with patch.object(settings, "ARTIFACT_DISK_QUOTA_MB", 2):
+        stats = await collector.collect()
+
+    assert stats["reclaimed"]["evicted"] == 2 * 1024 * 1024
+    assert [job_id for job_id in ("job-0", "job-1", "job-2", "job-3") if storage.get_output_path(job_id, "glb")] == [
+        "job-0", "job-3"
+    ]
+    assert await collector.usage.total() == 2 * 1024 * 1024
+
+    # Evicted jobs no longer claim to have results, and every API process
+    # is told to drop their manifests.
+    statuses = [await redis_client.hget(f"job:job-{n}", "status") for n in range(4)]
+    assert statuses == [b"completed", b"expired", b"expired", b"completed"]
+    assert await redis_client.hget("job:job-1", "result") == b""
+    events = []
+    while (message := await pubsub.get_message(timeout=0.1)) is not None:
+        if message["type"] == "pmessage":
+            events.append(json.loads(message["data"]))
+    await pubsub.aclose()
+    assert [(e["type"], e["job_id"]) for e in events] == [
+        ("artifacts_expired", "job-1"), ("artifacts_expired", "job-2")
+    ]
+
+
+async def test_sweep_resumes_from_its_cursor(collector, storage):
+    write_job(storage, "job-a")
+    shard = int(storage.shard("job-a").name, 16)
+    # A previous pass got past job-a's shard before it stopped.
+    await collector.redis.set(GC_CURSOR_KEY, f"0:{shard + 2}")
+
+    with patch.object(settings, "ARTIFACT_GC_MIN_AGE", 0):
+        first = await collector.collect()
+        second = await collector.collect()
+
+    assert first["scanned"]["outputs"] == 0
+    assert second["scanned"]["outputs"] == 1
+    assert not storage.list_artifacts("job-a")
+
+
+async def test_only_one_collector_holds_the_lock(collector, storage):
+    other = ArtifactCollector(storage)
+    other.redis = collector.redis
+
+    assert not await other.acquire()
+    assert await collector.acquire()
@@ -0,0 +1,67 @@
+import json
+import pytest
+from unittest.mock import patch
+
+from app.core.artifacts import ArtifactIndex, MANIFEST_NAME, file_etag, write_manifest
+from app.core.storage import storage_service
+
+
+@pytest.fixture
+def outputs(tmp_path):
+    job_dir = tmp_path / "outputs" / "job-1"
+    job_dir.mkdir(parents=True)
+    (job_dir / "model.glb").write_bytes(b"glb")
+    (job_dir / "model.ply").write_bytes(b"ply" * 10)
+    (tmp_path / "previews").mkdir()
+    (tmp_path / "previews" / "job-1.png").write_bytes(b"png")
+    with patch.object(storage_service, "outputs_path", tmp_path / "outputs"), \
+         patch.object(storage_service, "previews_path", tmp_path / "previews"):
+        yield job_dir
+
+
+def test_manifest_records_size_and_content_etag(outputs):
+    manifest = write_manifest("job-1")
+
+    assert json.loads((outputs / MANIFEST_NAME).read_text()) == manifest
+    assert set(manifest) == {"glb", "ply", "preview"}
+    assert manifest["ply"]["size"] == 30
+    assert manifest["glb"]["etag"] == file_etag(outputs / "model.glb")
+    assert manifest["glb"]["etag"] != manifest["preview"]["etag"]
+
+
+def test_index_serves_manifest_entries_until_the_file_goes(outputs):
+    write_manifest("job-1")
+    index = ArtifactIndex(max_entries=2)
+
+    artifact = index.lookup("job-1", "glb")
+    assert artifact.path == outputs / "model.glb"
+    assert artifact.size == 3
+    assert index.lookup("job-1", "quantized.glb") is None
+    assert index.lookup("../job-1", "glb") is None
+
+    (outputs / "model.glb").unlink()
+    assert index.lookup("job-1", "glb") is None
+
+
+def test_index_is_bounded(outputs, tmp_path):
+    for job_id in ("job-2", "job-3", "job-4"):
+        (tmp_path / "outputs" / job_id).mkdir()
+        write_manifest(job_id)
+    index = ArtifactIndex(max_entries=2)
+
+    for job_id in ("job-2", "job-3", "job-4"):
+        assert index.has_manifest(job_id)
+    assert list(index._manifests) == ["job-3", "job-4"]
+    assert index.is_cached("job-4") and not index.is_cached("job-2")
+    assert not index.has_manifest("job-5")
+
+
+def test_describe_hashes_legacy_files_once(outputs):
+    index = ArtifactIndex()
+
+    with patch("app.core.artifacts.file_etag", wraps=file_etag) as hashed:
+        first = index.describe(outputs / "model.ply")
+        second = index.describe(outputs / "model.ply")
+
+    assert first == second
+    assert hashed.call_count == 1
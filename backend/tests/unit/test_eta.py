@@ -0,0 +1,90 @@
+import time
+import pytest
+
+from app.core.eta import ETAEstimator, remaining_from_stage
+from app.core.queue import JobQueue
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def queue():
+    return JobQueue(fakeredis.aioredis.FakeRedis())
+
+
+@pytest.mark.asyncio
+async def test_estimates_fall_back_to_resolution_priors(queue):
+    job_id = await queue.enqueue("text_to_3d", {"prompt": "a chair"}, {"resolution": "low"})
+
+    assert await ETAEstimator(queue).estimate(await queue.get_job(job_id)) == 60
+
+
+@pytest.mark.asyncio
+async def test_learned_durations_are_smoothed_per_job_shape(queue):
+    estimator = ETAEstimator(queue)
+    parameters = {"resolution": "medium"}
+    await estimator.record("text_to_3d", parameters, total=40.0, remaining={"exporting": 10.0})
+    await estimator.record("text_to_3d", parameters, total=50.0, remaining={"exporting": 20.0})
+
+    stats = await estimator.load("text_to_3d", parameters)
+    assert stats["total"] == pytest.approx(42.0)
+    assert stats["samples"] == 2
+    assert remaining_from_stage(stats, parameters, "exporting", 30.0) == pytest.approx(12.0)
+    # Stages never seen fall back to the expected total less time elapsed.
+    assert remaining_from_stage(stats, parameters, "decoding", 30.0) == pytest.approx(12.0)
+
+    # Different step counts are learned separately.
+    other = {"resolution": "medium", "slat_sampler_params": {"steps": 50}}
+    assert await estimator.load("text_to_3d", other) == {}
+
+
+@pytest.mark.asyncio
+async def test_queued_estimate_accounts_for_position_and_workers(queue):
+    estimator = ETAEstimator(queue)
+    await estimator.record("text_to_3d", {"resolution": "low"}, total=30.0, remaining={})
+    job_ids = [
+        await queue.enqueue("text_to_3d", {"prompt": f"chair {n}"}, {"resolution": "low"})
+        for n in range(5)
+    ]
+    last = await queue.get_job(job_ids[-1])
+
+    assert await estimator.estimate(last) == 4 * 30 + 30
+
+    await queue.renew_lease("gpu-0")
+    await queue.renew_lease("gpu-1")
+    assert await estimator.estimate(last) == 2 * 30 + 30
+
+
+@pytest.mark.asyncio
+async def test_processing_estimate_follows_reported_eta(queue):
+    job_id = await queue.enqueue("text_to_3d", {"prompt": "a chair"}, {"resolution": "low"})
+    await queue.update_job(job_id, {"status": "processing", "eta_at": time.time() + 25})
+
+    job = await queue.get_job(job_id)
+    assert 24 <= await ETAEstimator(queue).estimate(job) <= 25
+
+    await queue.update_job(job_id, {"status": "completed"})
+    assert await ETAEstimator(queue).estimate(await queue.get_job(job_id)) == 0
+
+
+@pytest.mark.asyncio
+async def test_queued_estimate_counts_live_workers_for_the_job_type(queue):
+    estimator = ETAEstimator(queue)
+    await estimator.record("text_to_3d", {"resolution": "low"}, total=30.0, remaining={})
+    job_ids = [
+        await queue.enqueue("text_to_3d", {"prompt": f"chair {n}"}, {"resolution": "low"})
+        for n in range(5)
+    ]
+    last = await queue.get_job(job_ids[-1])
+
+    await queue.renew_lease("gpu-0", record={"worker_id": "gpu-0", "job_types": ["text_to_3d", "image_to_3d"]})
+    await queue.renew_lease("gpu-1", record={"worker_id": "gpu-1", "job_types": ["image_to_3d"]})
+    await queue.renew_lease("gpu-2", record={"worker_id": "gpu-2", "job_types": ["text_to_3d"]})
+    await queue.renew_lease("gpu-3")
+    await queue.renew_lease("gpu-4", lease_seconds=1)
+    await queue.release_worker("gpu-2")
+    # gpu-4's lease ran out without a clean shutdown.
+    await queue.redis.zadd(queue.live_workers_key("text_to_3d"), {"gpu-4": time.time() - 1})
+
+    # gpu-0 and gpu-3 (no job_types: any type) share the four jobs ahead.
+    assert await estimator.estimate(last) == 2 * 30 + 30
@@ -0,0 +1,67 @@
+import io
+import pytest
+from PIL import Image
+
+from app.services.trellis.glb import (
+    GLBFormatError,
+    QUANTIZATION_EXTENSION,
+    build_glb,
+    quantize_glb,
+    read_accessor,
+    read_glb,
+    uv_sphere
+)
+
+
+def texture(mode: str = "RGB") -> bytes:
+    image = Image.effect_mandelbrot((128, 128), (-2, -1.5, 1, 1.5), 50).convert(mode)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_quantized_positions_dequantize_within_half_a_step():
+    positions, normals, texcoords, indices = uv_sphere(8, 16)
+    positions = [p * 3 + 1 for p in positions]
+    original = build_glb(positions, normals, texcoords, indices)
+
+    gltf, binary = read_glb(quantize_glb(original, position_bits=12))
+
+    assert QUANTIZATION_EXTENSION in gltf["extensionsRequired"]
+    node = gltf["nodes"][gltf["nodes"][0]["children"][0]]
+    assert node["mesh"] == 0
+    step, origin = node["scale"][0], node["translation"]
+    grid = read_accessor(gltf, binary, 0)
+    decoded = [grid[i] * step + origin[i % 3] for i in range(len(grid))]
+    assert max(abs(a - b) for a, b in zip(decoded, positions)) <= step / 2 + 1e-6
+
+    normal = read_accessor(gltf, binary, 1)
+    assert gltf["accessors"][1]["normalized"] is True
+    assert gltf["bufferViews"][gltf["accessors"][1]["bufferView"]]["byteStride"] == 4
+    assert max(abs(n / 127 - expected) for n, expected in zip(normal, normals)) < 0.01
+
+    assert gltf["accessors"][3]["componentType"] == 5123
+    assert list(read_accessor(gltf, binary, 3)) == indices
+
+
+def test_opaque_textures_become_jpeg_and_transparent_ones_stay_png():
+    mesh = uv_sphere(4, 8)
+
+    gltf, _ = read_glb(quantize_glb(build_glb(*mesh, texture_png=texture("RGB"))))
+    assert gltf["images"][0]["mimeType"] == "image/jpeg"
+
+    transparent = Image.new("RGBA", (64, 64), (255, 0, 0, 128))
+    buffer = io.BytesIO()
+    transparent.save(buffer, format="PNG")
+    gltf, _ = read_glb(quantize_glb(build_glb(*mesh, texture_png=buffer.getvalue())))
+    assert gltf["images"][0]["mimeType"] == "image/png"
+
+
+def test_quantized_glb_is_smaller():
+    original = build_glb(*uv_sphere(32, 64), texture_png=texture())
+    assert len(quantize_glb(original)) < len(original) * 0.7
+
+
+def test_rejects_non_glb_input():
+    with pytest.raises(GLBFormatError):
+        quantize_glb(b"mock_glb_content")
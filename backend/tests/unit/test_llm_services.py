@@ -1,7 +1,10 @@
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
+import asyncio
 import httpx
 
+from app.core import http_client
+from app.services.llm.cache import PromptEnhancementCache
 from app.services.llm.ollama import OllamaProvider
 from app.services.llm.groq import GroqProvider
 
@@ -114,3 +117,174 @@ class TestGroqProvider:
 
             result = await p.is_available()
             assert result is False
+
+
+class TestPromptEnhancementCache:
+    @pytest.fixture
+    def provider(self):
+        provider = OllamaProvider()
+        provider.calls = 0
+
+        async def enhance_prompt(prompt, model=None):
+            provider.calls += 1
+            await asyncio.sleep(0.01)
+            return f"enhanced {prompt}", model or provider.default_model
+
+        provider.enhance_prompt = enhance_prompt
+        return provider
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_coalesce(self, provider):
+        cache = PromptEnhancementCache(max_entries=10, ttl=60)
+
+        results = await asyncio.gather(*[cache.enhance(provider, "a red chair") for _ in range(5)])
+
+        assert provider.calls == 1
+        assert all(r == ("enhanced a red chair", "llama3.2") for r in results)
+        assert cache.stats["coalesced"] == 4
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_fail_coalesced_ones(self, provider):
+        cache = PromptEnhancementCache(max_entries=10, ttl=60)
+
+        first = asyncio.create_task(cache.enhance(provider, "a red chair"))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(cache.enhance(provider, "a red chair")) for _ in range(2)]
+        await asyncio.sleep(0)
+        first.cancel()
+
+        results = await asyncio.gather(*followers)
+
+        assert first.cancelled()
+        assert provider.calls == 1
+        assert results == [("enhanced a red chair", "llama3.2")] * 2
+        assert await cache.enhance(provider, "a red chair") == ("enhanced a red chair", "llama3.2")
+        assert provider.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_local_lru_eviction(self, provider):
+        cache = PromptEnhancementCache(max_entries=1, ttl=60)
+
+        await cache.enhance(provider, "a")
+        await cache.enhance(provider, "b")
+        await cache.enhance(provider, "a")
+
+        assert provider.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_redis_tier_shared_between_processes(self, provider):
+        fakeredis = pytest.importorskip("fakeredis")
+        redis_client = fakeredis.aioredis.FakeRedis()
+
+        await PromptEnhancementCache(ttl=60).enhance(provider, "a", redis_client=redis_client)
+        other = PromptEnhancementCache(ttl=60)
+        result = await other.enhance(provider, "a", redis_client=redis_client)
+
+        assert result == ("enhanced a", "llama3.2")
+        assert provider.calls == 1
+        assert other.stats["hits_redis"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failures_are_not_cached(self, provider):
+        cache = PromptEnhancementCache(ttl=60)
+        provider.enhance_prompt = AsyncMock(side_effect=[Exception("timeout"), ("ok", "llama3.2")])
+
+        with pytest.raises(Exception, match="timeout"):
+            await cache.enhance(provider, "a")
+
+        assert await cache.enhance(provider, "a") == ("ok", "llama3.2")
+
+
+class TestHTTPClient:
+    @pytest.mark.asyncio
+    async def test_retries_retryable_status(self):
+        busy = MagicMock(status_code=503)
+        ok = MagicMock(status_code=200)
+
+        with patch.object(http_client.settings, "HTTP_RETRY_BACKOFF", 0):
+            with patch.object(httpx.AsyncClient, 'get', new_callable=AsyncMock) as mock_get:
+                mock_get.side_effect = [busy, ok]
+
+                response = await http_client.request("ollama", "get", "http://stub/api/tags")
+
+        assert response is ok
+        assert mock_get.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_dropped_connection_is_retried_only_when_idempotent(self):
+        dropped = httpx.RemoteProtocolError("Server disconnected without sending a response.")
+        ok = MagicMock(status_code=200)
+
+        with patch.object(http_client.settings, "HTTP_RETRY_BACKOFF", 0):
+            with patch.object(httpx.AsyncClient, 'get', new_callable=AsyncMock) as mock_get, \
+                    patch.object(httpx.AsyncClient, 'post', new_callable=AsyncMock) as mock_post:
+                mock_get.side_effect = [dropped, ok]
+                mock_post.side_effect = [dropped, ok]
+
+                assert await http_client.request("ollama", "get", "http://stub/api/tags") is ok
+                with pytest.raises(httpx.RemoteProtocolError):
+                    await http_client.request("ollama", "post", "http://stub/api/generate")
+
+        assert mock_get.call_count == 2
+        assert mock_post.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_post_is_not_replayed_after_a_gateway_error(self):
+        responses = {status: MagicMock(status_code=status) for status in (429, 502, 504)}
+        ok = MagicMock(status_code=200)
+
+        with patch.object(http_client.settings, "HTTP_RETRY_BACKOFF", 0):
+            with patch.object(httpx.AsyncClient, 'post', new_callable=AsyncMock) as mock_post:
+                mock_post.side_effect = [responses[429], ok, responses[502], responses[504]]
+
+                assert await http_client.request("groq", "post", "http://stub/chat") is ok
+                assert await http_client.request("groq", "post", "http://stub/chat") is responses[502]
+                assert await http_client.request("groq", "post", "http://stub/chat") is responses[504]
+
+        assert mock_post.call_count == 4
+
+    @pytest.mark.asyncio
+    async def test_pooled_request_keeps_the_client_timeout(self):
+        ok = MagicMock(status_code=200)
+
+        await http_client.init_http_clients()
+        try:
+            with patch.object(httpx.AsyncClient, 'get', new_callable=AsyncMock, return_value=ok) as mock_get:
+                await http_client.request("ollama", "get", "http://stub/api/tags")
+                await http_client.request("ollama", "get", "http://stub/api/tags", timeout=5.0)
+        finally:
+            await http_client.close_http_clients()
+
+        assert "timeout" not in mock_get.call_args_list[0].kwargs
+        assert mock_get.call_args_list[1].kwargs["timeout"] == 5.0
+
+    @pytest.mark.asyncio
+    async def test_backoff_does_not_hold_a_connection_slot(self):
+        busy = MagicMock(status_code=503)
+        ok = MagicMock(status_code=200)
+
+        with patch.object(http_client.settings, "OLLAMA_MAX_CONCURRENCY", 1), \
+                patch.object(http_client.settings, "HTTP_RETRY_BACKOFF", 1.0):
+            await http_client.init_http_clients()
+            try:
+                with patch.object(httpx.AsyncClient, 'get', new_callable=AsyncMock) as mock_get:
+                    mock_get.side_effect = [busy, ok, ok]
+                    retrying = asyncio.create_task(http_client.request("ollama", "get", "http://stub/a"))
+                    await asyncio.sleep(0)
+                    # Completes while the first call sleeps before its retry.
+                    assert await asyncio.wait_for(http_client.request("ollama", "get", "http://stub/b"), 0.4) is ok
+                    retrying.cancel()
+            finally:
+                await http_client.close_http_clients()
+
+    @pytest.mark.asyncio
+    async def test_pooled_client_is_reused(self):
+        await http_client.init_http_clients()
+        try:
+            client = http_client.http_clients["ollama"]
+            await http_client.init_http_clients()
+            assert http_client.http_clients["ollama"] is client
+        finally:
+            await http_client.close_http_clients()
+
+        assert http_client.http_clients == {}
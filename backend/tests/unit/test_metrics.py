@@ -0,0 +1,78 @@
+import json
+import pytest
+from unittest.mock import patch
+
+from app.core.metrics import MetricsRegistry
+from app.workers.progress import StageTimer
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("llm_seconds", "LLM latency", ["provider"], buckets=[0.1, 1])
+    for value in [0.05, 0.5, 0.7, 3]:
+        latency.observe(value, provider="groq")
+
+    # Snapshots survive a JSON round trip, as when workers publish them.
+    snapshot = json.loads(json.dumps(registry.snapshot()))
+    text = registry.render([({"worker": "w1"}, snapshot)])
+
+    assert "# TYPE llm_seconds histogram" in text
+    assert 'llm_seconds_bucket{worker="w1",provider="groq",le="0.1"} 1' in text
+    assert 'llm_seconds_bucket{worker="w1",provider="groq",le="1"} 3' in text
+    assert 'llm_seconds_bucket{worker="w1",provider="groq",le="+Inf"} 4' in text
+    assert 'llm_seconds_sum{worker="w1",provider="groq"} 4.25' in text
+    assert 'llm_seconds_count{worker="w1",provider="groq"} 4' in text
+
+
+def test_counters_and_gauges_merge_sources_under_one_header():
+    registry = MetricsRegistry()
+    served = registry.counter("bytes_total", "Bytes served", ["format"])
+    served.inc(100, format="glb")
+    served.inc(50, format="glb")
+
+    text = registry.render([({}, registry.snapshot()), ({"worker": "w1"}, {"bytes_total": [[["ply"], 7]]})])
+
+    assert text.count("# TYPE bytes_total counter") == 1
+    assert 'bytes_total{format="glb"} 150' in text
+    assert 'bytes_total{worker="w1",format="ply"} 7' in text
+
+
+def test_stage_timer_handles_sequential_and_concurrent_stages():
+    observed = []
+    timer = StageTimer(lambda stage, seconds: observed.append(stage), ["exporting_glb", "exporting_ply"])
+
+    with patch("app.workers.progress.time.monotonic", side_effect=[0, 1, 1, 2, 3, 4, 4, 6, 9]):
+        timer.update("preprocessing", 100)
+        timer.update("generating_sparse_structure", 0)
+        timer.update("generating_sparse_structure", 50)
+        timer.update("exporting", 0)
+        timer.update("exporting_glb", 0)
+        timer.update("exporting_ply", 0)
+        timer.update("exporting_ply", 100)
+        timer.update("exporting_glb", 100)
+        timer.finish()
+
+    assert observed == ["preprocessing", "generating_sparse_structure", "exporting_ply", "exporting_glb", "exporting"]
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_includes_worker_snapshots():
+    fakeredis = pytest.importorskip("fakeredis")
+    from app.api.v1.endpoints import metrics as endpoint
+    from app.core.queue import JobQueue
+
+    redis_client = fakeredis.aioredis.FakeRedis()
+    queue = JobQueue(redis_client)
+    await queue.enqueue("text_to_3d", {"prompt": "a chair"}, {"resolution": "low"})
+    await queue.renew_lease("gpu-0")
+    await redis_client.set(queue.metrics_key("gpu-0"), json.dumps({
+        "trellis_job_stage_seconds": [[["text_to_3d", "generating_slat"], [0] * 12 + [1, 42.0]]]
+    }))
+
+    with patch.object(endpoint, "get_redis_if_ready", return_value=redis_client):
+        response = await endpoint.prometheus_metrics()
+
+    text = response.body.decode()
+    assert "trellis_queue_depth 1" in text
+    assert "trellis_workers_live 1" in text
+    assert 'trellis_job_stage_seconds_count{worker="gpu-0",job_type="text_to_3d",stage="generating_slat"} 1' in text
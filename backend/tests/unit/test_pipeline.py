@@ -0,0 +1,156 @@
+import struct
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.config import settings
+from app.core.exceptions import JobCancelledException, JobTimeoutException
+from app.core.storage import storage_service
+from app.services.trellis.pipeline import EXPORT_STAGES, GLB_VARIANTS, TRELLISPipeline
+
+
+@pytest.fixture
+def pipeline():
+    return TRELLISPipeline()
+
+
+def test_run_exporters_collects_results_and_tolerates_preview_failure(pipeline):
+    updates = []
+
+    def broken_preview():
+        raise RuntimeError("no renderer")
+
+    result = pipeline._run_exporters(
+        "job-1",
+        {
+            "glb": lambda: ("/tmp/model.glb", 10),
+            "ply": lambda: ("/tmp/model.ply", 20),
+            "preview": broken_preview
+        },
+        lambda progress, stage, stage_progress: updates.append((progress, stage, stage_progress))
+    )
+
+    assert result["glb_path"] == "/tmp/model.glb"
+    assert result["file_sizes"] == {"glb": 10, "ply": 20}
+    assert result["preview_path"] is None
+    assert set(result["export_timings"]) == {"glb", "ply", "total"}
+    assert max(progress for progress, _, _ in updates) == 95
+    assert "exporting_glb" in {stage for _, stage, _ in updates}
+
+
+def test_run_exporters_raises_on_required_artifact_failure(pipeline):
+    def broken_glb():
+        raise RuntimeError("bake failed")
+
+    with pytest.raises(RuntimeError, match="bake failed"):
+        pipeline._run_exporters("job-1", {"glb": broken_glb, "ply": lambda: ("/tmp/model.ply", 1)})
+
+
+@pytest.mark.parametrize("error", [JobCancelledException("job-1"), JobTimeoutException("stage", 1.0, "exporting")])
+def test_run_exporters_stops_when_the_preview_sees_a_cancel_or_timeout(pipeline, error):
+    def report(progress, stage, stage_progress):
+        if stage == EXPORT_STAGES["preview"]:
+            raise error
+
+    with pytest.raises(type(error)):
+        pipeline._run_exporters(
+            "job-1",
+            {"glb": lambda: ("/tmp/model.glb", 10), "preview": lambda: ("/tmp/preview.png", 1)},
+            report
+        )
+
+
+class FakeModel:
+    def __init__(self, size):
+        self.size = size
+
+    def parameters(self):
+        import torch
+        return [torch.zeros(self.size, dtype=torch.uint8)]
+
+    def buffers(self):
+        return []
+
+
+class FakePipeline:
+    def __init__(self, size):
+        self.models = {"flow": FakeModel(size)}
+
+
+def test_pipelines_load_lazily_and_evict_least_recently_used(pipeline):
+    pipeline._initialized = True
+    pipeline.device = "cpu"
+    pipeline.memory_budget = 150
+    loads = []
+
+    def loader(name):
+        def load():
+            loads.append(name)
+            return FakePipeline(100)
+        return load
+
+    pipeline._loaders = {"image": loader("image"), "text": loader("text")}
+
+    assert pipeline.pipelines == {}
+    image = pipeline.get_pipeline("image")
+    assert pipeline.get_pipeline("image") is image
+    pipeline.get_pipeline("text")
+
+    stats = pipeline.get_stats()
+    assert loads == ["image", "text"]
+    assert stats["loaded"] == ["text"]
+    assert stats["events"]["image"]["evictions"] == 1
+    assert stats["memory_bytes"] == {"text": 100}
+
+
+def test_pipelines_are_evicted_before_the_next_one_loads(pipeline):
+    pipeline._initialized = True
+    pipeline.device = "cpu"
+    pipeline.memory_budget = 150
+    resident_at_load = []
+
+    def load():
+        resident_at_load.append(sum(pipeline.pipeline_memory.values()))
+        return FakePipeline(100)
+
+    pipeline._loaders = {"image": load, "text": load}
+
+    # The first text load has no measured size, the later image load reuses
+    # the one measured before image was evicted.
+    for modality in ["image", "text", "image"]:
+        pipeline.get_pipeline(modality)
+
+    assert resident_at_load == [0, 0, 0]
+    assert pipeline.get_stats()["loaded"] == ["image"]
+    assert pipeline.expected_memory("text") == 100
+
+    # Once sizes are known, pipelines that fit together are not evicted.
+    pipeline.memory_budget = 250
+    pipeline.get_pipeline("text")
+    assert pipeline.get_stats()["loaded"] == ["image", "text"]
+
+
+def test_glb_variants_and_gzip_siblings_are_exported(pipeline, tmp_path):
+    with patch.object(storage_service, "outputs_path", tmp_path), \
+            patch.multiple(settings, GLB_VARIANTS=["quantized", "unknown"], GLB_PRECOMPRESS=True):
+        path, size, variant_sizes = pipeline._save_glb("job-1", pipeline.mock_glb)
+
+    assert size == len(pipeline.mock_glb)
+    assert set(variant_sizes) == {"glb_quantized"}
+    assert variant_sizes["glb_quantized"] < size
+    assert sorted(p.name for p in Path(path).parent.iterdir()) == [
+        "model.glb", "model.glb.gz", "model.quantized.glb", "model.quantized.glb.gz"
+    ]
+
+
+def test_failing_glb_variant_does_not_fail_the_export(pipeline, tmp_path):
+    def broken(glb_data):
+        raise struct.error("unpack requires a buffer of 12 bytes")
+
+    with patch.object(storage_service, "outputs_path", tmp_path), \
+            patch.dict(GLB_VARIANTS, {"broken": broken}), \
+            patch.multiple(settings, GLB_VARIANTS=["broken", "quantized"], GLB_PRECOMPRESS=False):
+        path, size, variant_sizes = pipeline._save_glb("job-1", pipeline.mock_glb)
+
+    assert Path(path).read_bytes() == pipeline.mock_glb
+    assert set(variant_sizes) == {"glb_quantized"}
@@ -0,0 +1,57 @@
+import json
+import time
+import pytest
+
+from app.workers.progress import ProgressReporter
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+def test_burst_is_coalesced_to_latest_value(redis_client):
+    pubsub = redis_client.pubsub()
+    pubsub.subscribe("job:job-1:progress")
+    pubsub.get_message(timeout=1)
+
+    reporter = ProgressReporter(redis_client, interval=60)
+    for step in range(100):
+        reporter.report("job-1", step, "generating_slat", step)
+    reporter.flush()
+
+    assert reporter.flushes == 1
+    assert reporter.coalesced == 99
+    assert redis_client.hget("job:job-1", "progress") == b"99"
+
+    message = pubsub.get_message(timeout=1)
+    assert json.loads(message["data"])["progress"] == 99
+    assert pubsub.get_message(timeout=0.1) is None
+
+
+def test_report_does_not_block_and_background_flush_is_rate_limited(redis_client):
+    reporter = ProgressReporter(redis_client, interval=0.2)
+    reporter.start()
+    try:
+        started = time.perf_counter()
+        for step in range(1000):
+            reporter.report("job-1", step % 100, "generating_slat", step % 100)
+            time.sleep(0.0005)
+        elapsed = time.perf_counter() - started
+
+        time.sleep(0.3)
+        assert redis_client.hget("job:job-1", "stage") == b"generating_slat"
+        assert reporter.flushes <= elapsed / 0.2 + 2
+    finally:
+        reporter.stop()
+
+
+def test_discard_drops_pending_update(redis_client):
+    reporter = ProgressReporter(redis_client, interval=60)
+    reporter.report("job-1", 50, "exporting", 0)
+    reporter.discard("job-1")
+    reporter.flush()
+
+    assert redis_client.hget("job:job-1", "progress") is None
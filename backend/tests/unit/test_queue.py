@@ -1,19 +1,25 @@
+import asyncio
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import json
 
+from app.config import settings
 from app.core.queue import JobQueue
+from app.core.result_cache import ResultCache
 
 
 @pytest.fixture
 def mock_redis():
     mock = AsyncMock()
     mock.hset = AsyncMock(return_value=True)
+    mock.zadd = AsyncMock(return_value=1)
     mock.rpush = AsyncMock(return_value=1)
+    mock.ltrim = AsyncMock(return_value=True)
     mock.expire = AsyncMock(return_value=True)
-    mock.llen = AsyncMock(return_value=5)
-    mock.lrange = AsyncMock(return_value=[b"job-1", b"job-2"])
-    mock.lrem = AsyncMock(return_value=1)
+    mock.zcard = AsyncMock(return_value=5)
+    mock.zrange = AsyncMock(return_value=[b"job-1", b"job-2"])
+    mock.zrem = AsyncMock(return_value=1)
+    mock.register_script = MagicMock()
     return mock
 
 
@@ -33,7 +39,10 @@ async def test_enqueue_job(queue, mock_redis):
     assert job_id is not None
     assert len(job_id) == 36
     mock_redis.hset.assert_called_once()
-    mock_redis.rpush.assert_called_once()
+    # The pending set and the per-type set.
+    assert [call.args[0] for call in mock_redis.zadd.call_args_list] == [
+        queue.queue_name, queue.pending_key("text_to_3d")
+    ]
     mock_redis.expire.assert_called_once()
 
 
@@ -79,7 +88,7 @@ async def test_get_queue_size(queue, mock_redis):
     size = await queue.get_queue_size()
 
     assert size == 5
-    mock_redis.llen.assert_called_once()
+    mock_redis.zcard.assert_called_once()
 
 
 @pytest.mark.asyncio
@@ -93,24 +102,180 @@ async def test_get_pending_jobs(queue, mock_redis):
 
 @pytest.mark.asyncio
 async def test_cancel_job_success(queue, mock_redis):
-    mock_redis.hgetall = AsyncMock(return_value={
-        b"job_id": b"test-123",
-        b"status": b"queued"
-    })
+    queue._cancel_script = AsyncMock(return_value=1)
 
     result = await queue.cancel_job("test-123")
 
-    assert result is True
-    mock_redis.lrem.assert_called_once()
+    assert result == "cancelled"
+    assert queue._cancel_script.call_args.kwargs["keys"] == [
+        "job:test-123", settings.WORKER_QUEUE_NAME, "job:test-123:requesters"
+    ]
+    channel, payload = mock_redis.publish.call_args.args
+    assert channel == "job:test-123:progress"
+    assert json.loads(payload)["status"] == "cancelled"
 
 
 @pytest.mark.asyncio
 async def test_cancel_job_already_completed(queue, mock_redis):
-    mock_redis.hgetall = AsyncMock(return_value={
-        b"job_id": b"test-123",
-        b"status": b"completed"
-    })
+    queue._cancel_script = AsyncMock(return_value=0)
 
     result = await queue.cancel_job("test-123")
 
-    assert result is False
+    assert result is None
+    mock_redis.publish.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_cancel_never_overwrites_a_finished_job():
+    fakeredis = pytest.importorskip("fakeredis")
+    queue = JobQueue(fakeredis.aioredis.FakeRedis())
+    queued = await queue.enqueue("text_to_3d", {"prompt": "a"}, {"resolution": "low"})
+    finished = await queue.enqueue("text_to_3d", {"prompt": "b"}, {"resolution": "low"})
+    await queue.finish_job(finished, {"status": "completed"})
+
+    assert not await queue.cancel_job(finished)
+    assert not await queue.cancel_job("missing")
+    assert (await queue.get_job(finished))["status"] == "completed"
+    assert not await queue.redis.exists("job:missing")
+
+    assert await queue.cancel_job(queued)
+    assert (await queue.get_job(queued))["status"] == "cancelled"
+    assert await queue.redis.zscore(queue.queue_name, queued) is None
+    assert await queue.redis.zscore(queue.pending_key("text_to_3d"), queued) is None
+
+
+@pytest.mark.asyncio
+async def test_shared_job_is_cancelled_by_its_last_requester():
+    fakeredis = pytest.importorskip("fakeredis")
+    redis_client = fakeredis.aioredis.FakeRedis()
+    queue = JobQueue(redis_client)
+    cache = ResultCache(redis_client)
+    job_id, _ = await cache.resolve("fp", "job-1")
+    await queue.enqueue("text_to_3d", {"prompt": "a"}, {"resolution": "low"}, job_id=job_id, fingerprint="fp")
+    assert await cache.resolve("fp", "job-2") == ("job-1", "in_flight")
+    assert await cache.resolve("fp", "job-3") == ("job-1", "in_flight")
+
+    assert await queue.cancel_job("job-1") == "detached"
+    assert await queue.cancel_job("job-1") == "detached"
+    assert (await queue.get_job("job-1"))["status"] == "queued"
+
+    assert await queue.cancel_job("job-1") == "cancelled"
+    assert (await queue.get_job("job-1"))["status"] == "cancelled"
+
+
+@pytest.mark.asyncio
+async def test_enqueue_scores_cheaper_jobs_first(queue, mock_redis):
+    await queue.enqueue("text_to_3d", {"prompt": "test"}, {"resolution": "high"})
+    await queue.enqueue("text_to_3d", {"prompt": "test"}, {"resolution": "low"})
+
+    high_score = list(mock_redis.zadd.call_args_list[0].args[1].values())[0]
+    low_score = list(mock_redis.zadd.call_args_list[2].args[1].values())[0]
+
+    assert low_score < high_score
+
+
+@pytest.mark.asyncio
+async def test_get_jobs_pipelined():
+    fakeredis = pytest.importorskip("fakeredis")
+    queue = JobQueue(fakeredis.aioredis.FakeRedis())
+
+    first = await queue.enqueue("text_to_3d", {"prompt": "a"}, {"seed": 1})
+    second = await queue.enqueue("text_to_3d", {"prompt": "b"}, {"seed": 2})
+    await queue.update_job(second, {"status": "processing", "progress": 40})
+
+    jobs = await queue.get_jobs([first, "missing", second])
+
+    assert jobs[0]["input_data"] == {"prompt": "a"}
+    assert jobs[1] is None
+    assert jobs[2]["progress"] == 40
+
+    compact = await queue.get_jobs([second, "missing"], fields=["status", "progress"])
+
+    assert compact == [{"status": "processing", "progress": 40}, None]
+
+
+@pytest.mark.asyncio
+async def test_claim_routes_by_job_type():
+    fakeredis = pytest.importorskip("fakeredis")
+    queue = JobQueue(fakeredis.aioredis.FakeRedis())
+
+    text_job = await queue.enqueue("text_to_3d", {"prompt": "a"}, {"resolution": "low"})
+    image_job = await queue.enqueue("image_to_3d", {"image_filename": "x.png"}, {"resolution": "high"})
+
+    assert await queue.claim("image-worker", timeout=1, job_types=["image_to_3d"]) == image_job
+    assert await queue.claim("image-worker", timeout=1, job_types=["image_to_3d"]) is None
+    assert await queue.claim("any-worker", timeout=1) == text_job
+
+
+@pytest.mark.asyncio
+async def test_restricted_worker_claims_past_other_types(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    queue = JobQueue(fakeredis.aioredis.FakeRedis())
+    monkeypatch.setattr(settings, "CLAIM_SCAN_LIMIT", 5)
+
+    text_jobs = [
+        await queue.enqueue("text_to_3d", {"prompt": str(i)}, {"resolution": "low"})
+        for i in range(settings.CLAIM_SCAN_LIMIT * 3)
+    ]
+    image_job = await queue.enqueue("image_to_3d", {"image_filename": "x.png"}, {"resolution": "high"})
+
+    assert await queue.claim("image-worker", timeout=1, job_types=["image_to_3d"]) == image_job
+    assert await queue.claim("any-worker", timeout=1) == text_jobs[0]
+    assert await queue.redis.zcard(queue.pending_key("text_to_3d")) == len(text_jobs) - 1
+    assert await queue.redis.zcard(queue.pending_key("image_to_3d")) == 0
+
+
+@pytest.mark.asyncio
+async def test_index_pending_covers_jobs_queued_before_the_type_sets():
+    fakeredis = pytest.importorskip("fakeredis")
+    queue = JobQueue(fakeredis.aioredis.FakeRedis())
+    image_job = await queue.enqueue("image_to_3d", {"image_filename": "x.png"}, {"resolution": "high"})
+    await queue.redis.delete(queue.pending_key("image_to_3d"))
+
+    assert await queue.claim("image-worker", timeout=1, job_types=["image_to_3d"]) is None
+    assert await queue.index_pending() == 1
+    assert await queue.index_pending() == 0
+    assert await queue.claim("image-worker", timeout=1, job_types=["image_to_3d"]) == image_job
+
+
+@pytest.mark.asyncio
+async def test_migrate_legacy_queue_moves_the_old_list():
+    fakeredis = pytest.importorskip("fakeredis")
+    redis_client = fakeredis.aioredis.FakeRedis()
+    queue = JobQueue(redis_client)
+    # The layout before the sorted set: a plain list under the same key.
+    jobs = {"job-a": ("text_to_3d", "queued"), "job-b": ("image_to_3d", "queued"), "job-c": ("text_to_3d", "cancelled")}
+    for job_id, (job_type, status) in jobs.items():
+        await redis_client.hset(f"job:{job_id}", mapping={
+            "job_id": job_id, "job_type": job_type, "status": status,
+            "parameters": '{"resolution": "low"}', "created_at": "2026-01-03T12:00:00"
+        })
+    await redis_client.rpush(queue.queue_name, *jobs, "missing")
+
+    others = [JobQueue(redis_client) for _ in range(2)]
+    migrated = await asyncio.gather(*(q.migrate_legacy_queue(batch_size=1) for q in others))
+
+    assert sum(migrated) == 2
+    assert await queue.migrate_legacy_queue() == 0
+    assert not await redis_client.exists(f"{queue.queue_name}:legacy")
+    assert await queue.get_queue_size() == 2
+    assert await queue.claim("image-worker", timeout=1, job_types=["image_to_3d"]) == "job-b"
+    assert await queue.claim("any-worker", timeout=1) == "job-a"
+    assert await queue.claim("any-worker", timeout=1) is None
+
+
+@pytest.mark.asyncio
+async def test_worker_registry_lists_live_heartbeats():
+    fakeredis = pytest.importorskip("fakeredis")
+    queue = JobQueue(fakeredis.aioredis.FakeRedis())
+
+    await queue.renew_lease("worker-a", record={"worker_id": "worker-a", "current_job": "job-1", "stage": "exporting"})
+    await queue.renew_lease("worker-b")
+    await queue.renew_lease("worker-c")
+    await queue.redis.delete(queue.lease_key("worker-c"))
+
+    workers = await queue.get_workers()
+
+    assert [w["worker_id"] for w in workers] == ["worker-a", "worker-b"]
+    assert workers[0]["stage"] == "exporting"
+    assert "current_job" not in workers[1]
@@ -0,0 +1,95 @@
+import pytest
+from unittest.mock import patch
+
+from app.core.result_cache import ResultCache, compute_fingerprint
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.aioredis.FakeRedis()
+
+
+@pytest.fixture
+def cache(redis_client):
+    return ResultCache(redis_client)
+
+
+def test_fingerprint_normalizes_defaults():
+    input_data = {"type": "text", "prompt": "a red chair", "enhance_prompt": False, "llm_provider": "ollama"}
+
+    implicit = compute_fingerprint("text_to_3d", input_data, {"seed": None, "resolution": "low"})
+    explicit = compute_fingerprint("text_to_3d", {**input_data, "prompt": " a red chair "}, {
+        "seed": 42,
+        "resolution": "low",
+        "sparse_structure_sampler_params": {"steps": 8},
+        "slat_sampler_params": None
+    })
+
+    assert implicit == explicit
+
+
+def test_fingerprint_distinguishes_parameters():
+    input_data = {"type": "text", "prompt": "a red chair"}
+
+    assert compute_fingerprint("text_to_3d", input_data, {"seed": 1}) != compute_fingerprint(
+        "text_to_3d", input_data, {"seed": 2}
+    )
+    assert compute_fingerprint("image_to_3d", {}, {}, content_hash="a") != compute_fingerprint(
+        "image_to_3d", {}, {}, content_hash="b"
+    )
+
+
+@pytest.mark.asyncio
+async def test_resolve_miss_then_attach_in_flight(cache, redis_client):
+    job_id, hit = await cache.resolve("fp", "job-1")
+    assert (job_id, hit) == ("job-1", None)
+
+    await redis_client.hset("job:job-1", "status", "processing")
+
+    job_id, hit = await cache.resolve("fp", "job-2")
+    assert (job_id, hit) == ("job-1", "in_flight")
+
+
+@pytest.mark.asyncio
+async def test_resolve_completed_requires_artifacts(cache, redis_client):
+    await cache.resolve("fp", "job-1")
+    await redis_client.hset("job:job-1", "status", "completed")
+
+    with patch("app.core.result_cache.storage_service.artifact_exists", return_value=True):
+        assert await cache.resolve("fp", "job-2") == ("job-1", "completed")
+
+    with patch("app.core.result_cache.storage_service.artifact_exists", return_value=False):
+        assert await cache.resolve("fp", "job-3") == ("job-3", None)
+
+    stats = await cache.get_stats()
+    assert stats == {"hits_completed": 1, "hits_in_flight": 0, "misses": 2, "evictions": 1}
+
+
+@pytest.mark.asyncio
+async def test_resolve_replaces_failed_job(cache, redis_client):
+    await cache.resolve("fp", "job-1")
+    await redis_client.hset("job:job-1", "status", "failed")
+
+    assert await cache.resolve("fp", "job-2") == ("job-2", None)
+    assert await redis_client.get(cache.key("fp")) == b"job-2"
+
+
+@pytest.mark.asyncio
+async def test_resolve_attaches_to_a_reservation_not_yet_enqueued(cache, redis_client):
+    # The first request has reserved job-1 but not written its record yet.
+    assert await cache.resolve("fp", "job-1") == ("job-1", None)
+
+    assert await cache.resolve("fp", "job-2") == ("job-1", "in_flight")
+    assert await redis_client.get(cache.key("fp")) == b"job-1"
+
+
+@pytest.mark.asyncio
+async def test_resolve_replaces_a_stale_reservation(cache, redis_client):
+    await cache.resolve("fp", "job-1")
+    ttl = await redis_client.ttl(cache.key("fp"))
+    await redis_client.expire(cache.key("fp"), ttl - 301)
+
+    assert await cache.resolve("fp", "job-2") == ("job-2", None)
+    assert (await cache.get_stats())["evictions"] == 1
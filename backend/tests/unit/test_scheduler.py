@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import patch
+
+from app.config import settings
+from app.core.queue import JobQueue
+from app.core.scheduler import degradation_level, apply_degradation
+from app.workers.gpu_worker import GPUWorker
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def overload():
+    with patch.multiple(
+        settings,
+        OVERLOAD_MODE_ENABLED=True,
+        OVERLOAD_QUEUE_DEPTH=10,
+        OVERLOAD_OLDEST_AGE=60.0,
+        OVERLOAD_MAX_LEVEL=3
+    ):
+        yield
+
+
+def test_degradation_is_off_unless_enabled():
+    with patch.object(settings, "OVERLOAD_MODE_ENABLED", False):
+        assert degradation_level(1000, 10000) == 0
+
+
+def test_degradation_level_climbs_with_depth_and_age(overload):
+    assert degradation_level(9, 59) == 0
+    assert degradation_level(10, 0) == 1
+    assert degradation_level(5, 130) == 2
+    assert degradation_level(500, 0) == 3
+
+    with patch.object(settings, "OVERLOAD_MAX_LEVEL", 1):
+        assert degradation_level(500, 0) == 1
+
+
+def test_apply_degradation_steps_down_quality():
+    parameters = {"resolution": "high", "slat_sampler_params": {"steps": 30, "cfg_strength": 3.0}}
+
+    degraded = apply_degradation(parameters, 2)
+
+    assert degraded["sparse_structure_sampler_params"]["steps"] == 10
+    assert degraded["slat_sampler_params"] == {"steps": 15, "cfg_strength": 3.0}
+    assert degraded["texture_size"] == 512
+    assert degraded["simplify"] == 0.97
+    assert "texture_size" not in parameters
+
+    # Low resolution jobs never drop below the minimum step count.
+    assert apply_degradation({"resolution": "low"}, 3)["slat_sampler_params"]["steps"] == 4
+
+
+@pytest.mark.asyncio
+async def test_worker_degrades_jobs_when_backlogged(overload):
+    server = fakeredis.FakeServer()
+    worker = GPUWorker()
+    worker.redis = fakeredis.aioredis.FakeRedis(server=server)
+    worker.queue = JobQueue(worker.redis)
+
+    for _ in range(20):
+        await worker.queue.enqueue("text_to_3d", {"prompt": "a chair"}, {"resolution": "medium"})
+
+    job = {"parameters": {"resolution": "medium"}}
+    parameters, degradation = await worker.plan_quality(job)
+
+    assert degradation["level"] == 2
+    assert degradation["queue_depth"] == 20
+    assert parameters["slat_sampler_params"]["steps"] == 6
+    assert parameters["texture_size"] == 512
+
+    with patch.object(settings, "OVERLOAD_QUEUE_DEPTH", 50):
+        assert await worker.plan_quality(job) == (job["parameters"], None)
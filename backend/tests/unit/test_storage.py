@@ -0,0 +1,130 @@
+import hashlib
+import io
+import os
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from fastapi import UploadFile
+
+from app.core.exceptions import FileTooLargeException
+from app.core.storage import StorageService
+from app.core.storage_migration import StorageMigration
+
+
+@pytest.fixture
+def storage(tmp_path):
+    service = StorageService()
+    service.uploads_path = tmp_path
+    return service
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    service = StorageService()
+    service.uploads_path = tmp_path / "uploads"
+    service.outputs_path = tmp_path / "outputs"
+    service.previews_path = tmp_path / "previews"
+    service.fanout_levels = 2
+    return service
+
+
+def write_flat_job(service, job_id):
+    job_dir = service.outputs_path / job_id
+    job_dir.mkdir(parents=True)
+    (job_dir / "model.glb").write_bytes(job_id.encode())
+    service.previews_path.mkdir(exist_ok=True)
+    (service.previews_path / f"{job_id}.png").write_bytes(b"png")
+
+
+@pytest.mark.asyncio
+async def test_stage_and_commit_upload(storage, tmp_path):
+    content = b"x" * 2500
+    upload = UploadFile(file=io.BytesIO(content), filename="photo.PNG")
+
+    temp_path, digest, size = await storage.stage_upload(upload, max_size=10_000, chunk_size=1000)
+
+    assert size == 2500
+    assert digest == hashlib.sha256(content).hexdigest()
+
+    filename = storage.commit_upload(temp_path, "photo.PNG")
+
+    assert filename.endswith(".png")
+    assert not temp_path.exists()
+    assert storage.get_upload_path(filename).read_bytes() == content
+
+    temp_path, _, _ = await storage.stage_upload(UploadFile(file=io.BytesIO(content), filename="a.jpg"), 10_000)
+    assert storage.commit_upload(temp_path, "a.jpg", "job-1") == "job-1.jpg"
+
+
+@pytest.mark.asyncio
+async def test_stage_upload_rejects_oversized_early(storage, tmp_path):
+    upload = UploadFile(file=io.BytesIO(b"x" * 5000), filename="big.png")
+
+    with pytest.raises(FileTooLargeException):
+        await storage.stage_upload(upload, max_size=1500, chunk_size=1000)
+
+    assert list(tmp_path.iterdir()) == []
+    assert upload.file.tell() == 2000
+
+
+def test_writes_fan_out_and_flat_files_still_read(sharded, tmp_path):
+    path = Path(sharded.save_output_sync("job-new", b"glb", "glb"))
+    digest = hashlib.sha256(b"job-new").hexdigest()
+    assert path == tmp_path / "outputs" / digest[:2] / digest[2:4] / "job-new" / "model.glb"
+
+    write_flat_job(sharded, "job-old")
+    assert sharded.get_output_path("job-old", "glb") == tmp_path / "outputs" / "job-old" / "model.glb"
+    assert sharded.list_artifacts("job-old").keys() == {"glb", "preview"}
+
+    sharded.cleanup_job("job-old")
+    assert not (tmp_path / "outputs" / "job-old").exists()
+    assert sharded.get_preview_path("job-old") is None
+
+
+def test_migration_moves_flat_trees_and_resumes(sharded, tmp_path):
+    for n in range(5):
+        write_flat_job(sharded, f"job-{n}")
+    sharded.uploads_path.mkdir()
+    (sharded.uploads_path / ".staged.part").write_bytes(b"in flight")
+
+    # Whatever fails (or is not reached before a crash) stays in the flat
+    # layout for the next run.
+    migration = StorageMigration(sharded, batch_size=2)
+    real_rename = os.rename
+    calls = []
+
+    def flaky_rename(source, target):
+        calls.append(source)
+        if len(calls) == 3:
+            raise OSError("interrupted")
+        real_rename(source, target)
+
+    with patch("app.core.storage_migration.os.rename", side_effect=flaky_rename):
+        first = migration.run()
+    assert first["outputs"]["moved"] == 4
+    assert first["outputs"]["failed"] == 1
+
+    second = migration.run()
+    assert second["outputs"]["moved"] == 1
+    assert second["previews"]["moved"] == 0
+
+    for n in range(5):
+        job_id = f"job-{n}"
+        assert sharded.get_output_path(job_id, "glb") == sharded.local_path(f"outputs/{job_id}/model.glb")
+        assert sharded.get_output_path(job_id, "glb").read_bytes() == job_id.encode()
+    assert sorted(p.name for p in sharded.outputs_path.iterdir() if len(p.name) != 2) == []
+    assert (sharded.uploads_path / ".staged.part").exists()
+    assert migration.run()["outputs"] == {"moved": 0, "merged": 0, "failed": 0, "seconds": pytest.approx(0, abs=1), "errors": {}}
+
+
+def test_migration_keeps_newer_copies(sharded):
+    write_flat_job(sharded, "job-1")
+    (sharded.outputs_path / "job-1" / "model.ply").write_bytes(b"ply")
+    sharded.save_output_sync("job-1", b"rewritten", "glb")
+
+    stats = StorageMigration(sharded).run(["outputs"])
+
+    assert stats["outputs"]["merged"] == 1
+    assert not (sharded.outputs_path / "job-1").exists()
+    assert sharded.get_output_path("job-1", "glb").read_bytes() == b"rewritten"
+    assert sharded.get_output_path("job-1", "ply").read_bytes() == b"ply"
@@ -0,0 +1,71 @@
+import asyncio
+import sys
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.config import settings
+from app.workers.supervisor import WorkerSupervisor, parse_cpu_set, restart_delay
+
+
+def test_parse_cpu_set():
+    assert parse_cpu_set("0-3,8") == {0, 1, 2, 3, 8}
+    assert parse_cpu_set("5") == {5}
+
+
+def test_restart_delay_backs_off_exponentially():
+    with patch.multiple(settings, WORKER_RESTART_BACKOFF=1.0, WORKER_RESTART_BACKOFF_MAX=10.0):
+        assert [restart_delay(n) for n in range(1, 6)] == [1.0, 2.0, 4.0, 8.0, 10.0]
+
+
+def test_children_are_pinned_round_robin():
+    with patch.multiple(settings, WORKER_DEVICES=["0", "1"], WORKER_CPU_SETS=["0-1"]):
+        supervisor = WorkerSupervisor(count=3)
+
+    assert [slot.device for slot in supervisor.slots] == ["0", "1", "0"]
+    slot = supervisor.slots[1]
+    slot.worker_id = "host-1-abc"
+    env = supervisor.child_env(slot)
+    assert env["CUDA_VISIBLE_DEVICES"] == "1"
+    assert env["WORKER_ID"] == "host-1-abc"
+    assert slot.cpus == {0, 1}
+
+
+@pytest.mark.asyncio
+async def test_crashed_children_are_restarted_and_released():
+    supervisor = WorkerSupervisor(count=1, command=[sys.executable, "-c", "raise SystemExit(3)"])
+    supervisor.release = AsyncMock()
+
+    with patch.multiple(settings, WORKER_RESTART_BACKOFF=0.01, WORKER_RESTART_BACKOFF_MAX=1.0):
+        task = asyncio.create_task(supervisor.run())
+        slot = supervisor.slots[0]
+        for _ in range(200):
+            if slot.restarts >= 2:
+                break
+            await asyncio.sleep(0.02)
+        supervisor.request_stop()
+        await asyncio.wait_for(task, timeout=5)
+
+    assert slot.restarts >= 2
+    assert supervisor.release.await_count >= 2
+
+
+@pytest.mark.asyncio
+async def test_sigterm_is_passed_to_children():
+    # The child exits cleanly only when it receives SIGTERM.
+    child = (
+        "import signal, sys, time\n"
+        "signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))\n"
+        "print('ready', flush=True)\n"
+        "time.sleep(30)\n"
+    )
+    supervisor = WorkerSupervisor(count=2, command=[sys.executable, "-c", child])
+    supervisor.release = AsyncMock()
+
+    task = asyncio.create_task(supervisor.run())
+    await asyncio.sleep(0.5)
+    supervisor.request_stop()
+    await asyncio.wait_for(task, timeout=5)
+
+    assert [slot.process.returncode for slot in supervisor.slots] == [0, 0]
+    assert all(slot.restarts == 0 for slot in supervisor.slots)
+    supervisor.release.assert_not_awaited()
@@ -0,0 +1,52 @@
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.api.upload_limit import UploadLimitMiddleware
+
+
+def make_client():
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        app.state.calls += 1
+        return {"size": len(await file.read())}
+
+    app.add_middleware(UploadLimitMiddleware, paths=["/upload"], max_body=1000)
+    return app, TestClient(app)
+
+
+def test_body_within_the_limit_reaches_the_endpoint():
+    app, client = make_client()
+
+    response = client.post("/upload", files={"file": ("a.png", b"x" * 500, "image/png")})
+
+    assert response.status_code == 200
+    assert response.json() == {"size": 500}
+
+
+def test_declared_oversized_body_is_refused_before_reading():
+    app, client = make_client()
+
+    response = client.post("/upload", content=b"x" * 10, headers={"Content-Length": "5000"})
+
+    assert response.status_code == 413
+    assert app.state.calls == 0
+
+
+def test_undeclared_oversized_body_is_cut_off():
+    app, client = make_client()
+
+    def chunks():
+        for _ in range(10):
+            yield b"x" * 500
+
+    response = client.post(
+        "/upload",
+        content=chunks(),
+        headers={"Content-Type": "multipart/form-data; boundary=b"}
+    )
+
+    assert response.status_code == 413
+    assert app.state.calls == 0
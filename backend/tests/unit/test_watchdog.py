@@ -0,0 +1,35 @@
+import pytest
+from unittest.mock import patch
+
+from app.config import settings
+from app.core.exceptions import JobTimeoutException
+from app.workers.watchdog import JobWatchdog
+
+
+def test_checkpoint_raises_once_a_stage_deadline_passes():
+    watchdog = JobWatchdog(on_hang=lambda job_ids, error: None)
+
+    with patch.multiple(settings, JOB_TIMEOUT=600, JOB_STAGE_TIMEOUT=10, JOB_STAGE_TIMEOUTS={"slow": 100}), \
+            patch("app.workers.watchdog.time.monotonic", side_effect=[0, 0, 1, 1, 5, 15, 15, 50, 200]):
+        watchdog.begin(["job-1"])
+        watchdog.checkpoint("fast")
+        watchdog.checkpoint("slow")
+        # Repeating a stage does not restart its clock.
+        watchdog.checkpoint("slow")
+        watchdog.checkpoint("fast")
+        assert watchdog.expired() is None
+        with pytest.raises(JobTimeoutException, match="stage timeout of 100s"):
+            watchdog.checkpoint()
+
+
+def test_finished_jobs_never_expire():
+    watchdog = JobWatchdog(on_hang=lambda job_ids, error: None)
+
+    with patch.object(settings, "JOB_TIMEOUT", 0):
+        watchdog.begin(["job-1"])
+        assert isinstance(watchdog.expired(), JobTimeoutException)
+        watchdog.finish()
+
+    assert watchdog.expired() is None
+    assert watchdog.remaining() is None
+    watchdog.checkpoint("preprocessing")
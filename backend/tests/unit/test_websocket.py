@@ -0,0 +1,129 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.api.websocket.manager import ConnectionManager
+from app.api.websocket.subscriber import ProgressSubscriber, job_snapshot_message
+from app.config import settings
+from app.core.artifacts import artifact_index
+from app.core.queue import JobQueue
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def make_websocket():
+    websocket = MagicMock()
+    websocket.accept = AsyncMock()
+    websocket.send_json = AsyncMock()
+    return websocket
+
+
+@pytest.mark.asyncio
+async def test_published_progress_is_fanned_out_once_per_socket():
+    redis_client = fakeredis.aioredis.FakeRedis()
+    manager = ConnectionManager()
+    sockets = [make_websocket() for _ in range(3)]
+    for ws in sockets:
+        await manager.connect(ws, "job-1")
+
+    await redis_client.hset("job:job-1", mapping={"job_id": "job-1", "status": "processing", "progress": "10"})
+
+    subscriber = ProgressSubscriber(manager)
+    await subscriber.start(redis_client)
+    await asyncio.sleep(0.1)
+
+    await redis_client.publish("job:job-1:progress", json.dumps({"type": "completion", "job_id": "job-1"}))
+    await asyncio.wait_for(manager.wait_finished("job-1"), timeout=2)
+    await subscriber.stop()
+
+    for ws in sockets:
+        messages = [call.args[0] for call in ws.send_json.call_args_list]
+        assert [m["type"] for m in messages] == ["progress_update", "completion"]
+
+
+@pytest.mark.asyncio
+async def test_cancelling_a_job_finishes_its_watchers():
+    redis_client = fakeredis.aioredis.FakeRedis()
+    queue = JobQueue(redis_client)
+    job_id = await queue.enqueue("text_to_3d", {"prompt": "a chair"}, {"resolution": "low"})
+    manager = ConnectionManager()
+    ws = make_websocket()
+    await manager.connect(ws, job_id)
+
+    subscriber = ProgressSubscriber(manager)
+    await subscriber.start(redis_client)
+    await asyncio.sleep(0.1)
+
+    assert await queue.cancel_job(job_id)
+    await asyncio.wait_for(manager.wait_finished(job_id), timeout=2)
+    await subscriber.stop()
+
+    message = ws.send_json.call_args_list[-1].args[0]
+    assert message["type"] == "error"
+    assert message["status"] == "cancelled"
+    assert message["error"]["code"] == "CANCELLED"
+
+
+@pytest.mark.asyncio
+async def test_expired_job_record_finishes_its_watchers():
+    redis_client = fakeredis.aioredis.FakeRedis()
+    manager = ConnectionManager()
+    ws = make_websocket()
+    await manager.connect(ws, "job-1")
+    await redis_client.hset("job:job-1", mapping={"job_id": "job-1", "status": "processing"})
+
+    with patch.object(settings, "WEBSOCKET_RESYNC_INTERVAL", 0.05):
+        subscriber = ProgressSubscriber(manager)
+        await subscriber.start(redis_client)
+        await asyncio.sleep(0.1)
+        await redis_client.delete("job:job-1")
+        await asyncio.wait_for(manager.wait_finished("job-1"), timeout=2)
+        await subscriber.stop()
+
+    message = ws.send_json.call_args_list[-1].args[0]
+    assert message["error"]["code"] == "JOB_NOT_FOUND"
+
+
+@pytest.mark.asyncio
+async def test_artifacts_expired_event_drops_the_cached_manifest():
+    manager = ConnectionManager()
+    ws = make_websocket()
+    await manager.connect(ws, "job-1")
+    artifact_index._manifests["job-1"] = {}
+
+    await ProgressSubscriber(manager).dispatch("job-1", {"type": "artifacts_expired", "job_id": "job-1"})
+
+    assert not artifact_index.is_cached("job-1")
+    ws.send_json.assert_not_called()
+
+
+def test_snapshot_message_for_terminal_states():
+    assert job_snapshot_message({"job_id": "j", "status": "completed", "result": {"glb_url": "x"}})["type"] == "completion"
+    assert job_snapshot_message({"job_id": "j", "status": "cancelled"})["error"]["code"] == "CANCELLED"
+    assert job_snapshot_message({"job_id": "j", "status": "expired"})["error"]["code"] == "EXPIRED"
+    assert job_snapshot_message({"job_id": "j", "status": "queued"})["type"] == "progress_update"
+
+
+@pytest.mark.asyncio
+async def test_stalled_socket_does_not_hold_up_the_others(monkeypatch):
+    monkeypatch.setattr(settings, "WEBSOCKET_SEND_TIMEOUT", 0.05)
+    manager = ConnectionManager()
+    stalled = make_websocket()
+
+    async def stall(message):
+        await asyncio.Event().wait()
+
+    stalled.send_json = stall
+    stalled.close = AsyncMock()
+    healthy = [make_websocket() for _ in range(2)]
+    for ws in [stalled, *healthy]:
+        await manager.connect(ws, "job-1")
+
+    await asyncio.wait_for(manager.broadcast_to_job("job-1", {"type": "progress_update"}), timeout=0.5)
+    await asyncio.sleep(0)
+
+    for ws in healthy:
+        ws.send_json.assert_awaited_once_with({"type": "progress_update"})
+    assert manager.get_connection_count("job-1") == 2
+    stalled.close.assert_awaited_once()
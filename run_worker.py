@@ -14,10 +14,10 @@ os.environ['UPLOADS_PATH'] = '/tmp/trellis_storage/uploads'
 os.environ['OUTPUTS_PATH'] = '/tmp/trellis_storage/outputs'
 os.environ['PREVIEWS_PATH'] = '/tmp/trellis_storage/previews'
 
-print("Starting GPU worker with TRELLIS...")
+print("Starting GPU workers with TRELLIS...")
 print(f"TRELLIS_DEVICE: {os.environ['TRELLIS_DEVICE']}")
 
 import asyncio
-from app.workers.gpu_worker import main
+from app.workers.supervisor import main
 
 asyncio.run(main())